@@ -0,0 +1,7 @@
+"""Entry point for ``python -m app`` (headless batch tools, no Qt)."""
+import sys
+
+from app.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Byte-budgeted LRU cache for rendered page images.
+"""
+from collections import OrderedDict
+
+
+DEFAULT_PAGE_CACHE_MB = 256
+
+
+class PageCache:
+    """LRU mapping of render keys to images, evicting past *max_bytes*.
+
+    Keys are tuples whose first element is the page index, e.g.
+    ``(page, zoom, rotation, revision)``, so all renders of a page can be
+    dropped together.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_PAGE_CACHE_MB * 1024 * 1024,
+                 sizeof=lambda img: img.sizeInBytes()):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._items = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        img = self._items.get(key)
+        if img is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._items.move_to_end(key)
+        return img
+
+    def put(self, key, img):
+        self.discard(key)
+        size = self.sizeof(img)
+        if size > self.max_bytes:
+            return
+        self._items[key] = img
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, old = self._items.popitem(last=False)
+            self.bytes -= self.sizeof(old)
+
+    def discard(self, key):
+        img = self._items.pop(key, None)
+        if img is not None:
+            self.bytes -= self.sizeof(img)
+
+    def discard_page(self, page: int):
+        for key in [k for k in self._items if k[0] == page]:
+            self.discard(key)
+
+    def clear(self):
+        self._items.clear()
+        self.bytes = 0
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,297 @@
+"""
+Headless batch front end: ``python -m app <command> ...``
+
+Runs the app's PDF operations over many files without importing Qt. Inputs
+are paths or glob patterns; ``@list.txt`` (or ``--manifest list.txt``) reads
+one path or pattern per line. Per-file operations run across a process pool
+and every file gets its own OK/ERROR line, followed by throughput stats.
+"""
+import argparse
+from concurrent.futures import as_completed
+import glob
+import json
+import os
+import sys
+import time
+
+from app import __app_name__, __version__, pdfops, workers
+
+
+# ---------- Inputs ---------- #
+def read_manifest(path: str):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+def expand_inputs(patterns, manifests=()):
+    """Paths matching *patterns* and manifest entries, de-duplicated, in order."""
+    specs = list(patterns)
+    for m in manifests:
+        specs.extend(read_manifest(m))
+    seen, out = set(), []
+    for spec in specs:
+        if spec.startswith("@"):
+            matches = list(expand_inputs(read_manifest(spec[1:])))
+        elif glob.has_magic(spec):
+            matches = sorted(glob.glob(spec, recursive=True))
+        else:
+            matches = [spec]
+        for p in matches:
+            if p not in seen:
+                seen.add(p)
+                out.append(p)
+    return out
+
+
+def output_path(out_dir: str, src: str, suffix: str) -> str:
+    stem = os.path.splitext(os.path.basename(src))[0]
+    return os.path.join(out_dir, f"{stem}{suffix}")
+
+
+# ---------- Per-file jobs (run in worker processes) ---------- #
+def run_one(command: str, src: str, opts: dict) -> dict:
+    """Run *command* on one file; never raises, the error goes in the result."""
+    t0 = time.perf_counter()
+    result = {"input": src, "ok": True, "outputs": [], "pages": 0, "error": None,
+              "bytes": 0}
+    try:
+        result["bytes"] = os.path.getsize(src)
+        out_dir, pw = opts["out_dir"], opts.get("password")
+        if command == "extract":
+            out = output_path(out_dir, src, opts["suffix"])
+            result["pages"] = pdfops.extract_pages(src, out, opts["pages"], password=pw)
+            result["outputs"].append(out)
+        elif command == "split":
+            result["outputs"], result["pages"] = pdfops.split_file(
+                src, out_dir, every=opts["every"], password=pw)
+        elif command == "encrypt":
+            out = output_path(out_dir, src, opts["suffix"])
+            result["pages"] = pdfops.encrypt(src, out, opts["user_password"], password=pw)
+            result["outputs"].append(out)
+        elif command == "optimize":
+            out = output_path(out_dir, src, opts["suffix"])
+            stats = pdfops.optimize(src, out, opts["profile"], password=pw)
+            result.update(pages=stats["pages"], bytes_after=stats["bytes_after"])
+            result["outputs"].append(out)
+        elif command == "export-png":
+            with pdfops.open_document(src, pw) as doc:
+                for n in pdfops.parse_ranges(opts["pages"], len(doc)):
+                    out = output_path(out_dir, src, f"-p{n}.png")
+                    pdfops.save_page_png(doc[n - 1], out, opts["zoom"])
+                    result["outputs"].append(out)
+                    result["pages"] += 1
+        else:
+            raise ValueError(f"unknown command {command!r}")
+    except Exception as e:
+        result["ok"] = False
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - t0
+    return result
+
+
+# ---------- Reporting ---------- #
+def report(result: dict, quiet: bool):
+    if not result["ok"]:
+        print(f"ERROR {result['input']}: {result['error']}", file=sys.stderr)
+    elif not quiet:
+        outs = ", ".join(result["outputs"])
+        size = ""
+        if "bytes_after" in result:
+            size = f"{result['bytes'] / 1e6:.2f} MB -> {result['bytes_after'] / 1e6:.2f} MB " \
+                   f"{percent_change(result['bytes'], result['bytes_after'])}, "
+        print(f"OK    {result['input']} -> {outs} ({size}{result['seconds']:.2f}s)", file=sys.stderr)
+
+
+def percent_change(before: int, after: int) -> str:
+    return f"{(after - before) / before:+.0%}" if before else "n/a"
+
+
+def summarize(results, elapsed: float) -> dict:
+    ok = [r for r in results if r["ok"]]
+    pages = sum(r["pages"] for r in ok)
+    mb = sum(r["bytes"] for r in ok) / (1024 * 1024)
+    summary = {
+        "files": len(results), "ok": len(ok), "failed": len(results) - len(ok),
+        "pages": pages, "elapsed_s": round(elapsed, 3),
+        "files_per_s": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "pages_per_s": round(pages / elapsed, 2) if elapsed else 0.0,
+        "mb_per_s": round(mb / elapsed, 2) if elapsed else 0.0,
+    }
+    resized = [r for r in ok if "bytes_after" in r]
+    if resized:
+        summary["bytes_before"] = sum(r["bytes"] for r in resized)
+        summary["bytes_after"] = sum(r["bytes_after"] for r in resized)
+    return summary
+
+
+def print_summary(summary: dict):
+    print(f"{summary['ok']}/{summary['files']} files ok, {summary['failed']} failed, "
+          f"{summary['pages']} pages in {summary['elapsed_s']:.2f}s "
+          f"({summary['files_per_s']} files/s, {summary['pages_per_s']} pages/s, "
+          f"{summary['mb_per_s']} MB/s)", file=sys.stderr)
+    if "bytes_after" in summary:
+        before, after = summary["bytes_before"], summary["bytes_after"]
+        print(f"{before / 1e6:.2f} MB -> {after / 1e6:.2f} MB ({percent_change(before, after)})",
+              file=sys.stderr)
+
+
+# ---------- Commands ---------- #
+def run_batch(command: str, inputs, opts: dict, jobs: int, quiet: bool):
+    results = []
+    if jobs <= 1 or len(inputs) <= 1:
+        for src in inputs:
+            results.append(run_one(command, src, opts))
+            report(results[-1], quiet)
+        return results
+    pool = workers.get_pool("cli", jobs)
+    futures = [pool.submit(run_one, command, src, opts) for src in inputs]
+    for fut in as_completed(futures):
+        results.append(fut.result())
+        report(results[-1], quiet)
+    return results
+
+
+def run_merge(inputs, out_path: str, quiet: bool, password: str = None, dedupe: bool = True):
+    """Merge is one output, so it runs in-process; bad inputs are reported
+    individually and nothing is written if any of them fails to open."""
+    bad = []
+    for src in inputs:
+        try:
+            pdfops.open_document(src, password).close()
+        except Exception as e:
+            bad.append({"input": src, "ok": False, "outputs": [], "pages": 0, "bytes": 0,
+                        "error": f"{type(e).__name__}: {e}", "seconds": 0.0})
+            report(bad[-1], quiet)
+    if bad:
+        return bad
+    t0 = time.perf_counter()
+    result = {"input": out_path, "ok": True, "outputs": [out_path], "pages": 0,
+              "error": None, "bytes": sum(os.path.getsize(p) for p in inputs if os.path.exists(p))}
+    try:
+        result["pages"] = pdfops.merge(inputs, out_path, dedupe=dedupe, password=password)
+    except Exception as e:
+        result["ok"] = False
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - t0
+    report(result, quiet)
+    return [result]
+
+
+def run_export(inputs, opts: dict, jobs: int, quiet: bool):
+    """Export page images one input at a time, each input's pages split
+    across the workers (pdfops.export_images)."""
+    results = []
+    for src in inputs:
+        t0 = time.perf_counter()
+        result = {"input": src, "ok": True, "outputs": [], "pages": 0, "error": None, "bytes": 0}
+        try:
+            result["bytes"] = os.path.getsize(src)
+            with pdfops.open_document(src, opts["password"]) as doc:
+                count = len(doc)
+            pages = ([n - 1 for n in pdfops.parse_ranges(opts["pages"], count)]
+                     if opts["pages"] else range(count))
+            result["outputs"] = pdfops.export_images(
+                src, opts["out_dir"], pages, dpi=opts["dpi"], fmt=opts["format"],
+                quality=opts["quality"], password=opts["password"], jobs=jobs)
+            result["pages"] = len(result["outputs"])
+        except Exception as e:
+            result["ok"] = False
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["seconds"] = time.perf_counter() - t0
+        results.append(result)
+        report(result, quiet)
+    return results
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="python -m app", description=f"{__app_name__} batch tools")
+    p.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("inputs", nargs="*", help="PDF paths, glob patterns or @manifest files")
+    common.add_argument("--manifest", action="append", default=[], help="file listing one input per line")
+    common.add_argument("-j", "--jobs", type=int, default=workers.default_workers(), help="worker processes")
+    common.add_argument("--password", help="password for encrypted inputs")
+    common.add_argument("-q", "--quiet", action="store_true", help="only report failures")
+    common.add_argument("--json", action="store_true", help="print results and stats as JSON on stdout")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    m = sub.add_parser("merge", parents=[common], help="concatenate inputs into one PDF")
+    m.add_argument("-o", "--output", required=True, help="merged PDF path")
+    m.add_argument("--no-dedupe", action="store_true",
+                   help="skip the final pass that merges shared fonts/images (faster, larger)")
+
+    e = sub.add_parser("extract", parents=[common], help="extract page ranges from each input")
+    e.add_argument("-p", "--pages", required=True, help='page ranges, e.g. "1-3,5"')
+    e.add_argument("-o", "--out-dir", required=True)
+    e.add_argument("--suffix", default="-extract.pdf")
+
+    s = sub.add_parser("split", parents=[common],
+                       help="split each input into parts of N pages, or at its top-level bookmarks")
+    s.add_argument("-n", "--every", type=int, help="pages per part (default: split at bookmarks)")
+    s.add_argument("-o", "--out-dir", required=True)
+
+    c = sub.add_parser("encrypt", parents=[common], help="write password-protected copies")
+    c.add_argument("--user-password", required=True, help="password to set on the output")
+    c.add_argument("-o", "--out-dir", required=True)
+    c.add_argument("--suffix", default="-encrypted.pdf")
+
+    o = sub.add_parser("optimize", parents=[common],
+                       help="write smaller, linearized copies (images recompressed as the profile says)")
+    o.add_argument("--profile", choices=list(pdfops.OPTIMIZE_PROFILES), default="lossless",
+                   help="lossless keeps images as they are; ebook (150 dpi) and screen (96 dpi) "
+                        "downsample and re-encode them as JPEG")
+    o.add_argument("-o", "--out-dir", required=True)
+    o.add_argument("--suffix", default="-optimized.pdf")
+
+    x = sub.add_parser("export-png", parents=[common], help="render pages to PNG")
+    x.add_argument("-p", "--pages", default="1", help='page ranges, e.g. "1-3,5" (default: 1)')
+    x.add_argument("-z", "--zoom", type=float, default=1.0)
+    x.add_argument("-o", "--out-dir", required=True)
+
+    i = sub.add_parser("export-images", parents=[common],
+                       help="render pages to PNG/JPEG/WebP, each file's pages split across the workers")
+    i.add_argument("-p", "--pages", default="", help='page ranges, e.g. "1-3,5" (default: all)')
+    i.add_argument("-f", "--format", choices=sorted(pdfops.IMAGE_FORMATS), default="png")
+    i.add_argument("--dpi", type=int, default=150)
+    i.add_argument("--quality", type=int, default=90, help="JPEG/WebP quality (1-100)")
+    i.add_argument("-o", "--out-dir", required=True)
+    return p
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    inputs = expand_inputs(args.inputs, args.manifest)
+    if not inputs:
+        print("no input files", file=sys.stderr)
+        return 2
+    t0 = time.perf_counter()
+    if args.command == "merge":
+        results = run_merge(inputs, args.output, args.quiet, args.password, not args.no_dedupe)
+    else:
+        os.makedirs(args.out_dir, exist_ok=True)
+        opts = {"out_dir": args.out_dir, "password": args.password}
+        if args.command == "extract":
+            opts.update(pages=args.pages, suffix=args.suffix)
+        elif args.command == "split":
+            opts.update(every=args.every)
+        elif args.command == "encrypt":
+            opts.update(user_password=args.user_password, suffix=args.suffix)
+        elif args.command == "optimize":
+            opts.update(profile=args.profile, suffix=args.suffix)
+        elif args.command == "export-png":
+            opts.update(pages=args.pages, zoom=args.zoom)
+        if args.command == "export-images":
+            opts.update(pages=args.pages, format=args.format, dpi=args.dpi, quality=args.quality)
+            results = run_export(inputs, opts, args.jobs, args.quiet)
+        else:
+            results = run_batch(args.command, inputs, opts, args.jobs, args.quiet)
+    summary = summarize(results, time.perf_counter() - t0)
+    print_summary(summary)
+    if args.json:
+        json.dump({"results": results, "summary": summary}, sys.stdout, indent=2)
+        print()
+    workers.shutdown_pools()
+    return 0 if summary["failed"] == 0 else 1
@@ -0,0 +1,342 @@
+"""
+Continuous vertical scroll view over all pages of a document.
+
+Page positions come from the page sizes, read once up front, so the scroll
+range is exact before anything is rendered. Only the pages intersecting the
+viewport plus CONTINUOUS_MARGIN_PX above and below are rasterized and kept;
+pages scrolling out of that window are dropped, so memory stays flat however
+long the document is. Pages too large to render whole at the current zoom are
+drawn from the tiles that intersect the viewport, as in the single-page view.
+"""
+from array import array
+import bisect
+
+from PySide6.QtCore import Qt, QRect, QTimer, Signal
+from PySide6.QtGui import QColor, QImage, QPainter
+from PySide6.QtWidgets import QAbstractScrollArea
+
+from app import perf
+from app.lazy import lazy_import
+from app.pageview import TILE_SIZE, FULL_RENDER_MAX_PIXELS, paint_overlay, tile_rect, tiles_in, to_pixels
+from app.render import RenderJob, render_image, PRIORITY_VISIBLE, PRIORITY_PREFETCH
+
+fitz = lazy_import("fitz")  # PyMuPDF
+
+
+PAGE_GAP = 12                # device pixels between and around pages
+CONTINUOUS_MARGIN_PX = 1200  # rendered ahead above and below the viewport
+
+
+class PageLayout:
+    """Pages stacked vertically at *zoom*, centred in the widest page's column."""
+
+    def __init__(self, sizes, zoom: float, gap: int = PAGE_GAP):
+        self.zoom = zoom
+        self.gap = gap
+        self.tops = array("q")
+        self.widths = array("l")
+        self.heights = array("l")
+        y = gap
+        for w, h in sizes:
+            pw, ph = max(1, int(w * zoom)), max(1, int(h * zoom))
+            self.tops.append(y)
+            self.widths.append(pw)
+            self.heights.append(ph)
+            y += ph + gap
+        self.height = y
+        self.width = (max(self.widths) if sizes else 0) + 2 * gap
+
+    def __len__(self):
+        return len(self.tops)
+
+    def page_rect(self, i: int) -> QRect:
+        w = self.widths[i]
+        return QRect((self.width - w) // 2, self.tops[i], w, self.heights[i])
+
+    def page_at(self, y: int) -> int:
+        """Page at (or just above) document coordinate *y*."""
+        return max(0, min(len(self) - 1, bisect.bisect_right(self.tops, y) - 1))
+
+    def pages_in(self, y0: int, y1: int) -> range:
+        if not len(self):
+            return range(0)
+        first = self.page_at(y0)
+        if self.tops[first] + self.heights[first] < y0:
+            first += 1
+        return range(first, self.page_at(y1) + 1)
+
+
+class ContinuousView(QAbstractScrollArea):
+    """Virtualized vertical strip of pages, rendered through a RenderScheduler.
+
+    Like ThumbnailModel, pages listed in *dirty_pages* are rendered from *doc*
+    directly. Renders already in *page_cache* (under ``page_key(page, zoom)``
+    plus the tile coordinates, as the single-page view stores them) are reused,
+    but pages scrolled past are not added to it: only the window stays resident.
+    """
+    current_page_changed = Signal(int)
+
+    def __init__(self, doc, scheduler, path: str, password: str = None, dirty_pages=None,
+                 page_cache=None, page_key=None, overlay=None, commit_edits=None, parent=None):
+        super().__init__(parent)
+        self.doc = doc
+        self.scheduler = scheduler
+        self.path = path
+        self.password = password
+        self.dirty_pages = dirty_pages if dirty_pages is not None else set()
+        self.page_cache = page_cache
+        self.page_key = page_key or (lambda i, z: (i, z, doc[i].rotation, 0))
+        # page -> (hits, current hit or None, [(kind, rect)]) in page points
+        self.overlay = overlay or (lambda page: ((), None, ()))
+        # Called before a page is rasterized again; True if it had edits only
+        # the overlay was showing, so its remaining pieces are re-rendered too.
+        self.commit_edits = commit_edits or (lambda page: False)
+        self.zoom = 1.0
+        self._sizes = [(r.width, r.height) for r in (doc[i].rect for i in range(len(doc)))]
+        self.layout_ = PageLayout(self._sizes, self.zoom)
+        self._images = {}   # (page, tag) -> QImage; tag is None or (tx, ty)
+        self._stale = {}    # page -> image at a previous zoom, drawn scaled meanwhile
+        self._wanted = set()
+        self._current = 0
+
+        self.viewport().setAttribute(Qt.WA_OpaquePaintEvent)
+        self.verticalScrollBar().setSingleStep(40)
+        self.horizontalScrollBar().setSingleStep(40)
+        self.verticalScrollBar().valueChanged.connect(self._on_scrolled)
+        self.horizontalScrollBar().valueChanged.connect(self._on_scrolled)
+        self._timer = QTimer(self, singleShot=True, interval=0)
+        self._timer.timeout.connect(self.request_visible)
+        scheduler.rendered.connect(self._on_rendered)
+        self._update_scrollbars()
+
+    # ---------- Geometry ---------- #
+    def _update_scrollbars(self):
+        vp = self.viewport().size()
+        vbar, hbar = self.verticalScrollBar(), self.horizontalScrollBar()
+        vbar.setRange(0, max(0, self.layout_.height - vp.height()))
+        vbar.setPageStep(vp.height())
+        hbar.setRange(0, max(0, self.layout_.width - vp.width()))
+        hbar.setPageStep(vp.width())
+
+    def _origin(self):
+        """Viewport position of document coordinate (0, 0)."""
+        x = max(0, (self.viewport().width() - self.layout_.width) // 2) - self.horizontalScrollBar().value()
+        return x, -self.verticalScrollBar().value()
+
+    def visible_doc_rect(self, margin: int = 0) -> QRect:
+        x, y = self._origin()
+        vp = self.viewport().rect()
+        return vp.translated(-x, -y).adjusted(0, -margin, 0, margin)
+
+    def current_page(self) -> int:
+        return self._current
+
+    def scroll_to_page(self, index: int):
+        if 0 <= index < len(self.layout_):
+            self.verticalScrollBar().setValue(self.layout_.tops[index] - self.layout_.gap)
+            self._set_current(index)
+
+    def ensure_visible(self, page: int, rect, margin: int = 50):
+        """Scroll as little as needed to show *rect* (page points) of *page*."""
+        r = self.layout_.page_rect(page)
+        target = to_pixels(rect, self.zoom, r.x(), r.y()).toAlignedRect().adjusted(-margin, -margin, margin, margin)
+        vis = self.visible_doc_rect()
+        for bar, lo, hi, vlo, vhi in ((self.horizontalScrollBar(), target.left(), target.right(), vis.left(), vis.right()),
+                                      (self.verticalScrollBar(), target.top(), target.bottom(), vis.top(), vis.bottom())):
+            if lo < vlo:
+                bar.setValue(bar.value() - (vlo - lo))
+            elif hi > vhi:
+                bar.setValue(bar.value() + min(hi - vhi, lo - vlo))
+
+    def set_zoom(self, zoom: float):
+        """Re-lay out at *zoom*, keeping the same point of the document on top."""
+        if zoom == self.zoom:
+            return
+        vbar = self.verticalScrollBar()
+        page = self.layout_.page_at(vbar.value())
+        frac = (vbar.value() - self.layout_.tops[page]) / max(1, self.layout_.heights[page])
+        # Keep what is on screen as a scaled stand-in until the new renders land.
+        self._stale.update({p: img for (p, tag), img in self._images.items() if tag is None})
+        self._images.clear()
+        self.zoom = zoom
+        self._relayout()
+        vbar.setValue(int(self.layout_.tops[page] + frac * self.layout_.heights[page]))
+
+    def invalidate(self, page: int = None):
+        """Forget renders of *page* (or all), re-reading its size (rotation)."""
+        pages = range(len(self.doc)) if page is None else [page]
+        self.scheduler.cancel(owner=self, keep=None if page is None else (lambda j: j.page != page))
+        self._images = {k: v for k, v in self._images.items() if k[0] not in pages}
+        for p in pages:
+            self._stale.pop(p, None)
+        sizes = [(r.width, r.height) for r in (self.doc[p].rect for p in pages)]
+        if any(self._sizes[p] != s for p, s in zip(pages, sizes)):
+            for p, s in zip(pages, sizes):
+                self._sizes[p] = s
+            self._relayout()
+        self.refresh()
+
+    def _relayout(self):
+        self.layout_ = PageLayout(self._sizes, self.zoom)
+        self._update_scrollbars()
+        self.refresh()
+
+    def refresh(self):
+        self.viewport().update()
+        self._timer.start()
+
+    def release(self):
+        """Drop every resident render and pending job (view hidden/closed)."""
+        self.scheduler.cancel(owner=self)
+        self._images.clear()
+        self._stale.clear()
+        self._wanted = set()
+
+    def set_document(self, doc):
+        """Draw pages from *doc*, the same file reopened; renders are dropped."""
+        self.release()
+        self.doc = doc
+
+    def resident_bytes(self) -> int:
+        """Bytes of the renders this view holds itself (not in the page cache)."""
+        return sum(img.sizeInBytes() for img in (*self._images.values(), *self._stale.values()))
+
+    def is_complete(self) -> bool:
+        """Whether every visible page is drawn at full resolution."""
+        return all(w in self._images for w in self._visible_pieces(self.visible_doc_rect()))
+
+    # ---------- Events ---------- #
+    def resizeEvent(self, e):
+        super().resizeEvent(e)
+        self._update_scrollbars()
+        self.refresh()
+
+    def showEvent(self, e):
+        super().showEvent(e)
+        self._update_scrollbars()
+        self.refresh()
+
+    def _on_scrolled(self, _value):
+        y = self.verticalScrollBar().value()
+        self._set_current(self.layout_.page_at(y + self.viewport().height() // 3))
+        self.refresh()
+
+    def _set_current(self, page: int):
+        if page != self._current:
+            self._current = page
+            self.current_page_changed.emit(page)
+
+    # ---------- Rendering ---------- #
+    def _fits_full(self, page: int) -> bool:
+        return self.layout_.widths[page] * self.layout_.heights[page] <= FULL_RENDER_MAX_PIXELS
+
+    def _visible_pieces(self, rect: QRect):
+        """(page, tag) pieces needed to draw *rect*, in document coordinates."""
+        out = []
+        for p in self.layout_.pages_in(rect.top(), rect.bottom()):
+            if self._fits_full(p):
+                out.append((p, None))
+                continue
+            pr = self.layout_.page_rect(p)
+            local = rect.intersected(pr).translated(-pr.x(), -pr.y())
+            out += [(p, t) for t in tiles_in(local, pr.size())]
+        return out
+
+    def request_visible(self):
+        """Render what is on screen first, then the margin; drop the rest."""
+        if not self.isVisible() or not len(self.layout_):
+            return
+        visible = self._visible_pieces(self.visible_doc_rect(TILE_SIZE // 2))
+        ahead = [w for w in self._visible_pieces(self.visible_doc_rect(CONTINUOUS_MARGIN_PX))
+                 if w[1] is None and w not in visible]
+        order = visible + ahead
+        self._wanted = wanted = set(order)
+        window = {p for p, _ in order}
+        self._images = {k: v for k, v in self._images.items() if k in wanted}
+        self._stale = {p: v for p, v in self._stale.items() if p in window}
+        for p in {p for p, tag in order if (p, tag) not in self._images}:
+            if self.commit_edits(p):
+                self._images = {k: v for k, v in self._images.items() if k[0] != p}
+                self._stale.pop(p, None)
+        zoom = self.zoom
+        self.scheduler.cancel(owner=self, keep=lambda j: (j.page, j.tag) in wanted and j.zoom == zoom
+                              and j.page not in self.dirty_pages)
+        queued = {(j.page, j.tag) for j in self.scheduler.pending(owner=self)}
+        n_visible = len(visible)
+        for rank, (p, tag) in enumerate(order):
+            if (p, tag) in self._images or (p, tag) in queued:
+                continue
+            key = self._key(p, tag)
+            img = self.page_cache.get(key) if self.page_cache is not None else None
+            if img is None and p in self.dirty_pages:
+                img = self._render_local(p, tag)
+            if img is not None:
+                self._set_piece(p, tag, img)
+                continue
+            self.scheduler.submit(RenderJob(
+                self, "page" if tag is None else "tile", self.path, p, zoom,
+                rotation=self.doc[p].rotation, password=self.password,
+                clip=None if tag is None else self._clip(p, tag), tag=tag,
+                priority=PRIORITY_VISIBLE if rank < n_visible else PRIORITY_PREFETCH, rank=rank))
+
+    def _key(self, page: int, tag):
+        return self.page_key(page, self.zoom) + (tag if tag is not None else ())
+
+    def _clip(self, page: int, tag):
+        r = tile_rect(*tag, self.layout_.page_rect(page).size())
+        z = self.zoom
+        return fitz.Rect(r.x() / z, r.y() / z, (r.x() + r.width()) / z, (r.y() + r.height()) / z)
+
+    def _render_local(self, page: int, tag):
+        clip = None if tag is None else self._clip(page, tag)
+        with perf.span("render_local", page=page, zoom=self.zoom):
+            return render_image(self.doc[page], self.zoom, clip)
+
+    def _on_rendered(self, job, qimg):
+        if job.owner is not self or (job.page, job.tag) not in self._wanted:
+            return
+        if (job.zoom != self.zoom or job.page in self.dirty_pages
+                or job.rotation != self.doc[job.page].rotation):
+            return
+        self._set_piece(job.page, job.tag, qimg)
+
+    def _set_piece(self, page: int, tag, qimg):
+        self._images[(page, tag)] = qimg
+        if tag is None or all((page, t) in self._images for p, t in self._wanted if p == page):
+            self._stale.pop(page, None)
+        x, y = self._origin()
+        r = self.layout_.page_rect(page)
+        if tag is not None:
+            r = tile_rect(*tag, r.size()).translated(r.topLeft())
+        self.viewport().update(r.translated(x, y))
+
+    # ---------- Painting ---------- #
+    def paintEvent(self, e):
+        with perf.span("continuous_paint"):
+            p = QPainter(self.viewport())
+            p.fillRect(e.rect(), QColor(128, 128, 128))
+            x, y = self._origin()
+            p.translate(x, y)
+            area = e.rect().translated(-x, -y)
+            z = self.zoom
+            for page in self.layout_.pages_in(area.top(), area.bottom()):
+                r = self.layout_.page_rect(page)
+                p.fillRect(r, Qt.white)
+                img = self._images.get((page, None))
+                if img is not None:
+                    p.drawImage(r.topLeft(), img)
+                else:
+                    stale = self._stale.get(page)
+                    if stale is not None:
+                        p.drawImage(r, stale)
+                if img is None and not self._fits_full(page):
+                    for t in tiles_in(area.intersected(r).translated(-r.x(), -r.y()), r.size()):
+                        tile = self._images.get((page, t))
+                        if tile is not None:
+                            p.drawImage(tile_rect(*t, r.size()).topLeft() + r.topLeft(), tile)
+                hits, current, annots = self.overlay(page)
+                if hits or current is not None or annots:
+                    px = lambda h: to_pixels(h, z, r.x(), r.y())
+                    paint_overlay(p, [px(h) for h in hits], None if current is None else px(current),
+                                  [(kind, px(a)) for kind, a in annots])
+            p.end()
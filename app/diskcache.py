@@ -0,0 +1,165 @@
+"""
+Persistent cache of thumbnails and first-page renders, across sessions.
+
+Renders are keyed by the file they came from (real path, size and
+modification time, so a changed file never matches) and by their parameters,
+and stored compressed in an SQLite database next to the QSettings store:
+thumbnails as JPEG, pages losslessly as PNG. Reopening a known document then
+costs a decode per visible thumbnail instead of a render. Writes are queued
+and committed together every FLUSH_MS; past the byte cap, the least recently
+used entries are evicted.
+"""
+import os
+import sqlite3
+import time
+
+from PySide6.QtCore import QBuffer, QByteArray, QCoreApplication, QIODevice, QObject, QSettings, QTimer
+from PySide6.QtGui import QImage
+
+from app import perf
+from app.storage import data_file
+
+
+DISK_CACHE_DB = "renders.sqlite"
+DEFAULT_DISK_CACHE_MB = 256
+FLUSH_MS = 1000
+EVICT_TO = 0.9  # fraction of the cap left after an eviction pass
+FORMATS = {"thumb": ("JPG", 85), "page": ("PNG", 90)}  # kind -> (format, quality); PNG 90 = light compression
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS renders (
+    doc TEXT NOT NULL, item TEXT NOT NULL, data BLOB NOT NULL, used REAL NOT NULL,
+    PRIMARY KEY (doc, item));
+CREATE INDEX IF NOT EXISTS renders_used ON renders (used);
+"""
+
+
+def document_key(path: str) -> str:
+    """Identity of *path*'s current contents: real path, size and mtime."""
+    st = os.stat(path)
+    return f"{os.path.realpath(path)}|{st.st_size}|{st.st_mtime_ns}"
+
+
+def item_key(kind: str, page: int, zoom: float, rotation: int) -> str:
+    """Key of a *kind* ("thumb" or "page") render within its document."""
+    return f"{kind}:{page}:{zoom:g}:{rotation}"
+
+
+def encode(qimg: QImage, kind: str) -> bytes:
+    fmt, quality = FORMATS[kind]
+    data = QByteArray()
+    buf = QBuffer(data)
+    buf.open(QIODevice.WriteOnly)
+    qimg.save(buf, fmt, quality)
+    return data.data()
+
+
+def decode(data: bytes) -> QImage:
+    """The stored image, in the RGB888 format renders have."""
+    return QImage.fromData(data).convertToFormat(QImage.Format_RGB888)
+
+
+class DiskRenderCache(QObject):
+    """Byte-capped LRU store of renders in an SQLite database."""
+
+    def __init__(self, db_path: str = None, max_bytes: int = DEFAULT_DISK_CACHE_MB * 1024 * 1024,
+                 parent=None):
+        super().__init__(parent)
+        self.db_path = db_path or data_file(DISK_CACHE_DB)
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(self.db_path, timeout=5)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.bytes = self.conn.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM renders").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self._pending = {}     # (doc, item) -> QImage, written at the next flush
+        self._touched = set()  # (doc, item) read since the last flush
+        self._timer = QTimer(self, singleShot=True, interval=FLUSH_MS)
+        self._timer.timeout.connect(self.flush)
+
+    def get_many(self, doc: str, items) -> dict:
+        """Map each of *items* found for *doc* to its image."""
+        items = list(items)
+        found = {i: self._pending[(doc, i)] for i in items if (doc, i) in self._pending}
+        rest = [i for i in items if i not in found]
+        with perf.span("disk_cache_get", items=len(rest)):
+            for n in range(0, len(rest), 500):
+                chunk = rest[n:n + 500]
+                rows = self.conn.execute(
+                    f"SELECT item, data FROM renders WHERE doc = ? AND item IN ({','.join('?' * len(chunk))})",
+                    (doc, *chunk))
+                for item, data in rows:
+                    img = decode(data)
+                    if not img.isNull():
+                        found[item] = img
+                        self._touched.add((doc, item))
+        self.hits += len(found)
+        self.misses += len(items) - len(found)
+        if self._touched and not self._timer.isActive():
+            self._timer.start()
+        return found
+
+    def get(self, doc: str, item: str):
+        return self.get_many(doc, [item]).get(item)
+
+    def put(self, doc: str, item: str, qimg: QImage):
+        """Store *qimg*; it is compressed and written at the next flush."""
+        self._pending[(doc, item)] = qimg
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        """Write queued renders and access times, then evict past the cap."""
+        self._timer.stop()
+        if not self._pending and not self._touched:
+            return
+        pending, touched = self._pending, self._touched - set(self._pending)
+        self._pending, self._touched = {}, set()
+        now = time.time()
+        with perf.span("disk_cache_flush", items=len(pending)):
+            rows = [(doc, item, encode(img, item.split(":", 1)[0])) for (doc, item), img in pending.items()]
+            with self.conn:
+                for doc, item, data in rows:
+                    old = self.conn.execute("SELECT LENGTH(data) FROM renders WHERE doc = ? AND item = ?",
+                                            (doc, item)).fetchone()
+                    self.bytes += len(data) - (old[0] if old else 0)
+                    self.conn.execute("INSERT OR REPLACE INTO renders VALUES (?, ?, ?, ?)",
+                                      (doc, item, data, now))
+                self.conn.executemany("UPDATE renders SET used = ? WHERE doc = ? AND item = ?",
+                                      [(now, doc, item) for doc, item in touched])
+            self._evict()
+
+    def _evict(self):
+        if self.bytes <= self.max_bytes:
+            return
+        drop = []
+        for rowid, size in self.conn.execute("SELECT rowid, LENGTH(data) FROM renders ORDER BY used"):
+            if self.bytes <= self.max_bytes * EVICT_TO:
+                break
+            drop.append((rowid,))
+            self.bytes -= size
+        with self.conn:
+            self.conn.executemany("DELETE FROM renders WHERE rowid = ?", drop)
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+_shared = None
+
+
+def shared_disk_cache():
+    """The application-wide cache, sized by the "disk_cache_mb" setting;
+    None if that is 0 (disabled)."""
+    global _shared
+    if _shared is None:
+        app = QCoreApplication.instance()
+        mb = QSettings("Cephy", "PDFReader").value("disk_cache_mb", DEFAULT_DISK_CACHE_MB, type=int)
+        if mb <= 0:
+            return None
+        _shared = DiskRenderCache(max_bytes=mb * 1024 * 1024, parent=app)
+        if app is not None:
+            app.aboutToQuit.connect(_shared.flush)
+    return _shared
@@ -0,0 +1,127 @@
+"""
+Batch export of pages to image files.
+
+Pages are split into batches (pdfops.export_batches) that the "export" worker
+pool renders and writes straight to disk, each worker with its own open
+document, so the work scales with the cores and nothing but file names comes
+back to the GUI. At most EXPORT_INFLIGHT_PER_WORKER batches per worker are
+queued at a time, so cancelling is immediate and memory stays flat however
+many pages are exported.
+"""
+import os
+import time
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from app import pdfops, perf, workers
+from app.pdfops import EXPORT_INFLIGHT_PER_WORKER
+from app.tasks import when_done
+
+
+class ExportJob(QObject):
+    """Export 0-based *pages* of a document to *out_dir*; start() and keep a
+    reference.
+
+    Pages in *dirty_pages* have unsaved edits only *doc* knows about, so they
+    are rendered from it on the GUI thread, one per event-loop turn; the
+    others come from *path*, with the rotations *doc* has now.
+    """
+    progress = Signal(int, int)   # (pages written, pages to export)
+    finished = Signal(list)       # files written, in page order
+    failed = Signal(str)          # error message ("" when cancelled)
+
+    def __init__(self, doc, path: str, out_dir: str, pages, dpi: int = 150, fmt: str = "png",
+                 quality: int = 90, password: str = None, dirty_pages=(), parent=None):
+        super().__init__(parent)
+        self.doc = doc
+        self.path = path
+        self.password = password
+        self.pages = list(pages)
+        self.zoom = dpi / 72
+        self.fmt, self.quality = fmt, quality
+        self.outputs = pdfops.image_paths(out_dir, path, self.pages, len(doc), fmt)
+        self.cancelled = False
+        self.pages_done = 0
+        dirty = set(dirty_pages)
+        self._local = [(p, out) for p, out in zip(self.pages, self.outputs) if p in dirty]
+        remote = [(p, out) for p, out in zip(self.pages, self.outputs) if p not in dirty]
+        self._jobs = workers.export_workers()
+        self._plan = iter(pdfops.export_batches([p for p, _ in remote], [o for _, o in remote], self._jobs))
+        self._inflight = set()
+        self._started = None
+        self._local_timer = QTimer(self, singleShot=True, interval=0)
+        self._local_timer.timeout.connect(self._export_local)
+
+    def start(self):
+        self._started = time.perf_counter()
+        if not self.pages:
+            self._finish()
+            return
+        os.makedirs(os.path.dirname(self.outputs[0]) or ".", exist_ok=True)
+        self._fill()
+        if self._local:
+            self._local_timer.start()
+
+    def cancel(self):
+        self._stop("")
+
+    # ---------- Internals ---------- #
+    def _fill(self):
+        """Keep up to EXPORT_INFLIGHT_PER_WORKER batches per worker queued."""
+        pool = workers.get_pool("export", self._jobs)
+        while not self.cancelled and len(self._inflight) < self._jobs * EXPORT_INFLIGHT_PER_WORKER:
+            batch = next(self._plan, None)
+            if batch is None:
+                break
+            pages, outs = batch
+            fut = pool.submit(pdfops.export_batch, self.path, self.password, pages, outs, self.zoom,
+                              self.fmt, self.quality, [self.doc[p].rotation for p in pages])
+            self._inflight.add(fut)
+            when_done(fut, self._on_batch)
+
+    def _on_batch(self, fut):
+        if self.cancelled or fut not in self._inflight:
+            return
+        self._inflight.discard(fut)
+        err = fut.exception()
+        if err is not None:
+            self._stop(str(err))
+            return
+        self._advance(fut.result())
+        self._fill()
+
+    def _export_local(self):
+        if self.cancelled or not self._local:
+            return
+        p, out = self._local.pop(0)
+        try:
+            with perf.span("export_local", page=p):
+                pdfops.save_page_image(self.doc[p], out, self.zoom, self.fmt, self.quality)
+        except Exception as e:
+            self._stop(str(e))
+            return
+        self._advance(1)
+        if self._local:
+            self._local_timer.start()
+
+    def _advance(self, n: int):
+        self.pages_done += n
+        self.progress.emit(self.pages_done, len(self.pages))
+        if self.pages_done == len(self.pages):
+            self._finish()
+
+    def _finish(self):
+        perf.record("export_images", self._started, time.perf_counter() - self._started,
+                    pages=len(self.pages), format=self.fmt)
+        self.finished.emit(self.outputs)
+
+    def _stop(self, message: str):
+        """Cancel what is queued and report *message* ("" when cancelled)."""
+        if self.cancelled:
+            return
+        self.cancelled = True
+        for fut in self._inflight:
+            fut.cancel()
+        self._inflight.clear()
+        self._local_timer.stop()
+        self.failed.emit(message)
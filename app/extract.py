@@ -0,0 +1,64 @@
+"""
+Page extraction and splitting from an open document, without blocking.
+
+The copying, including the final save of each part, runs in a worker
+process (pdfops.extract_file_parts) that opens the tab's file itself. Pages
+the tab has edited since (annotations, rotations) are sent along as a small
+PDF snapshot of just those pages, so unsaved edits still come along. The
+GUI only relays progress; cancelling takes effect at the next
+EXTRACT_STEP_PAGES pages and drops the part being written.
+"""
+import time
+
+from PySide6.QtCore import QObject, Signal
+
+from app import pdfops, perf
+from app.tasks import BackgroundTask
+
+
+class ExtractJob(QObject):
+    """Write ``(out_path, spans)`` *parts* of the open *doc*, read from
+    *path*; start() and keep a reference. *edited_pages* have edits only
+    *doc* knows about."""
+    progress = Signal(int, int)   # (pages copied, pages to copy)
+    finished = Signal(list)       # files written, in order
+    failed = Signal(str)          # error message ("" when cancelled)
+
+    def __init__(self, doc, path: str, parts, password: str = None, edited_pages=(), parent=None):
+        super().__init__(parent)
+        self.doc = doc
+        self.path = path
+        self.password = password
+        self.parts = [(out, list(spans)) for out, spans in parts]
+        self.total = sum(last - first + 1 for _, spans in self.parts for first, last in spans)
+        self.edited_pages = set(edited_pages)
+        self.pages_done = 0
+        self.cancelled = False
+        self._task = None
+        self._started = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        wanted = sorted(p for p in self.edited_pages
+                        if any(first <= p <= last for _, spans in self.parts for first, last in spans))
+        edited = (pdfops.snapshot_pages(self.doc, wanted), wanted) if wanted else None
+        self._task = BackgroundTask(pdfops.extract_file_parts, self.path, self.parts,
+                                    password=self.password, edited=edited, pool="extract", parent=self)
+        self._task.progress.connect(self._on_progress)
+        self._task.finished.connect(self._on_finished)
+        self._task.failed.connect(self.failed)
+        self._task.start()
+
+    def cancel(self):
+        self.cancelled = True
+        if self._task is not None:
+            self._task.cancel()
+
+    def _on_progress(self, done: int, total: int):
+        self.pages_done = done
+        self.progress.emit(done, total)
+
+    def _on_finished(self, pages: int):
+        perf.record("extract_pages", self._started, time.perf_counter() - self._started,
+                    files=len(self.parts), pages=pages, edited=len(self.edited_pages))
+        self.finished.emit([out for out, _ in self.parts])
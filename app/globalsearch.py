@@ -0,0 +1,293 @@
+"""
+Search across documents: every open tab and, optionally, a folder of PDFs.
+
+Each file's pages are cut into SEARCH_CHUNK_PAGES-page chunks that the
+"search" worker pool, one process per core, works through concurrently.
+Pages an open tab has indexed already are answered from the text index in
+one task; the rest are scanned. Folder files are opened by their first chunk,
+which also reports how many more there are. Hits stream into a SearchPanel
+as chunks finish. A new query cancels the chunks still queued, and results
+of the ones being searched are dropped when they come back.
+"""
+from collections import namedtuple
+import bisect
+import os
+import time
+
+from PySide6.QtCore import QObject, Qt, Signal
+from PySide6.QtWidgets import (
+    QFileDialog, QHBoxLayout, QLabel, QLineEdit, QPushButton, QTreeWidget, QTreeWidgetItem,
+    QVBoxLayout, QWidget
+)
+
+from app import perf, textindex, workers
+from app.lazy import lazy_import
+from app.search import INDEX_DB
+from app.storage import data_file
+from app.tasks import when_done
+
+fitz = lazy_import("fitz")  # PyMuPDF
+
+
+SEARCH_CHUNK_PAGES = 50
+MAX_RESULT_PAGES = 5000  # pages with hits listed before a search stops
+
+# A file to search. Open tabs have a page count, and maybe an indexed part
+# (*doc_hash*, *indexed*) and recognized scans (*ocr*, a DocumentOcr).
+Target = namedtuple("Target", "path password name page_count doc_hash indexed ocr",
+                    defaults=(None, None, None, None, frozenset(), None))
+
+
+def folder_pdfs(folder: str):
+    """PDF files under *folder*, recursively, in a stable order."""
+    found = []
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        found.extend(os.path.join(root, f) for f in sorted(files) if f.lower().endswith(".pdf"))
+    return found
+
+
+class GlobalSearch(QObject):
+    """One cancellable search for *query* over *targets*; start() and keep a reference."""
+    hits = Signal(str, int, list, str)   # (path, page, rects, snippet)
+    file_failed = Signal(str, str)       # (path, error message)
+    progress = Signal(int, int)          # (pages searched, pages known so far)
+    finished = Signal()
+
+    def __init__(self, query: str, targets, db_path: str = None, parent=None):
+        super().__init__(parent)
+        self.query = query
+        self.targets = {t.path: t for t in targets}
+        self.db_path = db_path or data_file(INDEX_DB)
+        self.pages_total = sum(t.page_count or 0 for t in self.targets.values())
+        self.pages_done = 0
+        self.hit_pages = 0
+        self.cancelled = False
+        self._inflight = {}  # future -> (path, pages it covers)
+        self._started = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        for t in self.targets.values():
+            if t.ocr is not None:
+                for page, rects in sorted(t.ocr.search(self.query).items()):
+                    self._emit_hit(t.path, page, rects, textindex.snippet(t.ocr.pages[page][0], self.query))
+            if t.page_count is None:
+                self._submit_scan(t.path, range(SEARCH_CHUNK_PAGES))
+                continue
+            if t.doc_hash and t.indexed:
+                pages = sorted(t.indexed)
+                self._submit(self._on_indexed, t.path, pages,
+                             textindex.search_index, self.db_path, t.doc_hash, self.query, pages)
+            self._submit_rest(t, 0)
+        self._check_done()
+
+    def cancel(self):
+        self.cancelled = True
+        for fut in self._inflight:
+            fut.cancel()
+        self._inflight.clear()
+
+    def is_running(self) -> bool:
+        return not self.cancelled and bool(self._inflight)
+
+    # ---------- Internals ---------- #
+    def _submit(self, callback, path: str, pages, fn, *args):
+        if self.cancelled:
+            return
+        fut = workers.get_pool("search", workers.export_workers()).submit(fn, *args)
+        self._inflight[fut] = (path, pages)
+        when_done(fut, callback)
+
+    def _submit_scan(self, path: str, pages):
+        t = self.targets[path]
+        self._submit(self._on_scanned, path, pages, textindex.search_pages, path, t.password, self.query, pages)
+
+    def _submit_rest(self, t, first: int):
+        """Scan the pages from *first* on that are not indexed, chunk by chunk."""
+        todo = [p for p in range(first, t.page_count) if p not in t.indexed]
+        for i in range(0, len(todo), SEARCH_CHUNK_PAGES):
+            self._submit_scan(t.path, todo[i:i + SEARCH_CHUNK_PAGES])
+
+    def _take(self, fut):
+        """(path, pages) of a chunk that came back, or None if it is stale."""
+        if self.cancelled or fut not in self._inflight:
+            return None
+        path, pages = self._inflight.pop(fut)
+        if fut.exception() is not None:
+            self.file_failed.emit(path, str(fut.exception()))
+            self._check_done()
+            return None
+        return path, pages
+
+    def _on_indexed(self, fut):
+        taken = self._take(fut)
+        if taken is None:
+            return
+        path, pages = taken
+        self._chunk_done(path, len(pages), fut.result())
+
+    def _on_scanned(self, fut):
+        taken = self._take(fut)
+        if taken is None:
+            return
+        path, pages = taken
+        count, found = fut.result()
+        t = self.targets[path]
+        if t.page_count is None:  # a folder file's first chunk
+            self.targets[path] = t = t._replace(page_count=count)
+            self.pages_total += count
+            self._submit_rest(t, len(pages))
+        self._chunk_done(path, len([p for p in pages if p < count]), found)
+
+    def _chunk_done(self, path: str, pages: int, found):
+        self.pages_done += pages
+        for page, rects, snippet in found:
+            self._emit_hit(path, page, [fitz.Rect(r) for r in rects], snippet)
+        self.progress.emit(self.pages_done, self.pages_total)
+        self._check_done()
+
+    def _emit_hit(self, path: str, page: int, rects, snippet: str):
+        if self.cancelled:
+            return
+        self.hit_pages += 1
+        self.hits.emit(path, page, rects, snippet)
+        if self.hit_pages >= MAX_RESULT_PAGES:
+            self.cancel()
+            self._finish()
+
+    def _check_done(self):
+        if not self.cancelled and not self._inflight:
+            self._finish()
+
+    def _finish(self):
+        perf.record("search_everywhere", self._started, time.perf_counter() - self._started,
+                    files=len(self.targets), pages=self.pages_done, hit_pages=self.hit_pages)
+        self.finished.emit()
+
+
+class SearchPanel(QWidget):
+    """The query and folder of a search everywhere, and the results of a
+    GlobalSearch grouped by file and page."""
+    activated = Signal(str, int)      # (path, page) of a result clicked
+    search_requested = Signal(str)    # query entered ("" when cleared)
+    query_edited = Signal(str)        # query being typed
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.query_edit = QLineEdit(self, placeholderText="Search all documents…", clearButtonEnabled=True)
+        self.query_edit.returnPressed.connect(lambda: self.search_requested.emit(self.query()))
+        self.query_edit.textEdited.connect(self._on_edited)
+        self.folder_edit = QLineEdit(self, readOnly=True, placeholderText="Open tabs only")
+        choose, clear = QPushButton("Folder…"), QPushButton("Clear")
+        choose.clicked.connect(self._choose_folder)
+        clear.clicked.connect(lambda: self.folder_edit.clear())
+        row = QHBoxLayout()
+        row.addWidget(self.folder_edit)
+        row.addWidget(choose)
+        row.addWidget(clear)
+        self.summary = QLabel(self)
+        self.tree = QTreeWidget(self)
+        self.tree.setHeaderHidden(True)
+        self.tree.itemActivated.connect(self._on_item)
+        self.tree.itemClicked.connect(self._on_item)
+        lay = QVBoxLayout(self)
+        lay.setContentsMargins(4, 4, 4, 4)
+        lay.addWidget(self.query_edit)
+        lay.addLayout(row)
+        lay.addWidget(self.summary)
+        lay.addWidget(self.tree)
+        self._search = None
+        self._files = {}  # path -> (file item, its pages in order)
+
+    def query(self) -> str:
+        return self.query_edit.text().strip()
+
+    def focus_query(self, text: str = ""):
+        """Put the cursor in the query field, filled with *text* if it is empty."""
+        if text and not self.query():
+            self.query_edit.setText(text)
+        self.query_edit.setFocus()
+        self.query_edit.selectAll()
+
+    def clear(self):
+        """Drop the results listed."""
+        self.tree.clear()
+        self._files.clear()
+        self._search = None
+        self.summary.clear()
+
+    def folder(self) -> str:
+        return self.folder_edit.text()
+
+    def set_folder(self, folder: str):
+        self.folder_edit.setText(folder or "")
+
+    def show_search(self, search: GlobalSearch):
+        """List the results of *search* (not started yet) as they come in."""
+        self.tree.clear()
+        self._files.clear()
+        self._search = search
+        self.summary.setText(f"Searching for \"{search.query}\"…")
+        search.hits.connect(self._add_hit)
+        search.file_failed.connect(self._add_failure)
+        search.progress.connect(self._update_summary)
+        search.finished.connect(self._update_summary)
+
+    # ---------- Internals ---------- #
+    def _on_edited(self, text: str):
+        self.query_edited.emit(text)
+        if not text.strip():  # cleared: no query, no results
+            self.search_requested.emit("")
+
+    def _choose_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Search PDFs in Folder", self.folder())
+        if folder:
+            self.set_folder(folder)
+
+    def _file_item(self, path: str):
+        entry = self._files.get(path)
+        if entry is None:
+            item = QTreeWidgetItem(self.tree)
+            item.setData(0, Qt.UserRole, (path, None))
+            item.setToolTip(0, path)
+            item.setExpanded(True)
+            entry = self._files[path] = (item, [])
+        return entry
+
+    def _file_label(self, path: str) -> str:
+        t = self._search.targets.get(path)
+        if t is not None and t.name:
+            return t.name
+        folder = self.folder()
+        return os.path.relpath(path, folder) if folder and path.startswith(folder) else os.path.basename(path)
+
+    def _add_hit(self, path: str, page: int, rects, snippet: str):
+        item, pages = self._file_item(path)
+        pos = bisect.bisect_left(pages, page)
+        pages.insert(pos, page)
+        child = QTreeWidgetItem([f"p. {page + 1} · {len(rects)} — {snippet}"])
+        child.setData(0, Qt.UserRole, (path, page))
+        child.setToolTip(0, snippet)
+        item.insertChild(pos, child)
+        item.setText(0, f"{self._file_label(path)} ({len(pages)} pages)")
+
+    def _add_failure(self, path: str, message: str):
+        item, pages = self._file_item(path)
+        if not pages:
+            item.setText(0, f"{self._file_label(path)} — {message}")
+
+    def _update_summary(self, *_):
+        s = self._search
+        found = f"{s.hit_pages} pages in {sum(1 for _, pages in self._files.values() if pages)} files"
+        if s.is_running():
+            self.summary.setText(f"Searching… {found} ({s.pages_done}/{s.pages_total} pages)")
+        else:
+            self.summary.setText(f"\"{s.query}\": {found}" if s.hit_pages else f"No hits for \"{s.query}\"")
+
+    def _on_item(self, item, _column=0):
+        path, page = item.data(0, Qt.UserRole)
+        if page is None:  # a file: its first page with hits
+            pages = self._files[path][1]
+            page = pages[0] if pages else 0
+        self.activated.emit(path, page)
@@ -0,0 +1,141 @@
+"""
+Undo/redo journal of the edits made to an open document.
+
+Each edit knows how to apply itself to a PyMuPDF document and how to revert
+it; the journal keeps them in order, so undo/redo only touch the one page an
+edit concerns. Qt-free.
+"""
+from abc import ABC, abstractmethod
+
+from app.lazy import lazy_import
+
+fitz = lazy_import("fitz")  # PyMuPDF
+
+
+class Rotate:
+    """Set page *page*'s rotation from *before* to *after* degrees."""
+    content = False  # only the page's orientation changes, not what is drawn on it
+
+    def __init__(self, page: int, before: int, after: int):
+        self.page, self.before, self.after = page, before, after
+
+    def apply(self, doc):
+        doc[self.page].set_rotation(self.after)
+
+    def revert(self, doc):
+        doc[self.page].set_rotation(self.before)
+
+
+class _AddAnnots(ABC):
+    """Annotations added to one page; reverted by deleting them again."""
+    content = True
+
+    def __init__(self, page: int):
+        self.page = page
+        self.xrefs = []
+
+    def apply(self, doc):
+        page = doc[self.page]  # annotations only hold a weak reference to it
+        self.xrefs = []
+        for annot in self._add(page):
+            annot.update()
+            self.xrefs.append(annot.xref)
+
+    def revert(self, doc):
+        page = doc[self.page]
+        for xref in self.xrefs:
+            page.delete_annot(page.load_annot(xref))
+        self.xrefs = []
+
+    @abstractmethod
+    def _add(self, page):
+        """Add the annotations to *page*; returns them."""
+
+    @abstractmethod
+    def overlay(self):
+        """``(kind, fitz.Rect)`` items to draw until the page is re-rasterized."""
+
+
+class AddHighlights(_AddAnnots):
+    """Highlight annotations over *rects* (page points) of page *page*."""
+
+    def __init__(self, page: int, rects):
+        super().__init__(page)
+        self.rects = [fitz.Rect(r) for r in rects]
+
+    def _add(self, page):
+        return [page.add_highlight_annot(r) for r in self.rects]
+
+    def overlay(self):
+        return [("highlight", r) for r in self.rects]
+
+
+class AddNote(_AddAnnots):
+    """A text note at *point* of page *page*."""
+
+    def __init__(self, page: int, point, text: str):
+        super().__init__(page)
+        self.point, self.text = fitz.Point(point), text
+        self.rect = None
+
+    def _add(self, page):
+        annot = page.add_text_annot(self.point, self.text)
+        self.rect = fitz.Rect(annot.rect)
+        return [annot]
+
+    def overlay(self):
+        return [("note", self.rect)]
+
+
+class Journal:
+    """Applied edits, in order, with the undone ones kept for redo."""
+
+    def __init__(self):
+        self._done = []
+        self._undone = []
+        self._saved = None  # last edit applied when the document was saved
+        self._touched = set()
+
+    def apply(self, doc, edit):
+        """Apply *edit* to *doc* and record it; clears the redo history."""
+        edit.apply(doc)
+        self._touched.add(edit.page)
+        self._done.append(edit)
+        self._undone.clear()
+        return edit
+
+    def undo(self, doc):
+        """Revert the last edit; returns it, or None if there is none."""
+        if not self._done:
+            return None
+        edit = self._done.pop()
+        edit.revert(doc)
+        self._touched.add(edit.page)
+        self._undone.append(edit)
+        return edit
+
+    def redo(self, doc):
+        """Re-apply the last undone edit; returns it, or None if there is none."""
+        if not self._undone:
+            return None
+        edit = self._undone.pop()
+        edit.apply(doc)
+        self._done.append(edit)
+        return edit
+
+    def touched_pages(self) -> set:
+        """Pages any edit, undo or redo has changed since opening."""
+        return set(self._touched)
+
+    def can_undo(self) -> bool:
+        return bool(self._done)
+
+    def can_redo(self) -> bool:
+        return bool(self._undone)
+
+    def mark_saved(self):
+        self._saved = self._done[-1] if self._done else None
+
+    def is_modified(self) -> bool:
+        """Whether the document differs from what was last saved (or opened)."""
+        return (self._done[-1] if self._done else None) is not self._saved
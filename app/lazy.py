@@ -0,0 +1,27 @@
+"""
+Deferred imports for heavy modules.
+
+``fitz = lazy_import("fitz")`` binds a module object whose code runs on the
+first attribute access, so PyMuPDF and pypdf stay off the start-up path until
+a document is opened (or a merge/extract/encrypt runs). Lazy modules are not
+seen by PyInstaller's import scan; list them in main.spec's hiddenimports.
+"""
+import importlib.util
+import sys
+
+
+def lazy_import(name: str):
+    """Module *name*, imported for real when first used."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
@@ -1,20 +1,40 @@
+import bisect
+import logging
+import multiprocessing
 import os
 import sys
-import fitz  # PyMuPDF
-import pypdf
+import time
 from PySide6.QtCore import QSettings
-from PySide6.QtCore import Qt, QSize
-from PySide6.QtPrintSupport import QPrinter, QPrintDialog
+from PySide6.QtCore import Qt, QSize, QTimer, Signal
 from PySide6.QtGui import QIcon
 
 from PySide6.QtGui import (
-    QAction, QIcon, QImage, QKeySequence, QPainter, QColor, QPixmap
+    QAction, QIcon, QImage, QKeySequence
 )
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QFileDialog, QMessageBox, QTabWidget, QWidget,
-    QSplitter, QScrollArea, QLabel, QListWidget, QListWidgetItem, QToolBar,
-    QStyle, QSpinBox, QLineEdit, QPushButton, QHBoxLayout, QVBoxLayout, QInputDialog
+    QSplitter, QScrollArea, QStackedWidget, QLabel, QToolBar,
+    QStyle, QSpinBox, QLineEdit, QPushButton, QHBoxLayout, QVBoxLayout, QInputDialog,
+    QProgressDialog, QDialog, QDialogButtonBox, QFormLayout, QComboBox, QDockWidget
 )
+from app import journal, ocr, pdfops, perf, rasterize, workers
+from app.cache import PageCache, DEFAULT_PAGE_CACHE_MB
+from app.continuous import ContinuousView
+from app.diskcache import document_key, item_key, shared_disk_cache
+from app.export import ExportJob
+from app.extract import ExtractJob
+from app.globalsearch import GlobalSearch, SearchPanel, Target, folder_pdfs
+from app.lazy import lazy_import
+from app.pageview import PageCanvas, TILE_SIZE, FULL_RENDER_MAX_PIXELS, PREVIEW_MAX_PIXELS, tile_rect, tiles_in, to_pixels
+from app.search import DocumentIndexer, DocumentOcr, SearchRun
+from app.source import STDIN, DocumentSource
+from app.tabs import TabManager, MAX_AWAKE_TABS, TAB_MEMORY_BUDGET_MB
+from app.tasks import BackgroundTask, when_done
+from app.render import RenderJob, image_from_samples, render_image, shared_scheduler, PRIORITY_PREFETCH
+from app.thumbnails import ThumbnailModel, ThumbnailView
+
+# Loaded on first use; see app.lazy. Printing support is imported in action_print.
+fitz = lazy_import("fitz")  # PyMuPDF
 
 def resource_path(relative_path):
     """Get absolute path to resource (works for dev + PyInstaller exe)."""
@@ -22,91 +42,560 @@ def resource_path(relative_path):
         return os.path.join(sys._MEIPASS, relative_path)
     return os.path.join(os.path.abspath("."), relative_path)
 
+PREFETCH_PAGES = 2  # pages rendered ahead/behind the current one
+FIRST_PAGE_BUDGET_MS = 200  # target from starting to open a file to its first page on screen
+OCR_START_MS = 1000  # OCR starts this long after opening, once the first page is up
+OCR_AHEAD_PAGES = 3  # pages from the current one recognized before the rest
+
+log = logging.getLogger(__name__)
+
+
+def log_open_timings(path: str, timings: dict):
+    """Log the per-phase open timings of *path*; warn when over budget."""
+    phases = ", ".join(f"{k[:-3]} {v:.0f} ms" for k, v in timings.items())
+    if timings.get("first_page_ms", 0) > FIRST_PAGE_BUDGET_MS:
+        log.warning("slow open of %s (budget %d ms): %s", path, FIRST_PAGE_BUDGET_MS, phases)
+    else:
+        log.info("opened %s: %s", path, phases)
+
+
 # ------------------------- Helper widgets ------------------------- #
 class PDFTab(QWidget):
-    def __init__(self, file_path: str, parent=None, password: str = None):
+    search_progress = Signal(int, int, int)  # (hits so far, pages searched, page count)
+    page_changed = Signal(int)               # current page moved by scrolling (continuous mode)
+    edited = Signal()                        # an edit was made, undone or redone, or saved
+
+    def __init__(self, file_path: str, parent=None, password: str = None, first_page=None,
+                 source: DocumentSource = None):
+        """*first_page* optionally is page 0 already rendered at zoom 1 (as
+        returned by rasterize.render_page), e.g. by a background open.
+        *source* is given for documents not opened from *file_path* itself
+        (a stream spooled to it)."""
         super().__init__(parent)
-        self.file_path = file_path
-        # Open with password if given
-        self.doc = fitz.open(file_path)
-        if self.doc.needs_pass:
-            if not password or not self.doc.authenticate(password):
-                raise RuntimeError("Password required or incorrect")
-
+        t_open = time.perf_counter()
+        self.source = source or DocumentSource(file_path)
+        self.file_path = file_path = self.source.path
+        self.password = password
+        self.doc = self.source.open(password)  # the one parse everything in this process uses
+        # Thumbnails and the first page are kept across sessions, unless the
+        # document only exists for this one (a spooled stream).
+        self.disk_cache = shared_disk_cache()
+        self.doc_key = self._document_key()
+        self.open_timings = {"fitz_open_ms": (time.perf_counter() - t_open) * 1000}
 
         self.zoom = 1.0
         self.current_page = 0
+        self._opened_at = t_open          # until the first page is up
+        self._render_requested = None     # perf_counter() of the pending render_page
+
+        # Rendering: pages go to the background workers, except pages with
+        # unsaved annotation edits, which only this process' doc knows about.
+        self.scheduler = shared_scheduler()
+        self.scheduler.rendered.connect(self._on_page_rendered)
+        self.scheduler.failed.connect(self._on_page_failed)
+        self.dirty_pages = set()
+        self.page_revisions = {}  # page -> annotation edit counter
+        self.pending_annots = {}  # page -> [(kind, rect)] drawn as overlay until next rasterized
+        self.journal = journal.Journal()  # rotations and annotations, for undo/redo
+        self.hibernated = False           # document closed until the tab is shown again
+        self._wake_state = None           # (page count, continuous mode) when hibernated
+        self._jobs = set()                # export/extract/print jobs reading self.doc
+        self._page_job = None
+        self._tiled_key = None
+        cache_mb = QSettings("Cephy", "PDFReader").value("page_cache_mb", DEFAULT_PAGE_CACHE_MB, type=int)
+        self.page_cache = PageCache(cache_mb * 1024 * 1024)
 
         # Search state
         self.search_query = ""
         self.search_hits_by_page = {}
         self.flat_hits = []
         self.current_hit_idx = -1
+        self._hit_pages = []  # page of each entry in flat_hits, for bisecting
+        self._reveal_hit = False  # scroll the current hit into view once its page is up
+        self._search = None
+        # Text index, filled in the background once the first page is up
+        self.indexer = DocumentIndexer(file_path, len(self.doc), password=password, parent=self)
+        # Text of scanned pages, recognized in the background (if Tesseract is installed)
+        self.ocr = DocumentOcr(file_path, len(self.doc), password=password, parent=self)
+        self.ocr.recognized.connect(self._on_ocr_pages)
+        self.ocr_enabled = QSettings("Cephy", "PDFReader").value("ocr_enabled", True, type=bool)
 
         # --- UI ---
         self.splitter = QSplitter(Qt.Horizontal, self)
 
-        # Left: thumbnails
-        self.thumb_list = QListWidget()
+        # Left: thumbnails (rendered lazily for the visible rows only)
+        self.thumb_model = ThumbnailModel(
+            self.doc, scheduler=self.scheduler, path=file_path, password=password,
+            dirty_pages=self.dirty_pages, disk_cache=self.disk_cache, doc_key=self.doc_key, parent=self)
+        self.thumb_list = ThumbnailView()
         self.thumb_list.setIconSize(QSize(120, 160))
-        self.thumb_list.setViewMode(QListWidget.IconMode)
-        self.thumb_list.setResizeMode(QListWidget.Adjust)
         self.thumb_list.setSpacing(8)
-        self.thumb_list.currentRowChanged.connect(self.on_thumbnail_selected)
-
-        # Center: page view
-        self.page_label = QLabel("Loading...")
-        self.page_label.setAlignment(Qt.AlignCenter)
+        self.thumb_list.setModel(self.thumb_model)
+        self.thumb_list.selectionModel().currentRowChanged.connect(
+            lambda cur, _prev: self.on_thumbnail_selected(cur.row()))
 
+        # Center: page view (whole image, or tiles at high zoom)
+        self.canvas = PageCanvas()
         self.scroll = QScrollArea()
-        self.scroll.setWidgetResizable(True)
-        self.scroll.setWidget(self.page_label)
+        self.scroll.setAlignment(Qt.AlignCenter)
+        self.scroll.setWidget(self.canvas)
+        self._tile_timer = QTimer(self, singleShot=True, interval=0)
+        self._tile_timer.timeout.connect(self.request_tiles)
+        self.scroll.horizontalScrollBar().valueChanged.connect(lambda _v: self._tile_timer.start())
+        self.scroll.verticalScrollBar().valueChanged.connect(lambda _v: self._tile_timer.start())
+
+        # Continuous mode swaps in a virtualized all-pages view (created on first use)
+        self.continuous = None
+        self.view_stack = QStackedWidget()
+        self.view_stack.addWidget(self.scroll)
 
         self.splitter.addWidget(self.thumb_list)
-        self.splitter.addWidget(self.scroll)
+        self.splitter.addWidget(self.view_stack)
         self.splitter.setStretchFactor(1, 1)
 
         lay = QHBoxLayout(self)
         lay.addWidget(self.splitter)
+        self.open_timings["ui_ms"] = (time.perf_counter() - t_open) * 1000 - self.open_timings["fitz_open_ms"]
+
+        # First page: use the one rendered in the background or kept from an
+        # earlier session if we have it, else render it right here; any of
+        # these beats a round trip to render workers that may still be
+        # starting. Everything else is deferred.
+        t_first = time.perf_counter()
+        if first_page is not None:
+            self.page_cache.put(self.page_key(0), image_from_samples(*first_page))
+            self._keep_first_page()
+        elif len(self.doc) and self._fits_full(0):
+            cached = self._disk_item(self._first_page_item())
+            if cached is not None:
+                self.page_cache.put(self.page_key(0), cached)
+            else:
+                self._render_local(0)
+                self._keep_first_page()
+        self.open_timings["first_render_ms"] = (time.perf_counter() - t_first) * 1000
+        self.render_page()
+        perf.record("open", t_open, time.perf_counter() - t_open, pages=len(self.doc))
+        QTimer.singleShot(500, self.indexer.start)
+        QTimer.singleShot(OCR_START_MS, self.start_ocr)
+
+    def _document_key(self):
+        """The disk cache's key for the file as it is now; None if not cached."""
+        if self.disk_cache is None or self.source.spooled:
+            return None
+        return document_key(self.file_path)
+
+    def _refresh_doc_key(self):
+        """The file changed (saved, or reopened): key its renders anew."""
+        self.thumb_model.doc_key = self.doc_key = self._document_key()
+
+    def _first_page_item(self) -> str:
+        return item_key("page", 0, self.zoom, self.doc[0].rotation)
+
+    def _disk_item(self, item: str):
+        if self.disk_cache is None or not self.doc_key:
+            return None
+        return self.disk_cache.get(self.doc_key, item)
+
+    def _keep_first_page(self):
+        """Store the first page's render for the next session."""
+        img = self.page_cache.get(self.page_key(0))
+        if img is not None and self.disk_cache is not None and self.doc_key:
+            self.disk_cache.put(self.doc_key, self._first_page_item(), img)
+
+    # ---------- Resources ---------- #
+    def memory_bytes(self) -> int:
+        """Bytes of rasters the tab holds: page cache, thumbnails and the
+        continuous view. The document's own memory is not counted."""
+        n = self.page_cache.bytes + self.thumb_model.cache_bytes()
+        if self.continuous is not None:
+            n += self.continuous.resident_bytes()
+        return n
+
+    def busy(self) -> bool:
+        """Whether a search or a job is still reading the document."""
+        return bool(self._jobs) or self.search_running()
+
+    def track_job(self, job):
+        """Keep the tab awake while *job* (an export/extract/print job) runs."""
+        self._jobs.add(job)
+        job.finished.connect(lambda *_: self._jobs.discard(job))
+        job.failed.connect(lambda *_: self._jobs.discard(job))
+        return job
+
+    def hibernate(self) -> bool:
+        """Close the document and drop every raster, keeping the page, zoom,
+        scroll position, search hits and undo history; wake() reopens it.
+        Tabs with unsaved edits or running jobs are left alone. Returns
+        whether the tab hibernated."""
+        if self.hibernated or self.busy() or self.journal.is_modified():
+            return False
+        self._wake_state = (len(self.doc), self.continuous_mode())
+        self.cancel_search()  # finished; its hits stay
+        self.scheduler.cancel(owner=self)
+        self._page_job = self._tiled_key = None
+        self.indexer.stop()
+        self.ocr.stop()
+        self.thumb_model.set_document(None)
+        if self.continuous is not None:
+            self.continuous.release()
+        self.page_cache.clear()
+        self.canvas.clear()
+        self.doc.close()
+        self.doc = None
+        self.hibernated = True
+        return True
 
-        self.populate_thumbnails()
+    def wake(self):
+        """Reopen a hibernated tab where it was left. The current page is
+        rendered right here, as on open, not after a round trip to the
+        render workers. Raises if the file is gone or has changed."""
+        if not self.hibernated:
+            return
+        t0 = time.perf_counter()
+        pages, continuous = self._wake_state
+        doc = self.source.open(self.password)
+        if len(doc) != pages:
+            doc.close()
+            raise RuntimeError(f"{self.source.name} has changed on disk")
+        self.doc = doc
+        self.hibernated = False
+        self._refresh_doc_key()
+        self.thumb_model.set_document(doc)
+        if self.continuous is not None:
+            self.continuous.set_document(doc)
+        if continuous != self.continuous_mode():
+            self.set_continuous(continuous)
+        elif not continuous and self._fits_full(self.current_page):
+            self._render_local(self.current_page)
         self.render_page()
+        self.thumb_list.schedule_visible()
+        if not self.indexer.is_complete():
+            self.indexer.start()
+        self.start_ocr()
+        perf.record("wake", t0, time.perf_counter() - t0, pages=pages)
+
+    def release(self):
+        """Free everything for good, when the tab is closed: running jobs,
+        renders, the document and a spooled source."""
+        for job in list(self._jobs):
+            job.cancel()
+        self.cancel_search()
+        self.search_hits_by_page.clear()
+        self.flat_hits.clear()
+        self._hit_pages.clear()
+        self.indexer.stop()
+        self.ocr.stop()
+        self.scheduler.cancel(owner=self)
+        self.scheduler.rendered.disconnect(self._on_page_rendered)
+        self.scheduler.failed.disconnect(self._on_page_failed)
+        self.thumb_model.set_document(None)
+        if self.continuous is not None:
+            self.continuous.release()
+        self.page_cache.clear()
+        self.canvas.clear()
+        if self.doc is not None:
+            self.doc.close()
+            self.doc = None
+        self.source.close()
 
     # ---------- Rendering ---------- #
     def render_page(self):
         if not self.doc:
             return
-        page = self.doc[self.current_page]
-        mat = fitz.Matrix(self.zoom, self.zoom)
-        pix = page.get_pixmap(matrix=mat, alpha=False)  # white background
-
-        qimg = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888).copy()
-
-        # Draw search highlights
-        if self.search_query and self.current_page in self.search_hits_by_page:
-            painter = QPainter(qimg)
-            painter.setPen(Qt.NoPen)
-            color = QColor(255, 235, 59, 120)
-            painter.setBrush(color)
-            for r in self.search_hits_by_page[self.current_page]:
-                x0, y0, x1, y1 = r.x0 * self.zoom, r.y0 * self.zoom, r.x1 * self.zoom, r.y1 * self.zoom
-                painter.drawRect(int(x0), int(y0), int(x1 - x0), int(y1 - y0))
-            painter.end()
-
-        self.page_label.setPixmap(QPixmap.fromImage(qimg))
-        self.thumb_list.blockSignals(True)
-        self.thumb_list.setCurrentRow(self.current_page)
-        self.thumb_list.blockSignals(False)
+        self._prioritize_ocr()
+        with perf.span("render_page", page=self.current_page, zoom=self.zoom):
+            self.thumb_list.set_current_row(self.current_page)
+            if self.continuous_mode():
+                self.continuous.set_zoom(self.zoom)
+                self.continuous.refresh()
+                return
+            self._render_requested = time.perf_counter()
+            self._commit_edits(self.current_page)
+            size = self.page_pixel_size(self.current_page)
+            if size.width() * size.height() > FULL_RENDER_MAX_PIXELS:
+                self._render_tiled(size)
+            else:
+                self._render_full()
+            self._update_highlights()
+            self._reveal_current_hit()
+            self.prefetch_around(self.current_page)
+
+    def page_ready(self) -> bool:
+        """Whether the current page is fully drawn at the current zoom."""
+        if self.continuous_mode():
+            return self.continuous.is_complete()
+        if self.canvas.tiled:
+            return self.canvas.is_complete()
+        # MuPDF rounds pixmap sizes up, page_pixel_size() rounds down.
+        have, want = self.canvas.size(), self.page_pixel_size(self.current_page)
+        return (self._page_job is None and self.canvas.is_complete()
+                and abs(have.width() - want.width()) <= 1 and abs(have.height() - want.height()) <= 1)
+
+    def page_key(self, index: int, zoom: float = None):
+        """Cache key of *index* at *zoom* (default: current) and its edit state."""
+        return (index, self.zoom if zoom is None else zoom,
+                self.doc[index].rotation, self.page_revisions.get(index, 0))
+
+    def page_pixel_size(self, index: int, zoom: float = None) -> QSize:
+        r = self.doc[index].rect
+        z = self.zoom if zoom is None else zoom
+        return QSize(max(1, int(r.width * z)), max(1, int(r.height * z)))
+
+    def _render_full(self):
+        key = self.page_key(self.current_page)
+        cached = self.page_cache.get(key)
+        if cached is not None:
+            self._page_job = None
+            self.scheduler.cancel(owner=self, kind="page")
+            self.show_page_image(cached)
+        elif self.current_page in self.dirty_pages:
+            self._page_job = None
+            self.scheduler.cancel(owner=self, kind="page")
+            self.show_page_image(self._render_local(self.current_page))
+        elif not (self._page_job and self._page_job.page == self.current_page
+                  and self._job_current(self._page_job)):
+            self.scheduler.cancel(owner=self, kind="page")
+            self._page_job = self._find_prefetch(self.current_page)
+            if self._page_job is not None:
+                self.scheduler.promote(self._page_job, kind="page")
+            else:
+                self._page_job = self._make_job("page", self.current_page)
+                self.scheduler.submit(self._page_job)
+
+    def _render_tiled(self, size: QSize):
+        """Show a low-res preview now and rasterize only the visible tiles."""
+        self._page_job = None
+        self.scheduler.cancel(owner=self, kind="page")
+        key = self.page_key(self.current_page)
+        if not (self.canvas.tiled and self._tiled_key == key):
+            self._tiled_key = key
+            pzoom = self.preview_zoom(self.current_page)
+            preview = self.page_cache.get(self.page_key(self.current_page, pzoom))
+            self.canvas.show_tiled(size, preview)
+            self.scheduler.cancel(owner=self, kind="preview")
+            if preview is None and self.current_page not in self.dirty_pages:
+                self.scheduler.submit(self._make_job("preview", self.current_page, zoom=pzoom))
+            elif preview is None:
+                self.canvas.set_preview(self._render_local(self.current_page, pzoom))
+        self._tile_timer.start()
+
+    def preview_zoom(self, index: int) -> float:
+        r = self.doc[index].rect
+        return min(self.zoom, (PREVIEW_MAX_PIXELS / max(1.0, r.width * r.height)) ** 0.5)
+
+    def request_tiles(self):
+        """Rasterize the tiles in (or just around) the viewport; drop the rest."""
+        if not self.canvas.tiled:
+            return
+        index, size = self.current_page, self.canvas.size()
+        m = TILE_SIZE // 2
+        want = tiles_in(self.canvas.visible_rect().adjusted(-m, -m, m, m), size)
+        if index in self.pending_annots and not all(self.canvas.has_tile(*t) for t in want):
+            self.render_page()  # new tiles would include the edits: re-tile with them
+            return
+        wanted = set(want)
+        self.canvas.retain_tiles(wanted)
+        self.scheduler.cancel(owner=self, kind="tile",
+                              keep=lambda j: j.page == index and j.tag in wanted and self._job_current(j))
+        queued = {j.tag for j in self.scheduler.pending(owner=self, kind="tile")}
+        key = self.page_key(index)
+        for rank, (tx, ty) in enumerate(want):
+            if self.canvas.has_tile(tx, ty) or (tx, ty) in queued:
+                continue
+            img = self.page_cache.get(key + (tx, ty))
+            if img is None and index in self.dirty_pages:
+                img = self._render_local(index, clip=(tx, ty))
+            if img is not None:
+                self.canvas.set_tile(tx, ty, img)
+                continue
+            self.scheduler.submit(self._make_job("tile", index, clip=self._tile_clip(tx, ty),
+                                                 tag=(tx, ty), rank=rank))
+        if self.canvas.is_complete():
+            self._page_shown()
+
+    def _tile_clip(self, tx: int, ty: int):
+        r = tile_rect(tx, ty, self.page_pixel_size(self.current_page))
+        z = self.zoom
+        return fitz.Rect(r.x() / z, r.y() / z, (r.x() + r.width()) / z, (r.y() + r.height()) / z)
+
+    def _make_job(self, kind: str, index: int, zoom: float = None, **kw):
+        return RenderJob(self, kind, self.file_path, index, self.zoom if zoom is None else zoom,
+                         rotation=self.doc[index].rotation, password=self.password, **kw)
+
+    def _job_current(self, job) -> bool:
+        """Whether *job* still matches the page's zoom, rotation and edit state."""
+        return ((job.zoom == self.zoom or job.kind == "preview") and job.page not in self.dirty_pages
+                and job.rotation == self.doc[job.page].rotation)
+
+    def _find_prefetch(self, index: int):
+        for job in self.scheduler.pending(owner=self, kind="prefetch"):
+            if job.page == index and self._job_current(job):
+                return job
+        return None
+
+    def prefetch_around(self, index: int, k: int = PREFETCH_PAGES):
+        """Queue renders of pages index±1..k at the current zoom, nearest first."""
+        order = []
+        for d in range(1, k + 1):
+            order += [p for p in (index + d, index - d) if 0 <= p < len(self.doc)]
+        # Pages that would be tiled are not worth rendering whole in advance.
+        order = [p for p in order if self._fits_full(p)]
+        wanted = set(order)
+        self.scheduler.cancel(owner=self, kind="prefetch",
+                              keep=lambda j: j.page in wanted and self._job_current(j))
+        queued = {j.page for j in self.scheduler.pending(owner=self, kind="prefetch")}
+        for rank, p in enumerate(order):
+            if p in queued or p in self.dirty_pages or self.page_key(p) in self.page_cache:
+                continue
+            self.scheduler.submit(self._make_job("prefetch", p, priority=PRIORITY_PREFETCH, rank=rank))
+
+    def _fits_full(self, index: int) -> bool:
+        size = self.page_pixel_size(index)
+        return size.width() * size.height() <= FULL_RENDER_MAX_PIXELS
+
+    def _render_local(self, index: int, zoom: float = None, clip=None):
+        """Render from this tab's own document (and cache the result)."""
+        zoom = self.zoom if zoom is None else zoom
+        key = self.page_key(index, zoom) + (tuple(clip) if clip else ())
+        fclip = self._tile_clip(*clip) if clip else None
+        with perf.span("render_local", page=index, zoom=zoom):
+            qimg = render_image(self.doc[index], zoom, fclip)
+        self.page_cache.put(key, qimg)
+        return qimg
+
+    def _on_page_rendered(self, job, qimg):
+        if job.owner is not self or self.doc is None:
+            return
+        current = self._job_current(job)
+        key = self.page_key(job.page, job.zoom) + (job.tag if job.kind == "tile" else ())
+        if current:
+            self.page_cache.put(key, qimg)
+        if job is self._page_job:
+            self._page_job = None
+            self.show_page_image(qimg)
+        elif current and job.page == self.current_page and self.canvas.tiled:
+            if job.kind == "tile":
+                self.canvas.set_tile(*job.tag, qimg)
+                if self.canvas.is_complete():
+                    self._page_shown()
+            elif job.kind == "preview":
+                self.canvas.set_preview(qimg)
+
+    def _on_page_failed(self, job, message):
+        # Workers open the file from disk; fall back to our own handle.
+        if job.owner is not self or self.doc is None or job.page != self.current_page:
+            return
+        if job is self._page_job:
+            self._page_job = None
+            self.show_page_image(self._render_local(self.current_page))
+        elif job.kind == "tile" and self.canvas.tiled:
+            self.canvas.set_tile(*job.tag, self._render_local(job.page, clip=job.tag))
+
+    def show_page_image(self, qimg: QImage):
+        """Display a whole-page raster."""
+        self._tiled_key = None
+        self.canvas.show_image(qimg)
+        self._reveal_current_hit()
+        self._page_shown()
+
+    def _page_shown(self):
+        """The current page is fully drawn: record how long that took."""
+        now = time.perf_counter()
+        if self._render_requested is not None:
+            perf.record("page_shown", self._render_requested, now - self._render_requested,
+                        page=self.current_page, zoom=self.zoom, tiled=self.canvas.tiled)
+            self._render_requested = None
+        if self._opened_at is not None:
+            perf.record("first_page", self._opened_at, now - self._opened_at)
+            self.open_timings["first_page_ms"] = (now - self._opened_at) * 1000
+            self._opened_at = None
+            log_open_timings(self.file_path, self.open_timings)
+
+    def _overlay(self, index: int):
+        """(search hits, current hit or None, pending annotations) of page *index*."""
+        hits = self.search_hits_by_page.get(index, ()) if self.search_query else ()
+        current = None
+        if hits and 0 <= self.current_hit_idx < len(self.flat_hits):
+            page, r = self.flat_hits[self.current_hit_idx]
+            current = r if page == index else None
+        return hits, current, self.pending_annots.get(index, ())
+
+    def _update_highlights(self):
+        """Repaint the overlay of the current page; the raster is left alone."""
+        if self.continuous_mode():
+            self.continuous.viewport().update()
+            return
+        z = self.zoom
+        hits, current, annots = self._overlay(self.current_page)
+        self.canvas.set_highlights([to_pixels(r, z) for r in hits],
+                                   None if current is None else to_pixels(current, z),
+                                   [(kind, to_pixels(r, z)) for kind, r in annots])
+
+    def _reveal_current_hit(self):
+        """Scroll the current search hit into view once its page is laid out."""
+        if not self._reveal_hit or not 0 <= self.current_hit_idx < len(self.flat_hits):
+            return
+        page, r = self.flat_hits[self.current_hit_idx]
+        if page != self.current_page:
+            return
+        if self.continuous_mode():
+            self.continuous.ensure_visible(page, r)
+        elif self._page_job is not None:
+            return  # the canvas still has the previous page's size
+        else:
+            z = self.zoom
+            c = r.tl + (r.br - r.tl) / 2
+            self.scroll.ensureVisible(int(c.x * z), int(c.y * z),
+                                      int(r.width * z / 2) + 50, int(r.height * z / 2) + 50)
+        self._reveal_hit = False
+
+    def resizeEvent(self, e):
+        super().resizeEvent(e)
+        self._tile_timer.start()
 
     def populate_thumbnails(self):
-        self.thumb_list.clear()
-        scale = 0.18
-        for i in range(len(self.doc)):
-            page = self.doc[i]
-            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
-            qimg = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888).copy()
-            item = QListWidgetItem(QIcon(QPixmap.fromImage(qimg)), f"{i+1}")
-            self.thumb_list.addItem(item)
+        """Drop all thumbnails; the view re-renders the visible ones on demand."""
+        with perf.span("populate_thumbnails", pages=len(self.doc)):
+            self.thumb_model.invalidate()
+            self.thumb_list.schedule_visible()
+
+    # ---------- Continuous scroll ---------- #
+    def continuous_mode(self) -> bool:
+        return self.continuous is not None and self.view_stack.currentWidget() is self.continuous
+
+    def set_continuous(self, on: bool):
+        """Switch between the single-page view and continuous scrolling."""
+        if self.hibernated:
+            self._wake_state = (self._wake_state[0], on)  # applied by wake()
+            return
+        if on == self.continuous_mode():
+            return
+        if on:
+            if self.continuous is None:
+                self.continuous = ContinuousView(
+                    self.doc, self.scheduler, self.file_path, password=self.password,
+                    dirty_pages=self.dirty_pages, page_cache=self.page_cache, page_key=self.page_key,
+                    overlay=self._overlay, commit_edits=self._commit_edits)
+                self.continuous.current_page_changed.connect(self._on_continuous_page)
+                self.view_stack.addWidget(self.continuous)
+            self.scheduler.cancel(owner=self)
+            self._page_job = None
+            self.view_stack.setCurrentWidget(self.continuous)
+            self.continuous.set_zoom(self.zoom)
+            self.continuous.scroll_to_page(self.current_page)
+            self.continuous.refresh()
+        else:
+            self.continuous.release()
+            self.view_stack.setCurrentWidget(self.scroll)
+            self.render_page()
+
+    def _on_continuous_page(self, page: int):
+        """Scrolling moved another page to the top part of the view."""
+        if self.continuous_mode() and page != self.current_page:
+            self.current_page = page
+            self.thumb_list.set_current_row(page)
+            self._prioritize_ocr()
+            self.page_changed.emit(page)
 
     # ---------- Navigation & zoom ---------- #
     def set_page(self, index: int):
@@ -115,7 +604,11 @@ class PDFTab(QWidget):
         index = max(0, min(index, len(self.doc) - 1))
         if index != self.current_page:
             self.current_page = index
-            self.render_page()
+            if self.continuous_mode():
+                self.thumb_list.set_current_row(index)
+                self.continuous.scroll_to_page(index)
+            else:
+                self.render_page()
 
     def next_page(self): self.set_page(self.current_page + 1)
     def prev_page(self): self.set_page(self.current_page - 1)
@@ -123,63 +616,220 @@ class PDFTab(QWidget):
 
     def zoom_in(self): self.zoom = min(self.zoom * 1.25, 8.0); self.render_page()
     def zoom_out(self): self.zoom = max(self.zoom / 1.25, 0.1); self.render_page()
-    def rotate_page_90(self): self.doc[self.current_page].set_rotation((self.doc[self.current_page].rotation + 90) % 360); self.render_page()
+    def rotate_page_90(self):
+        rotation = self.doc[self.current_page].rotation
+        self._edit(journal.Rotate(self.current_page, rotation, (rotation + 90) % 360))
+        self._refresh_page(self.current_page, content=False)
 
     def on_thumbnail_selected(self, row: int):
         if row != -1:
             self.set_page(row)
 
     # ---------- File ops ---------- #
-    def save_as(self, out_path: str): self.doc.save(out_path)
+    def save(self) -> bool:
+        """Write the edits back to the opened file (an incremental update
+        where the file allows one)."""
+        if self.source.spooled:
+            raise ValueError(f"{self.source.name} was not opened from a file; use Save As.")
+        return self.save_as(self.file_path)
+
+    def save_as(self, out_path: str, user_password: str = None) -> bool:
+        """Save with all edits, encrypted if *user_password* is given.
+        Returns whether it updated the opened file."""
+        with perf.span("save", pages=len(self.doc), encrypted=bool(user_password)) as args:
+            args["in_place"] = pdfops.save_document(self.doc, out_path, user_password)
+        if args["in_place"]:
+            self._refresh_doc_key()
+            self.journal.mark_saved()
+            self.edited.emit()
+        return args["in_place"]
+
     def export_current_page_png(self, out_path: str):
-        page = self.doc[self.current_page]
-        pix = page.get_pixmap(matrix=fitz.Matrix(self.zoom, self.zoom), alpha=False)
-        pix.save(out_path)
+        with perf.span("export_png", page=self.current_page, zoom=self.zoom):
+            pdfops.save_page_png(self.doc[self.current_page], out_path, self.zoom)
+
+    def export_images(self, out_dir: str, pages, dpi: int = 150, fmt: str = "png",
+                      quality: int = 90) -> ExportJob:
+        """An ExportJob (not started) writing 0-based *pages* to *out_dir*."""
+        return self.track_job(ExportJob(
+            self.doc, self.file_path, out_dir, pages, dpi=dpi, fmt=fmt, quality=quality,
+            password=self.password, dirty_pages=self.dirty_pages, parent=self))
 
     # ---------- Search ---------- #
     def run_search(self, query: str):
+        """Start a search from the current page; hits stream in as pages finish."""
+        self.cancel_search()
         self.search_query = query or ""
         self.search_hits_by_page.clear()
         self.flat_hits.clear()
+        self._hit_pages.clear()
         self.current_hit_idx = -1
         if not self.search_query:
-            self.render_page()
+            self._update_highlights()
+            self.search_progress.emit(0, 0, len(self.doc))
             return
-        for i in range(len(self.doc)):
-            rects = self.doc[i].search_for(self.search_query, quads=False)
-            if rects:
-                self.search_hits_by_page[i] = rects
-                for r in rects:
-                    self.flat_hits.append((i, r))
-        if self.flat_hits:
-            self.current_hit_idx = 0
-            hit_page, _ = self.flat_hits[0]
-            self.set_page(hit_page)
-        self.render_page()
+        # Indexed pages come from the text index; only the rest hit MuPDF.
+        started = time.perf_counter()
+        with perf.span("run_search"):
+            self._search = SearchRun(self.doc, self.search_query, self.current_page, self.indexer, self.ocr, self)
+            self._search.hits.connect(self._on_search_hits)
+            self._search.progress.connect(lambda done, total: self.search_progress.emit(len(self.flat_hits), done, total))
+            self._search.finished.connect(lambda: perf.record(
+                "search", started, time.perf_counter() - started, hits=len(self.flat_hits)))
+            self._search.start()
+            self._update_highlights()
+
+    def cancel_search(self):
+        if self._search is not None:
+            self._search.cancel()
+            self._search.deleteLater()
+            self._search = None
+
+    def search_running(self) -> bool:
+        return self._search is not None and self._search.is_running()
+
+    def start_ocr(self):
+        """Recognize the text of scanned pages, unless turned off."""
+        if self.ocr_enabled and not self.hibernated:
+            self.ocr.start()
+
+    def set_ocr(self, on: bool):
+        self.ocr_enabled = on
+        if on:
+            self.start_ocr()
+        else:
+            self.ocr.stop()
+
+    def _prioritize_ocr(self):
+        """Scanned pages on screen get their text first."""
+        self.ocr.prioritize(range(self.current_page, min(self.current_page + OCR_AHEAD_PAGES, len(self.doc))))
+
+    def _on_ocr_pages(self, pages):
+        """Text was recognized on *pages*: add their hits to the current search."""
+        if not self.search_query or self.doc is None:
+            return
+        for page, rects in self.ocr.search(self.search_query, pages).items():
+            if page not in self.search_hits_by_page:
+                self._on_search_hits(page, rects)
+        if not self.search_running():
+            self.search_progress.emit(len(self.flat_hits), len(self.doc), len(self.doc))
+
+    def _on_search_hits(self, page: int, rects):
+        self.search_hits_by_page[page] = rects
+        pos = bisect.bisect_left(self._hit_pages, page)
+        self.flat_hits[pos:pos] = [(page, r) for r in rects]
+        self._hit_pages[pos:pos] = [page] * len(rects)
+        if self.current_hit_idx == -1:
+            # Pages are searched from the current one onwards: the first
+            # page with hits is the one to show.
+            self._show_hit(pos)
+        elif pos <= self.current_hit_idx:
+            self.current_hit_idx += len(rects)
+        if page == self.current_page:
+            self._update_highlights()
+
+    def show_search_hit(self, query: str, page: int):
+        """Show the first hit of *query* on *page*, searching for it first if
+        that is not the current search."""
+        if query != self.search_query:
+            self.set_page(page)
+            self.run_search(query)  # from *page* on: the first hit shown is there
+            return
+        pos = bisect.bisect_left(self._hit_pages, page)
+        if pos < len(self._hit_pages) and self._hit_pages[pos] == page:
+            self._show_hit(pos)
+        else:
+            self.set_page(page)
 
     def find_next(self):
         if not self.flat_hits: return
-        self.current_hit_idx = (self.current_hit_idx + 1) % len(self.flat_hits)
-        self.set_page(self.flat_hits[self.current_hit_idx][0])
+        self._show_hit((self.current_hit_idx + 1) % len(self.flat_hits))
 
     def find_prev(self):
         if not self.flat_hits: return
-        self.current_hit_idx = (self.current_hit_idx - 1) % len(self.flat_hits)
-        self.set_page(self.flat_hits[self.current_hit_idx][0])
+        self._show_hit((self.current_hit_idx - 1) % len(self.flat_hits))
+
+    def _show_hit(self, idx: int):
+        """Make hit *idx* current and scroll to it; on the same page only the
+        overlay changes."""
+        self.current_hit_idx = idx
+        self._reveal_hit = True
+        page = self.flat_hits[idx][0]
+        if page != self.current_page:
+            self.set_page(page)
+        self._update_highlights()
+        self._reveal_current_hit()
 
     def add_highlight_for_search_hits(self):
         if not self.search_query or self.current_page not in self.search_hits_by_page:
             return False
-        for r in self.search_hits_by_page[self.current_page]:
-            ann = self.doc[self.current_page].add_highlight_annot(r); ann.update()
-        self.render_page()
+        edit = self._edit(journal.AddHighlights(self.current_page, self.search_hits_by_page[self.current_page]))
+        self._add_pending(edit)
         return True
 
     def add_text_note(self, text: str):
         pr = self.doc[self.current_page].rect
-        where = fitz.Point(pr.width / 2, pr.height / 2)
-        ann = self.doc[self.current_page].add_text_annot(where, text or "Note")
-        ann.update(); self.render_page()
+        self._add_pending(self._edit(journal.AddNote(self.current_page, (pr.width / 2, pr.height / 2), text or "Note")))
+
+    def _add_pending(self, edit):
+        """New annotations: draw them over the raster on screen instead of
+        re-rendering; the next raster of the page has them."""
+        index = edit.page
+        self.pending_annots.setdefault(index, []).extend(edit.overlay())
+        self.mark_dirty(index)
+        if self.continuous_mode():
+            self.continuous.refresh()  # rasterizes the page only if not on screen yet
+        else:
+            self._update_highlights()
+
+    def _commit_edits(self, index: int) -> bool:
+        """Page *index* is about to be rasterized with its edits: stop drawing
+        them as overlay. Whether there were any."""
+        return self.pending_annots.pop(index, None) is not None
+
+    # ---------- Edits ---------- #
+    def _edit(self, edit):
+        edit = self.journal.apply(self.doc, edit)
+        self.edited.emit()
+        return edit
+
+    def undo(self) -> bool:
+        edit = self.journal.undo(self.doc)
+        if edit is not None:
+            self._refresh_page(edit.page, edit.content)
+            self.edited.emit()
+        return edit is not None
+
+    def redo(self) -> bool:
+        edit = self.journal.redo(self.doc)
+        if edit is not None:
+            self._refresh_page(edit.page, edit.content)
+            self.edited.emit()
+        return edit is not None
+
+    def _refresh_page(self, index: int, content: bool):
+        """Page *index* changed in a way the overlay cannot show: rasterize it
+        again. *content*: what is drawn on it changed, not just its rotation."""
+        self._commit_edits(index)
+        if content:
+            self.mark_dirty(index)
+        else:
+            self.thumb_model.invalidate(index); self.thumb_list.schedule_visible()
+        if self.continuous is not None:
+            self.continuous.invalidate(index)
+        if index == self.current_page:
+            self.render_page()
+
+    def mark_dirty(self, index: int):
+        """Page *index* has in-memory edits; render it locally from now on.
+
+        What is on screen stays until the page is next rasterized (see
+        _add_pending); cached renders and its thumbnail are dropped.
+        """
+        self.dirty_pages.add(index)
+        self.page_revisions[index] = self.page_revisions.get(index, 0) + 1
+        self.page_cache.discard_page(index)
+        self.thumb_model.invalidate(index); self.thumb_list.schedule_visible()
 
     def metadata_text(self):
         meta = self.doc.metadata or {}
@@ -187,29 +837,31 @@ class PDFTab(QWidget):
         for k, v in meta.items(): out.append(f"{k}: {v}")
         return "\n".join(out)
     
-    def extract_pages_to(self, out_path: str, ranges_text: str):
+    def extract_pages_to(self, out_path: str, ranges_text: str) -> int:
         """
-        Save only selected page ranges to a new PDF.
-        Example: "1-3,5,7-9"
+        Save only selected page ranges to a new PDF, unsaved edits included.
+        Example: "1-3,5,7-"
         """
-        reader = pypdf.PdfReader(self.file_path)
-        writer = pypdf.PdfWriter()
-
-        def parse_ranges(s):
-            for part in s.replace(" ", "").split(","):
-                if "-" in part:
-                    a, b = map(int, part.split("-"))
-                    for k in range(a, b + 1):
-                        yield k
-                elif part:
-                    yield int(part)
-
-        for p in parse_ranges(ranges_text):
-            if 1 <= p <= len(reader.pages):
-                writer.add_page(reader.pages[p - 1])
-
-        with open(out_path, "wb") as f:
-            writer.write(f)
+        spans = pdfops.page_spans(ranges_text, len(self.doc))
+        with perf.span("extract_pages", ranges=ranges_text):
+            return pdfops.extract_parts(self.doc, [(out_path, spans)])
+
+    def extract_job(self, parts) -> ExtractJob:
+        """An ExtractJob (not started) writing ``(out_path, spans)`` *parts* of this document."""
+        return self.track_job(ExtractJob(
+            self.doc, self.file_path, parts, password=self.password,
+            edited_pages=self.dirty_pages | self.journal.touched_pages(), parent=self))
+
+    def split_parts(self, out_dir: str, every: int = None):
+        """``(out_path, spans)`` parts splitting the document into *every*-page
+        files, or one per top-level bookmark without *every*."""
+        if every:
+            spans = pdfops.split_every(len(self.doc), every)
+            titles = [""] * len(spans)
+        else:
+            parts = pdfops.split_by_outline(self.doc.get_toc(simple=True), len(self.doc))
+            titles, spans = [t for t, _ in parts], [s for _, s in parts]
+        return list(zip(pdfops.part_paths(out_dir, self.source.name, titles), spans))
 
 
 # ------------------------- Main Window ------------------------- #
@@ -229,6 +881,11 @@ class MainWindow(QMainWindow):
         self.tabs.setTabsClosable(True)
         self.tabs.setMovable(True)
         self.tabs.tabCloseRequested.connect(self.close_tab)
+        # Background tabs hibernate past a memory budget; closed ones are freed.
+        self.tab_manager = TabManager(
+            self.tabs, self.settings.value("tab_memory_mb", TAB_MEMORY_BUDGET_MB, type=int) * 1024 * 1024,
+            self.settings.value("max_awake_tabs", MAX_AWAKE_TABS, type=int), parent=self)
+        self.tab_manager.wake_failed.connect(self.on_wake_failed)
 
         # Welcome screen
         self.welcome_label = QLabel("📄 Welcome!\n\nUse File → Open to load a PDF", alignment=Qt.AlignCenter)
@@ -243,15 +900,34 @@ class MainWindow(QMainWindow):
         self.status = self.statusBar()
         self.status.showMessage("Ready")
 
+        # Performance readout (render latency, cache, memory); the timer also
+        # feeds memory/cache samples into the exportable trace.
+        self.perf_label = QLabel()
+        self.status.addPermanentWidget(self.perf_label)
+        self._perf_timer = QTimer(self, interval=1000)
+        self._perf_timer.timeout.connect(self.update_perf_readout)
+        self._perf_timer.start()
+        show_perf = self.settings.value("perf_readout", False, type=bool)
+        self.act_perf.setChecked(show_perf)
+        self.perf_label.setVisible(show_perf)
+
         self._update_action_states(False)
 
+        # Once the window is up, load PyMuPDF and start the render workers, so
+        # the first file opened doesn't pay for imports or process start-up.
+        QTimer.singleShot(1000, self._warm_up)
+
+    def _warm_up(self):
+        with perf.span("warm_up"):
+            rasterize.preload()
+        workers.warm("render", fn=rasterize.preload)
+
     # ---------- File actions (extra) ---------- #
     def action_close_tab(self):
         """Close currently active tab (for menu/toolbar)."""
         idx = self.tabs.currentIndex()
         if idx != -1:
-            self.tabs.removeTab(idx)
-        self._update_action_states(self.tabs.count() > 0)
+            self.close_tab(idx)
     def closeEvent(self, event):
         self.settings.setValue("dark_enabled", self.dark_enabled)
         super().closeEvent(event)
@@ -261,18 +937,23 @@ class MainWindow(QMainWindow):
         # -------- File menu --------
         file_menu = self.menuBar().addMenu("&File")
         self.act_open = QAction("Open...", self, shortcut=QKeySequence.Open, triggered=self.action_open)
+        self.act_save = QAction("Save", self, shortcut=QKeySequence.Save, triggered=self.action_save)
         self.act_saveas = QAction("Save As...", self, shortcut=QKeySequence.SaveAs, triggered=self.action_save_as)
         self.act_merge = QAction("Merge PDFs...", self, triggered=self.action_merge)
         self.act_extract = QAction("Extract Pages...", self, triggered=self.action_extract)
+        self.act_split = QAction("Split Document...", self, triggered=self.action_split)
+        self.act_save_searchable = QAction("Save Searchable Copy...", self, triggered=self.action_save_searchable)
+        self.act_save_optimized = QAction("Save Optimized Copy...", self, triggered=self.action_save_optimized)
         self.act_close = QAction("Close Tab", self, shortcut=QKeySequence.Close, triggered=self.action_close_tab)
         self.act_exit = QAction("Exit", self, shortcut=QKeySequence.Quit, triggered=self.close)
         self.act_print = QAction("Print...", self, shortcut=QKeySequence.Print, triggered=self.action_print)
         file_menu.addAction(self.act_print)
 
 
-        file_menu.addActions([self.act_open, self.act_saveas])
+        file_menu.addActions([self.act_open, self.act_save, self.act_saveas, self.act_save_searchable,
+                              self.act_save_optimized])
         file_menu.addSeparator()
-        file_menu.addActions([self.act_merge, self.act_extract])
+        file_menu.addActions([self.act_merge, self.act_extract, self.act_split])
         file_menu.addSeparator()
         file_menu.addAction(self.act_close)
         file_menu.addSeparator()
@@ -280,10 +961,22 @@ class MainWindow(QMainWindow):
 
         # -------- Edit menu --------
         edit_menu = self.menuBar().addMenu("&Edit")
+        self.act_undo = QAction("Undo", self, shortcut=QKeySequence.Undo, triggered=self.action_undo)
+        self.act_redo = QAction("Redo", self, shortcut=QKeySequence.Redo, triggered=self.action_redo)
+        edit_menu.addActions([self.act_undo, self.act_redo])
+        edit_menu.addSeparator()
         self.act_add_note = QAction("Add Note...", self, triggered=self.action_add_note)
         self.act_highlight_hits = QAction("Highlight Search Hits", self, triggered=self.action_highlight_hits)
         self.act_organize = QAction("Organize Pages...", self, triggered=self.action_organize_pages)
         edit_menu.addActions([self.act_add_note, self.act_highlight_hits, self.act_organize])
+        edit_menu.addSeparator()
+        self.act_ocr = QAction("Recognize Text in Scans", self, checkable=True)
+        self.act_ocr.setChecked(self.settings.value("ocr_enabled", True, type=bool))
+        self.act_ocr.toggled.connect(self.set_ocr)
+        if not ocr.available():
+            self.act_ocr.setEnabled(False)
+            self.act_ocr.setToolTip("Needs Tesseract (pytesseract and the tesseract program)")
+        edit_menu.addAction(self.act_ocr)
 
         # -------- View menu --------
         view_menu = self.menuBar().addMenu("&View")
@@ -293,15 +986,21 @@ class MainWindow(QMainWindow):
         self.act_zoom_out = QAction("Zoom Out", self, shortcut=QKeySequence.ZoomOut, triggered=self.action_zoom_out)
         self.act_rotate = QAction("Rotate Page 90°", self, triggered=self.action_rotate)
         self.act_export_img = QAction("Export Page as Image...", self, triggered=self.action_export_image)
+        self.act_export_pages = QAction("Export Pages as Images...", self, triggered=self.action_export_pages)
         self.act_info = QAction("Document Info", self, triggered=self.action_info)
 
         view_menu.addActions([
             self.act_prev, self.act_next, self.act_zoom_in, self.act_zoom_out,
-            self.act_rotate, self.act_export_img, self.act_info
+            self.act_rotate, self.act_export_img, self.act_export_pages, self.act_info
         ])
         view_menu.addSeparator()
         view_menu.addAction(QAction("Toggle Thumbnails", self, triggered=self.toggle_thumbnails))
         view_menu.addAction(QAction("Toggle Dark Mode", self, triggered=self.toggle_dark_mode))
+        self.act_perf = QAction("Performance Readout", self, checkable=True, toggled=self.set_perf_readout)
+        view_menu.addAction(self.act_perf)
+        self.act_continuous = QAction("Continuous Scroll", self, checkable=True, toggled=self.set_continuous)
+        self.act_continuous.setChecked(self.settings.value("continuous_scroll", False, type=bool))
+        view_menu.insertAction(self.act_rotate, self.act_continuous)
 
         # Page spin (Go To)
         self.page_spin = QSpinBox(self)
@@ -321,6 +1020,7 @@ class MainWindow(QMainWindow):
             "PDF Reader/Editor\nBuilt with PySide6 + PyMuPDF"
         ))
         help_menu.addAction(about_act)
+        help_menu.addAction(QAction("Export Performance Trace...", self, triggered=self.action_export_trace))
 
 
     def _create_right_toolbar(self):
@@ -371,12 +1071,33 @@ class MainWindow(QMainWindow):
         btn_prev, btn_next = QPushButton("Prev"), QPushButton("Next")
         btn_prev.clicked.connect(self.action_find_prev); btn_next.clicked.connect(self.action_find_next)
         self.find_edit.returnPressed.connect(self.action_find_run)
+        self.find_edit.textEdited.connect(self.action_find_cancel)
         self.find_tb.addWidget(self.find_edit); self.find_tb.addWidget(btn_prev); self.find_tb.addWidget(btn_next)
 
+        # Search everywhere: every open tab and a folder, results in a dock
+        self.search_panel = SearchPanel(self)
+        self.search_panel.set_folder(self.settings.value("search_folder", "", type=str))
+        self.search_panel.folder_edit.textChanged.connect(lambda f: self.settings.setValue("search_folder", f))
+        self.search_panel.activated.connect(self.open_search_result)
+        self.search_panel.search_requested.connect(self.run_global_search)
+        self.search_panel.query_edited.connect(self.action_global_search_cancel)
+        self.search_dock = QDockWidget("Search Everywhere", self)
+        self.search_dock.setWidget(self.search_panel)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.search_dock)
+        self.search_dock.hide()
+        self.act_search_all = self.search_dock.toggleViewAction()
+        self.act_search_all.setText("All Documents")
+        self.act_search_all.setShortcut(QKeySequence("Ctrl+Shift+F"))
+        self.act_search_all.setToolTip("Search every open tab, and a folder (Ctrl+Shift+F)")
+        self.act_search_all.triggered.connect(
+            lambda shown: shown and self.search_panel.focus_query(self.find_edit.text().strip()))
+        self.find_tb.addAction(self.act_search_all)
+        self._global_search = None
+
     # ---------- Actions ---------- #
     def active_tab(self): return self.tabs.currentWidget() if isinstance(self.tabs.currentWidget(), PDFTab) else None
     def _update_action_states(self, has_doc: bool): 
-        for act in [self.act_saveas, self.act_prev, self.act_next, self.act_zoom_in, self.act_zoom_out, self.act_rotate, self.act_print, self.act_info]: act.setEnabled(has_doc)
+        for act in [self.act_save, self.act_saveas, self.act_undo, self.act_redo, self.act_prev, self.act_next, self.act_zoom_in, self.act_zoom_out, self.act_rotate, self.act_print, self.act_info, self.act_export_pages, self.act_save_searchable, self.act_save_optimized]: act.setEnabled(has_doc)
 
     def update_status(self):
         tab = self.active_tab()
@@ -385,36 +1106,73 @@ class MainWindow(QMainWindow):
 
     def action_open(self):
         files, _ = QFileDialog.getOpenFileNames(self, "Open PDF(s)", "", "PDF Files (*.pdf)")
-        for f in files:
-            try:
-                tab = None
-                try:
-                    # try opening without password
-                    tab = PDFTab(f, self)
-                except RuntimeError:
-                    # ask for password
-                    pw, ok = QInputDialog.getText(self, "Password Required", f"Enter password for:\n{os.path.basename(f)}")
-                    if not ok:
-                        continue
-                    try:
-                        tab = PDFTab(f, self, password=pw)
-                    except Exception as e:
-                        QMessageBox.critical(self, "Open error", f"Failed to open {f}:\n{e}")
-                        continue
-
-                if tab:
-                    base = os.path.basename(f)
-                    idx = self.tabs.addTab(tab, base)
-                    self.tabs.setTabToolTip(idx, f)
-                    self.tabs.setCurrentWidget(tab)
-                    self.setCentralWidget(self.tabs)
-                    self._update_action_states(True)
-                    self.page_spin.setMaximum(len(tab.doc))
-                    self.page_spin.setValue(1)
-            except Exception as e:
-                QMessageBox.critical(self, "Open error", f"Failed to open {f}:\n{e}")
+        if not files:
+            return
+        # The first file opens right away. The others are opened, and their
+        # first page rendered, in parallel by the render workers; each gets
+        # its tab as soon as it is ready.
+        self.open_file(files[0])
+        for f in files[1:]:
+            fut = workers.get_pool("render").submit(rasterize.probe, f)
+            when_done(fut, lambda fut, f=f: self._on_probed(f, fut))
         self.update_status()
 
+    def _on_probed(self, path: str, fut):
+        err = fut.exception()
+        if err is not None:
+            QMessageBox.critical(self, "Open error", f"Failed to open {path}:\n{err}")
+            return
+        info = fut.result()
+        if info["needs_pass"]:
+            self.open_file(path, make_current=False)
+            return
+        log.info("background open of %s: open %.0f ms, first page %.0f ms",
+                 path, info["open_ms"], info["render_ms"])
+        self.open_file(path, first_page=info["first_page"], make_current=False)
+
+    def open_file(self, path: str, first_page=None, make_current: bool = True, source: DocumentSource = None):
+        """Open *path* in a new tab, asking for its password if it has one."""
+        name = source.name if source is not None else os.path.basename(path)
+        try:
+            try:
+                tab = PDFTab(path, self, first_page=first_page, source=source)
+            except rasterize.PasswordRequired:
+                pw, ok = QInputDialog.getText(self, "Password Required", f"Enter password for:\n{name}")
+                if not ok:
+                    return None
+                tab = PDFTab(path, self, password=pw, source=source)
+        except Exception as e:
+            QMessageBox.critical(self, "Open error", f"Failed to open {name}:\n{e}")
+            return None
+
+        tab.search_progress.connect(self.on_search_progress)
+        tab.ocr.progress.connect(self.on_ocr_progress)
+        tab.page_changed.connect(self.on_page_scrolled)
+        tab.edited.connect(self.on_tab_edited)
+        tab.set_continuous(self.act_continuous.isChecked())
+        idx = self.tabs.addTab(tab, name)
+        self.tabs.setTabToolTip(idx, path if source is None else name)
+        self.setCentralWidget(self.tabs)
+        self._update_action_states(True)
+        if make_current or self.tabs.count() == 1:
+            self.tabs.setCurrentWidget(tab)
+            self.page_spin.setMaximum(len(tab.doc))
+            self.page_spin.setValue(1)
+        self.tab_manager.add(tab)
+        return tab
+
+    def open_stream(self, stream, name: str = "stdin"):
+        """Open a PDF read from a binary *stream* (stdin, a pipe) in a new tab."""
+        try:
+            source = DocumentSource.from_stream(stream, name)
+        except OSError as e:
+            QMessageBox.critical(self, "Open error", f"Failed to read {name}:\n{e}")
+            return None
+        tab = self.open_file(source.path, source=source)
+        if tab is None:
+            source.close()
+        return tab
+
     def action_save_as(self):
         tab = self.active_tab()
         if not tab:
@@ -425,18 +1183,45 @@ class MainWindow(QMainWindow):
             pw, ok = QInputDialog.getText(self, "Set Password (optional)", "Enter password to protect PDF (leave empty for none):")
             if not ok:
                 return
-            if pw:
-                writer = pypdf.PdfWriter()
-                reader = pypdf.PdfReader(tab.file_path)
-                for page in reader.pages:
-                    writer.add_page(page)
-                writer.encrypt(pw)
-                with open(out, "wb") as f:
-                    writer.write(f)
-            else:
-                tab.save_as(out)
+            try:
+                tab.save_as(out, pw or None)
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Save failed:\n{e}")
+                return
             QMessageBox.information(self, "Saved", f"Saved as:\n{out}")
 
+    def action_save(self):
+        tab = self.active_tab()
+        if not tab:
+            return
+        if tab.source.spooled:
+            self.action_save_as()  # read from a stream: there is no file to update
+            return
+        try:
+            tab.save()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Save failed:\n{e}")
+            return
+        self.status.showMessage(f"Saved {tab.file_path}", 3000)
+
+    def action_undo(self):
+        tab = self.active_tab()
+        if tab and tab.undo():
+            self.update_status()
+
+    def action_redo(self):
+        tab = self.active_tab()
+        if tab and tab.redo():
+            self.update_status()
+
+    def on_tab_edited(self):
+        """Mark tabs with unsaved edits with a "*" in their title."""
+        tab = self.sender()
+        idx = self.tabs.indexOf(tab)
+        if idx != -1:
+            name = tab.source.name
+            self.tabs.setTabText(idx, f"*{name}" if tab.journal.is_modified() else name)
+
 
     def action_prev(self):
         tab = self.active_tab()
@@ -478,6 +1263,67 @@ class MainWindow(QMainWindow):
         if tab:
             tab.run_search(self.find_edit.text().strip())
 
+    def action_find_cancel(self, _text=""):
+        """A new query is being typed: stop the search still running."""
+        tab = self.active_tab()
+        if tab and tab.search_running():
+            tab.cancel_search()
+            self.update_status()
+
+    def action_global_search_cancel(self, _text=""):
+        """A new search-everywhere query is being typed: stop the one running."""
+        if self._global_search is not None and self._global_search.is_running():
+            self._global_search.cancel()
+
+    def run_global_search(self, query: str, folder: str = None):
+        """Search every open tab and the PDFs under *folder* (default: the
+        panel's) for *query*, replacing the search in flight. An empty
+        *query* clears the results."""
+        if self._global_search is not None:
+            self._global_search.cancel()
+            self._global_search.deleteLater()
+            self._global_search = None
+        if not query:
+            self.search_panel.clear()
+            return None
+        targets, seen = [], set()
+        for i in range(self.tabs.count()):
+            tab = self.tabs.widget(i)
+            if isinstance(tab, PDFTab):
+                seen.add(os.path.realpath(tab.file_path))
+                # Hibernated tabs too: their index and recognized scans stay.
+                targets.append(Target(tab.file_path, tab.password, tab.source.name, tab.indexer.page_count,
+                                      tab.indexer.doc_hash, frozenset(tab.indexer.indexed), tab.ocr))
+        folder = self.search_panel.folder() if folder is None else folder
+        if folder:
+            targets.extend(Target(p) for p in folder_pdfs(folder) if os.path.realpath(p) not in seen)
+        search = self._global_search = GlobalSearch(query, targets, parent=self)
+        self.search_panel.show_search(search)
+        search.start()
+        return search
+
+    def open_search_result(self, path: str, page: int):
+        """Show a search-everywhere hit: its tab, opened if need be, at *page*."""
+        real = os.path.realpath(path)
+        for i in range(self.tabs.count()):
+            tab = self.tabs.widget(i)
+            if isinstance(tab, PDFTab) and os.path.realpath(tab.file_path) == real:
+                self.tabs.setCurrentWidget(tab)
+                break
+        else:
+            tab = self.open_file(path)
+        if tab is not None and self._global_search is not None:
+            tab.show_search_hit(self._global_search.query, page)
+
+    def on_search_progress(self, hits: int, done: int, total: int):
+        tab = self.active_tab()
+        if tab is None or tab is not self.sender():
+            return
+        if done < total:
+            self.status.showMessage(f"Searching… {hits} hits ({done}/{total} pages)")
+        else:
+            self.status.showMessage(f"{hits} hits for \"{tab.search_query}\"" if tab.search_query else "")
+
     def action_find_next(self):
         tab = self.active_tab()
         if tab:
@@ -492,34 +1338,41 @@ class MainWindow(QMainWindow):
         tab = self.active_tab()
         if not tab:
             return
+        from PySide6.QtPrintSupport import QPrinter, QPrintDialog
+        from app.printing import PrintJob, print_pages
 
         printer = QPrinter(QPrinter.HighResolution)
         dialog = QPrintDialog(printer, self)
+        dialog.setMinMax(1, len(tab.doc))
+        dialog.setOption(QPrintDialog.PrintCurrentPage, True)
         if dialog.exec() != QPrintDialog.Accepted:
             return
+        pages = print_pages(printer, len(tab.doc), tab.current_page)
+
+        # Pages render in the background at the printer's resolution and are
+        # painted strip by strip; the window stays usable meanwhile.
+        job = tab.track_job(PrintJob(printer, tab.doc, tab.file_path, pages, password=tab.password,
+                                     dirty_pages=tab.dirty_pages, parent=self))
+        dlg = QProgressDialog("Printing…", "Cancel", 0, len(pages), self)
+        dlg.setWindowTitle("Print")
+        dlg.setMinimumDuration(300)
+        dlg.canceled.connect(job.cancel)
+        job.progress.connect(lambda done, total: dlg.setValue(done))
+
+        def finished():
+            dlg.reset(); job.deleteLater()
+            self.status.showMessage(f"Printed {len(pages)} pages")
+
+        def failed(message):
+            dlg.reset(); job.deleteLater()
+            if message:
+                QMessageBox.critical(self, "Print Error", message)
+            else:
+                self.status.showMessage("Printing cancelled")
 
-        painter = QPainter()
-        if not painter.begin(printer):
-            QMessageBox.critical(self, "Print Error", "Could not start printer.")
-            return
-
-        try:
-            for page_num in range(len(tab.doc)):
-                if page_num > 0:
-                    printer.newPage()
-
-                page = tab.doc[page_num]
-                pix = page.get_pixmap(matrix=fitz.Matrix(2, 2), alpha=False)  # 2x for good resolution
-                qimg = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888)
-
-                rect = painter.viewport()
-                size = qimg.size()
-                size.scale(rect.size(), Qt.KeepAspectRatio)
-                painter.setViewport(rect.x(), rect.y(), size.width(), size.height())
-                painter.setWindow(qimg.rect())
-                painter.drawImage(0, 0, qimg)
-        finally:
-            painter.end()
+        job.finished.connect(finished)
+        job.failed.connect(failed)
+        job.start()
 
     # ---------- File actions ---------- #
     def action_merge(self):
@@ -529,28 +1382,207 @@ class MainWindow(QMainWindow):
         out, _ = QFileDialog.getSaveFileName(self, "Save Merged PDF", "", "PDF Files (*.pdf)")
         if not out:
             return
-        merger = pypdf.PdfMerger()
-        for f in files:
-            merger.append(f)
-        merger.write(out)
-        merger.close()
-        QMessageBox.information(self, "Merged", f"Merged PDF saved:\n{out}")
+        # Merge in a worker process; the window stays usable meanwhile.
+        task = BackgroundTask(pdfops.merge, files, out, pool="merge", parent=self)
+        started = time.perf_counter()
+        dlg = QProgressDialog("Merging PDFs…", "Cancel", 0, len(files), self)
+        dlg.setWindowTitle("Merge PDFs")
+        dlg.setMinimumDuration(300)
+        dlg.canceled.connect(task.cancel)
+        task.progress.connect(lambda done, total: dlg.setValue(done))
+
+        def finished(pages):
+            dlg.reset(); task.deleteLater()
+            perf.record("merge", started, time.perf_counter() - started, files=len(files), pages=pages)
+            self.status.showMessage(f"Merged {len(files)} files ({pages} pages)")
+            QMessageBox.information(self, "Merged", f"Merged PDF saved:\n{out}")
+
+        def failed(message):
+            dlg.reset(); task.deleteLater()
+            if message:
+                QMessageBox.critical(self, "Merge error", f"Merge failed:\n{message}")
+            else:
+                self.status.showMessage("Merge cancelled")
+
+        task.finished.connect(finished)
+        task.failed.connect(failed)
+        task.start()
+
+    def action_save_searchable(self):
+        tab = self.active_tab()
+        if not tab:
+            return
+        if not ocr.available():
+            QMessageBox.warning(self, "Save Searchable Copy",
+                                "Text recognition needs Tesseract (pytesseract and the tesseract program).")
+            return
+        out, _ = QFileDialog.getSaveFileName(self, "Save Searchable Copy", "", "PDF Files (*.pdf)")
+        if not out:
+            return
+        # Scanned pages get an invisible text layer; pages the tab has
+        # recognized already come from the OCR cache.
+        task = BackgroundTask(ocr.write_searchable, tab.ocr.db_path, tab.file_path, out,
+                              password=tab.password, pool="ocr", parent=self)
+        tab.track_job(task)
+        started = time.perf_counter()
+        dlg = QProgressDialog("Recognizing text…", "Cancel", 0, 0, self)
+        dlg.setWindowTitle("Save Searchable Copy")
+        dlg.setMinimumDuration(300)
+        dlg.canceled.connect(task.cancel)
+        task.progress.connect(lambda done, total: (dlg.setMaximum(total), dlg.setValue(done)))
+
+        def finished(pages):
+            dlg.reset(); task.deleteLater()
+            perf.record("save_searchable", started, time.perf_counter() - started, pages=pages)
+            self.status.showMessage(f"Saved searchable copy ({pages} scanned pages): {out}")
+
+        def failed(message):
+            dlg.reset(); task.deleteLater()
+            if message:
+                QMessageBox.critical(self, "Save error", f"Saving a searchable copy failed:\n{message}")
+            else:
+                self.status.showMessage("Save cancelled")
+
+        task.finished.connect(finished)
+        task.failed.connect(failed)
+        task.start()
+
+    def action_save_optimized(self):
+        tab = self.active_tab()
+        if not tab:
+            return
+        if tab.journal.is_modified():
+            # The copy is made from the file, so unsaved edits would be left out.
+            answer = QMessageBox.question(self, "Save Optimized Copy", "Save your changes first?",
+                                          QMessageBox.Save | QMessageBox.Cancel, QMessageBox.Save)
+            if answer != QMessageBox.Save:
+                return
+            self.action_save()
+            if tab.journal.is_modified():
+                return
+        profile, ok = QInputDialog.getItem(
+            self, "Save Optimized Copy", "Images (lossless keeps them; ebook 150 dpi, screen 96 dpi):",
+            list(pdfops.OPTIMIZE_PROFILES), 0, False)
+        if not ok:
+            return
+        # Its passwords and permissions are kept, which takes the owner
+        # password; finding out parses the file, so it runs in the pool too.
+        fut = workers.get_pool("optimize", 1).submit(pdfops.needs_owner_password, tab.file_path, tab.password)
+        when_done(fut, lambda fut: self._save_optimized(tab, profile, fut))
+
+    def _save_optimized(self, tab, profile: str, fut):
+        if self.tabs.indexOf(tab) == -1:
+            return
+        password = tab.password
+        if fut.exception() is None and fut.result():
+            password, ok = QInputDialog.getText(self, "Save Optimized Copy",
+                                                "This PDF is protected. Enter its owner password:", QLineEdit.Password)
+            if not ok:
+                return
+        out, _ = QFileDialog.getSaveFileName(self, "Save Optimized Copy", "", "PDF Files (*.pdf)")
+        if not out:
+            return
+        task = BackgroundTask(pdfops.optimize, tab.file_path, out, profile,
+                              password=password, pool="optimize", parent=self)
+        tab.track_job(task)
+        started = time.perf_counter()
+        dlg = QProgressDialog("Optimizing…", "Cancel", 0, 0, self)
+        dlg.setWindowTitle("Save Optimized Copy")
+        dlg.setMinimumDuration(300)
+        dlg.canceled.connect(task.cancel)
+        task.progress.connect(lambda done, total: (dlg.setMaximum(total), dlg.setValue(done)))
+
+        def finished(stats):
+            dlg.reset(); task.deleteLater()
+            perf.record("optimize", started, time.perf_counter() - started, profile=profile,
+                        pages=stats["pages"], bytes_before=stats["bytes_before"], bytes_after=stats["bytes_after"])
+            self.status.showMessage(f"Saved optimized copy: {stats['bytes_before'] / 1e6:.2f} MB -> "
+                                    f"{stats['bytes_after'] / 1e6:.2f} MB ({out})")
+
+        def failed(message):
+            dlg.reset(); task.deleteLater()
+            if message:
+                QMessageBox.critical(self, "Save error", f"Saving an optimized copy failed:\n{message}")
+            else:
+                self.status.showMessage("Save cancelled")
+
+        task.finished.connect(finished)
+        task.failed.connect(failed)
+        task.start()
 
     def action_extract(self):
         tab = self.active_tab()
         if not tab:
             return
-        text, ok = QInputDialog.getText(self, "Extract Pages", "Enter page ranges (e.g., 1-3,6,9-10):")
+        text, ok = QInputDialog.getText(self, "Extract Pages", "Enter page ranges (e.g., 1-3,6,9-):")
         if not ok or not text.strip():
             return
+        try:
+            spans = pdfops.page_spans(text, len(tab.doc))
+        except ValueError as e:
+            QMessageBox.critical(self, "Extract Pages", f"Invalid page ranges:\n{e}")
+            return
+        if not spans:
+            QMessageBox.information(self, "Extract Pages", "No pages in that range.")
+            return
         out, _ = QFileDialog.getSaveFileName(self, "Save Extracted PDF", "", "PDF Files (*.pdf)")
         if not out:
             return
-        try:
-            tab.extract_pages_to(out, text.strip())
-            QMessageBox.information(self, "Extracted", f"Saved extracted pages to:\n{out}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Extraction failed:\n{e}")
+        self._run_extract(tab.extract_job([(out, spans)]), "Extracting pages…",
+                          lambda outputs: f"Saved extracted pages to:\n{out}")
+
+    def action_split(self):
+        tab = self.active_tab()
+        if not tab:
+            return
+        dlg = QDialog(self)
+        dlg.setWindowTitle("Split Document")
+        mode = QComboBox()
+        mode.addItem("Every N pages", "every")
+        mode.addItem("At each top-level bookmark", "bookmarks")
+        every = QSpinBox(minimum=1, maximum=max(1, len(tab.doc)), value=min(10, len(tab.doc)), suffix=" pages")
+        mode.currentIndexChanged.connect(lambda: every.setEnabled(mode.currentData() == "every"))
+        form = QFormLayout(dlg)
+        form.addRow("Split:", mode)
+        form.addRow("Part size:", every)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(dlg.accept)
+        buttons.rejected.connect(dlg.reject)
+        form.addRow(buttons)
+        if dlg.exec() != QDialog.Accepted:
+            return
+        out_dir = QFileDialog.getExistingDirectory(self, "Save Parts To")
+        if not out_dir:
+            return
+        parts = tab.split_parts(out_dir, every.value() if mode.currentData() == "every" else None)
+        if not parts:
+            QMessageBox.information(self, "Split Document", "The document has no bookmarks to split at.")
+            return
+        self._run_extract(tab.extract_job(parts), "Splitting document…",
+                          lambda outputs: f"Saved {len(outputs)} files to:\n{out_dir}")
+
+    def _run_extract(self, job: ExtractJob, label: str, done_message):
+        """Run *job* behind a progress dialog; *done_message(outputs)* on success."""
+        progress = QProgressDialog(label, "Cancel", 0, job.total, self)
+        progress.setWindowTitle("Extract Pages")
+        progress.setMinimumDuration(300)
+        progress.canceled.connect(job.cancel)
+        job.progress.connect(lambda done, total: progress.setValue(done))
+
+        def finished(outputs):
+            progress.reset(); job.deleteLater()
+            QMessageBox.information(self, "Extracted", done_message(outputs))
+
+        def failed(message):
+            progress.reset(); job.deleteLater()
+            if message:
+                QMessageBox.critical(self, "Error", f"Extraction failed:\n{message}")
+            else:
+                self.status.showMessage("Extraction cancelled")
+
+        job.finished.connect(finished)
+        job.failed.connect(failed)
+        job.start()
 
     def action_go_to(self, page_one_based: int):
         tab = self.active_tab()
@@ -577,6 +1609,64 @@ class MainWindow(QMainWindow):
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Export failed:\n{e}")
 
+    def action_export_pages(self):
+        tab = self.active_tab()
+        if not tab:
+            return
+        dlg = QDialog(self)
+        dlg.setWindowTitle("Export Pages as Images")
+        ranges = QLineEdit()
+        ranges.setPlaceholderText(f"all pages, or e.g. 1-3,6 (of {len(tab.doc)})")
+        fmt = QComboBox()
+        for label, key in (("PNG", "png"), ("JPEG", "jpeg"), ("WebP", "webp")):
+            fmt.addItem(label, key)
+        dpi = QSpinBox(minimum=36, maximum=1200, value=150, suffix=" dpi")
+        form = QFormLayout(dlg)
+        form.addRow("Pages:", ranges)
+        form.addRow("Format:", fmt)
+        form.addRow("Resolution:", dpi)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(dlg.accept)
+        buttons.rejected.connect(dlg.reject)
+        form.addRow(buttons)
+        if dlg.exec() != QDialog.Accepted:
+            return
+        try:
+            spec = ranges.text().strip()
+            numbers = pdfops.parse_ranges(spec, len(tab.doc)) if spec else range(1, len(tab.doc) + 1)
+            pages = list(dict.fromkeys(n - 1 for n in numbers))
+        except ValueError as e:
+            QMessageBox.critical(self, "Export", f"Invalid page ranges:\n{e}")
+            return
+        if not pages:
+            QMessageBox.information(self, "Export", "No pages in that range.")
+            return
+        out_dir = QFileDialog.getExistingDirectory(self, "Export Images To")
+        if not out_dir:
+            return
+        # Pages are rendered and written by the export workers, in parallel.
+        job = tab.export_images(out_dir, pages, dpi=dpi.value(), fmt=fmt.currentData())
+        progress = QProgressDialog("Exporting pages…", "Cancel", 0, len(pages), self)
+        progress.setWindowTitle("Export Pages")
+        progress.setMinimumDuration(300)
+        progress.canceled.connect(job.cancel)
+        job.progress.connect(lambda done, total: progress.setValue(done))
+
+        def finished(outputs):
+            progress.reset(); job.deleteLater()
+            self.status.showMessage(f"Exported {len(outputs)} pages to {out_dir}")
+
+        def failed(message):
+            progress.reset(); job.deleteLater()
+            if message:
+                QMessageBox.critical(self, "Export error", f"Export failed:\n{message}")
+            else:
+                self.status.showMessage("Export cancelled")
+
+        job.finished.connect(finished)
+        job.failed.connect(failed)
+        job.start()
+
     # ---------- Edit actions ---------- #
     def action_add_note(self):
         tab = self.active_tab()
@@ -599,7 +1689,92 @@ class MainWindow(QMainWindow):
             tab.organize_pages_dialog(self)
 
     def close_tab(self, index: int):
-        self.tabs.removeTab(index); self._update_action_states(self.tabs.count() > 0)
+        tab = self.tabs.widget(index)
+        self.tabs.removeTab(index)
+        if isinstance(tab, PDFTab):
+            self.tab_manager.release(tab)
+        self._update_action_states(self.tabs.count() > 0)
+
+    def on_wake_failed(self, tab, message: str):
+        """A hibernated tab could not reopen its file: close it."""
+        idx = self.tabs.indexOf(tab)
+        if idx != -1:
+            self.close_tab(idx)
+        QMessageBox.critical(self, "Open error", f"Failed to reopen {tab.source.name}:\n{message}")
+
+    def set_continuous(self, on: bool):
+        self.settings.setValue("continuous_scroll", on)
+        for i in range(self.tabs.count()):
+            tab = self.tabs.widget(i)
+            if isinstance(tab, PDFTab):
+                tab.set_continuous(on)
+
+    def set_ocr(self, on: bool):
+        self.settings.setValue("ocr_enabled", on)
+        for i in range(self.tabs.count()):
+            tab = self.tabs.widget(i)
+            if isinstance(tab, PDFTab):
+                tab.set_ocr(on)
+
+    def on_ocr_progress(self, done: int, total: int):
+        tab = self.active_tab()
+        if tab is None or tab.ocr is not self.sender() or not tab.ocr.pages or tab.search_running():
+            return
+        if done < total:
+            self.status.showMessage(f"Recognizing text… {len(tab.ocr.pages)} scanned pages ({done}/{total} pages)")
+        else:
+            self.status.showMessage(f"Recognized text on {len(tab.ocr.pages)} scanned pages")
+
+    def on_page_scrolled(self, page: int):
+        if self.sender() is not self.active_tab():
+            return
+        self.page_spin.blockSignals(True)
+        self.page_spin.setValue(page + 1)
+        self.page_spin.blockSignals(False)
+        self.update_status()
+
+    # ---------- Performance ---------- #
+    def set_perf_readout(self, on: bool):
+        self.perf_label.setVisible(on)
+        self.settings.setValue("perf_readout", on)
+        self.update_perf_readout()
+
+    def update_perf_readout(self):
+        tab = self.active_tab()
+        rss = perf.rss_mb()
+        if rss is not None:
+            perf.sample("memory", rss_mb=round(rss, 1))
+        if tab is not None:
+            perf.sample("page_cache", hit_rate=round(tab.page_cache.hit_rate(), 3),
+                        mb=round(tab.page_cache.bytes / (1024 * 1024), 1))
+        awake = len(self.tab_manager.awake())
+        perf.sample("tabs", open=self.tabs.count(), awake=awake,
+                    mb=round(self.tab_manager.memory_bytes() / (1024 * 1024), 1))
+        if not self.perf_label.isVisible():
+            return
+        shown, parts = perf.stats("page_shown"), []
+        if shown["count"]:
+            parts.append(f"Render {shown['last_ms']:.0f} ms (p95 {shown['p95_ms']:.0f} ms)")
+        if tab is not None:
+            parts.append(f"Cache {tab.page_cache.hit_rate():.0%}")
+        if self.tabs.count() > awake:
+            parts.append(f"{awake}/{self.tabs.count()} tabs awake")
+        if rss is not None:
+            parts.append(f"{rss:.0f} MB")
+        self.perf_label.setText("  ·  ".join(parts))
+
+    def action_export_trace(self):
+        summary_filter = "Summary JSON (*.json)"
+        out, chosen = QFileDialog.getSaveFileName(
+            self, "Export Performance Trace", "pdfreader-trace.json",
+            f"Chrome trace (*.json);;{summary_filter}")
+        if not out:
+            return
+        try:
+            perf.export(out, chrome=chosen != summary_filter)
+            self.status.showMessage(f"Trace saved to {out}")
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Export failed:\n{e}")
 
     def toggle_thumbnails(self):
         tab = self.active_tab()
@@ -617,12 +1792,22 @@ class MainWindow(QMainWindow):
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # render workers in the PyInstaller build
+    logging.basicConfig(level=os.environ.get("PDFREADER_LOG", "WARNING").upper(),
+                        format="%(asctime)s %(name)s %(levelname)s: %(message)s")
     app = QApplication(sys.argv)
     app.setApplicationName("PDF Reader / Editor") 
     #app.setWindowIcon(QIcon("app/icon.ico"))
     app.setWindowIcon(QIcon(resource_path("app/icon.ico")))
     win = MainWindow()
     win.setWindowTitle("PDF Reader / Editor")       # ✅ override window title
+    if os.environ.get("PDFREADER_TRACE"):  # write a Chrome trace on exit
+        app.aboutToQuit.connect(lambda: perf.export(os.environ["PDFREADER_TRACE"]))
     win.show()
+    for arg in sys.argv[1:]:  # files to open; "-" reads a PDF from stdin
+        if arg == STDIN:
+            win.open_stream(sys.stdin.buffer)
+        elif os.path.isfile(arg):
+            win.open_file(arg)
     sys.exit(app.exec())
 
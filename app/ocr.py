@@ -0,0 +1,176 @@
+"""
+Optical character recognition of scanned pages.
+
+A page with images but no fonts is taken for a scan: it is rendered at
+OCR_DPI and run through Tesseract (pytesseract) in a worker process. The
+words and boxes come back in the text index's format (see
+textindex.extract_words, less character edges: hits cover whole words), in
+the same unrotated page coordinates as MuPDF's own text, so search and
+highlighting treat them alike. Results are cached in
+the index database by a hash of the page's content (content stream, images,
+size and rotation), so a page is recognized once, whichever file or session
+it turns up in. write_searchable() adds the cached words to a copy of the
+document as invisible text.
+
+Qt-free: runs in worker processes.
+"""
+from array import array
+import hashlib
+import os
+import shutil
+import sqlite3
+
+from app import workers
+from app.lazy import lazy_import
+from app.pdfops import open_document as open_copy
+from app.rasterize import open_document
+
+fitz = lazy_import("fitz")  # PyMuPDF
+
+
+OCR_DPI = 300
+OCR_LANGUAGE = "eng"
+OCR_BATCH_PAGES = 4   # pages per worker task; scans among them are recognized in turn
+OCR_NICE = 10         # workers yield the CPU to rendering
+MIN_CONFIDENCE = 30   # Tesseract word confidence (0-100) below which words are dropped
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ocr_pages (
+    hash TEXT PRIMARY KEY, text TEXT NOT NULL, boxes BLOB NOT NULL, lines BLOB NOT NULL);
+"""
+
+_niced = False
+
+
+def available() -> bool:
+    """Whether pytesseract and the tesseract program are installed."""
+    try:
+        import pytesseract
+    except ImportError:
+        return False
+    return shutil.which(pytesseract.pytesseract.tesseract_cmd) is not None
+
+
+def needs_ocr(page) -> bool:
+    """Whether *page* looks scanned: images, and no fonts to draw text with."""
+    return not page.get_fonts() and bool(page.get_images())
+
+
+def page_hash(doc, page) -> str:
+    """Hash of what *page* shows: its content, images, size and rotation."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(repr((tuple(page.mediabox), page.rotation)).encode())
+    h.update(page.read_contents())
+    for img in page.get_images():
+        h.update(doc.xref_stream_raw(img[0]) or b"")
+    return h.hexdigest()
+
+
+def recognize(page):
+    """Return (text, boxes, lines) of the words Tesseract reads on *page*."""
+    import pytesseract
+    from PIL import Image
+
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")  # parallel across processes instead
+    zoom = OCR_DPI / 72
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    data = pytesseract.image_to_data(img, lang=OCR_LANGUAGE, output_type=pytesseract.Output.DICT)
+    to_page = fitz.Matrix(1 / zoom, 1 / zoom) * page.derotation_matrix
+    words, boxes, lines = [], array("f"), array("i")
+    for i, word in enumerate(data["text"]):
+        word = word.strip()
+        if not word or float(data["conf"][i]) < MIN_CONFIDENCE:
+            continue
+        x, y, w, h = data["left"][i], data["top"][i], data["width"][i], data["height"][i]
+        words.append(word)
+        boxes.extend(fitz.Rect(x, y, x + w, y + h) * to_page)
+        lines.extend((data["block_num"][i], data["par_num"][i] * 1000 + data["line_num"][i]))
+    return " ".join(words), boxes, lines
+
+
+class OcrCache:
+    """Recognized words of pages by page hash, in the index database."""
+
+    def __init__(self, db_path: str):
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, key: str):
+        row = self.conn.execute("SELECT text, boxes, lines FROM ocr_pages WHERE hash = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return row[0], array("f", row[1]), array("i", row[2])
+
+    def put(self, key: str, text: str, boxes, lines):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO ocr_pages VALUES (?, ?, ?, ?)",
+                              (key, text, boxes.tobytes(), lines.tobytes()))
+
+    def words(self, doc, page):
+        """(text, boxes, lines) of *page*, recognized now if not cached yet."""
+        key = page_hash(doc, page)
+        found = self.get(key)
+        if found is None:
+            found = recognize(page)
+            self.put(key, *found)
+        return found
+
+
+def _lower_priority():
+    global _niced
+    if not _niced and hasattr(os, "nice"):
+        os.nice(OCR_NICE)
+    _niced = True
+
+
+def ocr_pages(db_path: str, path: str, password: str, pages) -> list:
+    """Worker entry point: ``(page, text, boxes, lines)`` of the scanned
+    pages among *pages* of *path*."""
+    _lower_priority()
+    doc = open_document(path, password)
+    cache = OcrCache(db_path)
+    try:
+        return [(i, *cache.words(doc, doc[i])) for i in pages if needs_ocr(doc[i])]
+    finally:
+        cache.close()
+
+
+def add_text_layer(page, text: str, boxes):
+    """Draw the words of *text* invisibly over *page*, each stretched to its box."""
+    shape = page.new_shape()
+    for n, word in enumerate(text.split(" ") if text else ()):
+        r = fitz.Rect(*boxes[4 * n:4 * n + 4])
+        width = fitz.get_text_length(word, "helv", r.height)
+        if r.is_empty or not width:
+            continue
+        shape.insert_text(r.bl, word, fontname="helv", fontsize=r.height, render_mode=3,
+                          morph=(r.bl, fitz.Matrix(r.width / width, 1)))
+    shape.commit()
+
+
+def write_searchable(db_path: str, src_path: str, out_path: str, password: str = None,
+                     progress=None, should_cancel=None) -> int:
+    """Copy *src_path* to *out_path* with a text layer on its scanned pages,
+    recognizing those not cached yet. Returns the number of such pages."""
+    _lower_priority()
+    doc = open_copy(src_path, password)
+    cache = OcrCache(db_path)
+    try:
+        scans = [i for i in range(len(doc)) if needs_ocr(doc[i])]
+        for n, i in enumerate(scans):
+            if should_cancel and should_cancel():
+                raise workers.Cancelled()
+            text, boxes, _lines = cache.words(doc, doc[i])
+            add_text_layer(doc[i], text, boxes)
+            if progress:
+                progress(n + 1, len(scans))
+        doc.save(out_path, garbage=3, deflate=True)
+        return len(scans)
+    finally:
+        cache.close()
+        doc.close()
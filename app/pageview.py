@@ -0,0 +1,165 @@
+"""
+Page canvas for the PDFTab scroll area.
+
+Small renders are shown as one image. Past FULL_RENDER_MAX_PIXELS the page is
+shown as a grid of TILE_SIZE tiles drawn over a low-resolution preview, and
+only the tiles intersecting the viewport are ever rasterized.
+
+Search hits, the current hit and annotations not yet in the raster are a
+vector overlay painted on top (paint_overlay), so changing them never costs a
+re-render.
+"""
+from PySide6.QtCore import Qt, QRect, QRectF, QSize
+from PySide6.QtGui import QColor, QPainter, QPen
+from PySide6.QtWidgets import QWidget
+
+
+TILE_SIZE = 512                   # device pixels per tile edge
+FULL_RENDER_MAX_PIXELS = 8_000_000  # ~24 MB RGB; larger pages are tiled
+PREVIEW_MAX_PIXELS = 1_000_000    # low-res stand-in shown under missing tiles
+
+HIT_COLOR = QColor(255, 235, 59, 120)
+CURRENT_HIT_COLOR = QColor(255, 152, 0, 150)
+CURRENT_HIT_PEN = QColor(230, 81, 0)
+HIGHLIGHT_ANNOT_COLOR = QColor(255, 255, 0)  # multiplied, like MuPDF's highlight appearance
+NOTE_ANNOT_COLOR = QColor(255, 213, 79)
+
+
+def tile_rect(tx: int, ty: int, size: QSize, tile: int = TILE_SIZE) -> QRect:
+    x, y = tx * tile, ty * tile
+    return QRect(x, y, min(tile, size.width() - x), min(tile, size.height() - y))
+
+
+def tiles_in(rect: QRect, size: QSize, tile: int = TILE_SIZE):
+    """(tx, ty) of every tile of a *size* page intersecting *rect*, centre first."""
+    rect = rect.intersected(QRect(0, 0, size.width(), size.height()))
+    if rect.isEmpty():
+        return []
+    xs = range(rect.left() // tile, rect.right() // tile + 1)
+    ys = range(rect.top() // tile, rect.bottom() // tile + 1)
+    c = rect.center()
+    return sorted(((tx, ty) for ty in ys for tx in xs),
+                  key=lambda t: abs(t[0] * tile + tile / 2 - c.x()) + abs(t[1] * tile + tile / 2 - c.y()))
+
+
+def to_pixels(r, zoom: float, x: float = 0, y: float = 0) -> QRectF:
+    """fitz.Rect *r* in page points as a QRectF at *zoom*, offset by (x, y)."""
+    return QRectF(x + r.x0 * zoom, y + r.y0 * zoom, r.width * zoom, r.height * zoom)
+
+
+def paint_overlay(p: QPainter, hits=(), current=None, annots=()):
+    """Paint pending annotations, search hits and the current hit (QRectF in
+    device pixels; *annots* are ``(kind, rect)``, kind "highlight" or "note")."""
+    p.save()
+    p.setPen(Qt.NoPen)
+    for kind, r in annots:
+        if kind == "highlight":
+            p.setCompositionMode(QPainter.CompositionMode_Multiply)
+            p.setBrush(HIGHLIGHT_ANNOT_COLOR)
+            p.drawRect(r)
+            p.setCompositionMode(QPainter.CompositionMode_SourceOver)
+        else:
+            p.setPen(QPen(Qt.black, 1))
+            p.setBrush(NOTE_ANNOT_COLOR)
+            p.drawRoundedRect(r, 2, 2)
+            p.setPen(Qt.NoPen)
+    p.setBrush(HIT_COLOR)
+    for r in hits:
+        p.drawRect(r)
+    if current is not None:
+        p.setPen(QPen(CURRENT_HIT_PEN, 2))
+        p.setBrush(CURRENT_HIT_COLOR)
+        p.drawRect(current)
+    p.restore()
+
+
+class PageCanvas(QWidget):
+    """Paints a page from a full image, or from a preview plus sharp tiles."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._image = None
+        self._preview = None
+        self._tiles = {}         # (tx, ty) -> QImage
+        self._highlights = []    # QRectF in canvas pixels
+        self._current = None     # the current search hit, emphasised
+        self._annots = []        # (kind, QRectF) edits not yet in the raster
+        self.tiled = False
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+
+    # ---------- Content ---------- #
+    def show_image(self, qimg):
+        self._image, self._preview, self._tiles = qimg, None, {}
+        self.tiled = False
+        self.resize(qimg.size())
+        self.update()
+
+    def show_tiled(self, size: QSize, preview=None):
+        self._image, self._preview, self._tiles = None, preview, {}
+        self.tiled = True
+        self.resize(size)
+        self.update()
+
+    def clear(self):
+        """Drop every raster; the size, and so the scroll position, stays."""
+        self._image, self._preview, self._tiles = None, None, {}
+        self.tiled = False
+        self.update()
+
+    def set_preview(self, qimg):
+        self._preview = qimg
+        self.update()
+
+    def set_tile(self, tx: int, ty: int, qimg):
+        self._tiles[(tx, ty)] = qimg
+        self.update(tile_rect(tx, ty, self.size()))
+
+    def has_tile(self, tx: int, ty: int) -> bool:
+        return (tx, ty) in self._tiles
+
+    def retain_tiles(self, keep):
+        """Forget tiles not in *keep*; the page cache still owns their images."""
+        self._tiles = {k: v for k, v in self._tiles.items() if k in keep}
+
+    def is_complete(self) -> bool:
+        """Whether the visible part is drawn at full resolution."""
+        if not self.tiled:
+            return self._image is not None
+        return all(t in self._tiles for t in tiles_in(self.visible_rect(), self.size()))
+
+    def set_highlights(self, rects, current=None, annots=()):
+        """Overlay *rects* (search hits), *current* and pending *annots*.
+
+        When only the current hit moves, just its old and new spots repaint.
+        """
+        rects, annots = list(rects), list(annots)
+        if rects == self._highlights and annots == self._annots:
+            if current != self._current:
+                for r in (self._current, current):
+                    if r is not None:
+                        self.update(r.adjusted(-2, -2, 2, 2).toAlignedRect())
+                self._current = current
+            return
+        self._highlights, self._current, self._annots = rects, current, annots
+        self.update()
+
+    def visible_rect(self) -> QRect:
+        return self.visibleRegion().boundingRect()
+
+    # ---------- Painting ---------- #
+    def paintEvent(self, e):
+        p = QPainter(self)
+        p.fillRect(e.rect(), Qt.white)
+        if self._image is not None:
+            p.drawImage(e.rect(), self._image, e.rect())
+        else:
+            if self._preview is not None:
+                p.setRenderHint(QPainter.SmoothPixmapTransform)
+                p.drawImage(self.rect(), self._preview)
+            for (tx, ty) in tiles_in(e.rect(), self.size()):
+                img = self._tiles.get((tx, ty))
+                if img is not None:
+                    p.drawImage(tile_rect(tx, ty, self.size()).topLeft(), img)
+        if self._highlights or self._current is not None or self._annots:
+            paint_overlay(p, self._highlights, self._current, self._annots)
+        p.end()
@@ -0,0 +1,641 @@
+"""
+PDF file operations shared by the GUI and the command-line tool.
+
+Qt-free, so it can run headless and inside worker processes.
+"""
+from concurrent.futures import FIRST_COMPLETED, wait
+import importlib.util
+import io
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from app import rasterize, workers
+from app.lazy import lazy_import
+from app.rasterize import PasswordRequired
+from app.source import map_file
+from app.workers import Cancelled
+
+fitz = lazy_import("fitz")  # PyMuPDF
+pypdf = lazy_import("pypdf")  # encryption
+pikepdf = lazy_import("pikepdf")  # linearization
+
+
+MERGE_FLUSH_PAGES = 500               # pages held in memory before flushing
+MERGE_FLUSH_BYTES = 64 * 1024 * 1024  # input bytes merged before flushing
+EXTRACT_STEP_PAGES = 200              # pages copied between progress reports
+
+IMAGE_FORMATS = {"png": "png", "jpeg": "jpg", "webp": "webp"}  # format -> file extension
+EXPORT_BATCH_PAGES = 4           # most pages per export task
+EXPORT_INFLIGHT_PER_WORKER = 2   # export batches queued or running per worker
+
+# Optimization profile -> (image dpi, JPEG quality), or None to leave images alone
+OPTIMIZE_PROFILES = {"lossless": None, "ebook": (150, 80), "screen": (96, 65)}
+DOWNSAMPLE_SLACK = 1.2      # images are downsampled only when above dpi * this
+RECOMPRESS_MIN_GAIN = 0.9   # a re-encoded image replaces the original only below this fraction of its size
+
+
+def page_spans(s: str, page_count: int = None):
+    """0-based ``(first, last)`` page spans, inclusive, of a spec such as
+    "1-3,5,9-" (pages are 1-based; "9-" runs to the end, "-3" from the start).
+
+    Nothing is expanded page by page. With *page_count*, spans are clipped to
+    the document and those entirely outside it dropped. Raises ValueError on
+    malformed or reversed ranges.
+    """
+    spans = []
+    for part in s.replace(" ", "").split(","):
+        if not part:
+            continue
+        a, sep, b = part.partition("-")
+        try:
+            first = int(a) if a else 1
+            last = int(b) if b else (page_count if sep else first)
+        except ValueError:
+            raise ValueError(f"invalid page range {part!r}") from None
+        if last is None:
+            raise ValueError(f"open-ended page range {part!r} needs a page count")
+        if first < 1:
+            raise ValueError(f"invalid page range {part!r}: pages start at 1")
+        if last < first and b:  # not "30-" of fewer pages: that one is just past the end
+            raise ValueError(f"reversed page range {part!r}")
+        if page_count is not None:
+            if first > page_count:
+                continue
+            last = min(last, page_count)
+        spans.append((first - 1, last - 1))
+    return spans
+
+
+def parse_ranges(s: str, page_count: int = None):
+    """Yield 1-based page numbers from a spec such as "1-3,5,7-9" (see page_spans)."""
+    for first, last in page_spans(s, page_count):
+        yield from range(first + 1, last + 2)
+
+
+def open_document(path: str, password: str = None):
+    """Open *path* with PyMuPDF, authenticating if needed."""
+    doc = fitz.open(path)
+    if doc.needs_pass and not doc.authenticate(password or ""):
+        doc.close()
+        raise PasswordRequired("Password required or incorrect")
+    return doc
+
+
+def open_reader(path: str, password: str = None) -> "pypdf.PdfReader":
+    """*path* for pypdf, read from a shared memory map instead of a private copy."""
+    reader = pypdf.PdfReader(map_file(path))
+    if reader.is_encrypted and not reader.decrypt(password or ""):
+        raise PasswordRequired("Password required or incorrect")
+    return reader
+
+
+def save_document(doc, out_path: str, user_password: str = None) -> bool:
+    """Save *doc*, in-memory edits included, to *out_path* in a single pass.
+
+    Saving back to the file *doc* was opened from appends an incremental
+    update, so it costs what the edits cost and not what the file weighs.
+    Files MuPDF had to repair cannot take one; they are rewritten whole into
+    a temporary file beside them, which then replaces them, keeping their
+    encryption. Anything else writes the whole document, AES-256 encrypted
+    when *user_password* is given. Returns whether the opened file was
+    updated.
+    """
+    if doc.name and os.path.exists(out_path) and os.path.samefile(out_path, doc.name):
+        if user_password:
+            raise ValueError("The open file cannot be encrypted in place; save to a new file instead.")
+        if doc.can_save_incrementally():
+            doc.saveIncr()
+            return True
+        fd, tmp = tempfile.mkstemp(suffix=".pdf", dir=os.path.dirname(os.path.abspath(out_path)))
+        os.close(fd)
+        try:
+            doc.save(tmp, encryption=fitz.PDF_ENCRYPT_KEEP)
+            shutil.copymode(out_path, tmp)
+            os.replace(tmp, out_path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        return True
+    if user_password:
+        doc.save(out_path, encryption=fitz.PDF_ENCRYPT_AES_256, user_pw=user_password, owner_pw=user_password)
+    else:
+        doc.save(out_path)
+    return False
+
+
+def encrypt(src_path: str, out_path: str, user_password: str, password: str = None) -> int:
+    """Write a password-protected copy of *src_path*. Returns the page count."""
+    reader = open_reader(src_path, password)
+    writer = pypdf.PdfWriter()
+    for page in reader.pages:
+        writer.add_page(page)
+    writer.encrypt(user_password)
+    with open(out_path, "wb") as f:
+        writer.write(f)
+    return len(reader.pages)
+
+
+def merge(paths, out_path: str, dedupe: bool = True, password: str = None,
+          progress=None, should_cancel=None) -> int:
+    """Concatenate *paths* into *out_path*. Returns the page count.
+
+    Inputs are opened and copied one at a time with insert_pdf. Every
+    MERGE_FLUSH_PAGES pages / MERGE_FLUSH_BYTES of input, the partial result is
+    appended to a temporary file with an incremental save and reopened, so
+    memory depends on that batch size and not on how many files are merged.
+    With *dedupe*, a final garbage-collecting save merges identical objects
+    (fonts, images, ...) shared between inputs; otherwise the temporary file
+    is moved into place as-is. Outlines are carried over with page offsets.
+    """
+    tmp = out_path + ".part"
+    out, flushed, pages, toc = fitz.open(), False, 0, []
+    since_pages = since_bytes = 0
+    try:
+        for n, path in enumerate(paths):
+            if should_cancel and should_cancel():
+                raise Cancelled()
+            src = open_document(path, password)
+            try:
+                toc += [[lvl, title, page + pages] for lvl, title, page in src.get_toc(simple=True)]
+                out.insert_pdf(src)
+                pages += len(src)
+                since_pages += len(src)
+            finally:
+                src.close()
+            since_bytes += os.path.getsize(path)
+            if since_pages >= MERGE_FLUSH_PAGES or since_bytes >= MERGE_FLUSH_BYTES:
+                out = _flush(out, tmp, flushed)
+                flushed, since_pages, since_bytes = True, 0, 0
+            if progress:
+                progress(n + 1, len(paths))
+        if toc:
+            out.set_toc(toc)
+        if dedupe or not flushed:
+            out.save(out_path, garbage=4 if dedupe else 1, deflate=True)
+            out.close()
+        else:
+            out.saveIncr()
+            out.close()
+            shutil.move(tmp, out_path)
+        return pages
+    finally:
+        if not out.is_closed:
+            out.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _flush(out, tmp: str, flushed: bool):
+    """Write pending pages of *out* to *tmp* and return a fresh handle on it."""
+    if flushed:
+        out.saveIncr()
+    else:
+        out.save(tmp)
+    out.close()
+    return fitz.open(tmp)
+
+
+# ---------- Extraction and splitting ---------- #
+def split_every(page_count: int, n: int):
+    """Page spans of consecutive *n*-page parts."""
+    if n < 1:
+        raise ValueError("parts need at least one page")
+    return [[(i, min(i + n, page_count) - 1)] for i in range(0, page_count, n)]
+
+
+def split_by_outline(toc, page_count: int, level: int = 1):
+    """``(title, spans)`` parts, one per outline entry at *level* in
+    ``get_toc(simple=True)`` form, each running to the next one. Pages before
+    the first entry form a leading part titled "". No entries, no parts."""
+    starts = {}
+    for lvl, title, page in toc:
+        if lvl == level and 1 <= page <= page_count:
+            starts.setdefault(page - 1, title)
+    if not starts:
+        return []
+    if 0 not in starts:
+        starts[0] = ""
+    firsts = sorted(starts)
+    ends = [f - 1 for f in firsts[1:]] + [page_count - 1]
+    return [(starts[f], [(f, e)]) for f, e in zip(firsts, ends)]
+
+
+def part_paths(out_dir: str, src_path: str, titles):
+    """Output file of each part: ``<stem>-02.pdf``, or ``<stem>-02-<title>.pdf``."""
+    stem = os.path.splitext(os.path.basename(src_path))[0]
+    digits = len(str(len(titles)))
+    paths = []
+    for n, title in enumerate(titles, 1):
+        slug = re.sub(r"[^\w-]+", "_", title or "").strip("_")[:40]
+        paths.append(os.path.join(out_dir, f"{stem}-{n:0{digits}d}{'-' + slug if slug else ''}.pdf"))
+    return paths
+
+
+def _part_toc(toc, spans):
+    """The outline entries of *toc* that fall in *spans*, renumbered for a
+    document made of just those pages, with levels kept valid for set_toc."""
+    new_page, n = {}, 0
+    for first, last in spans:
+        for p in range(first, last + 1):
+            n += 1
+            new_page.setdefault(p, n)
+    entries = [[lvl, title, new_page[page - 1]] for lvl, title, page in toc if page - 1 in new_page]
+    prev = 0
+    for e in entries:
+        e[0] = prev = min(e[0], prev + 1)
+    return entries
+
+
+def snapshot_pages(doc, pages) -> bytes:
+    """The *pages* (0-based, in that order) of the open *doc*, edits
+    included, as a PDF; see write_parts' *edited*."""
+    out = fitz.open()
+    try:
+        for p in pages:
+            out.insert_pdf(doc, from_page=p, to_page=p)
+        return out.tobytes(garbage=1)
+    finally:
+        out.close()
+
+
+def _runs(first: int, last: int, doc, edited: dict):
+    """``(source, from, to)`` runs copying pages *first*..*last*: from *doc*,
+    or one at a time from where *edited* maps them to."""
+    a = first
+    for p in range(first, last + 1):
+        if p in edited:
+            if a < p:
+                yield doc, a, p - 1
+            src, i = edited[p]
+            yield src, i, i
+            a = p + 1
+    if a <= last:
+        yield doc, a, last
+
+
+def write_parts(doc, parts, step_pages: int = EXTRACT_STEP_PAGES, edited: dict = None):
+    """Copy ``(out_path, spans)`` parts of the open *doc* into new PDFs.
+
+    A generator: yields the pages copied after every *step_pages* pages, so
+    callers can report progress or cancel (close() it). Pages come from *doc*
+    as it is, unsaved edits included, except those *edited* maps to a
+    ``(document, page)`` to copy instead. insert_pdf copies only the objects
+    they reference, each at most once per output. Outline entries on the
+    copied pages are kept.
+    """
+    toc = doc.get_toc(simple=True)
+    for out_path, spans in parts:
+        out = fitz.open()
+        try:
+            for first, last in spans:
+                for a in range(first, last + 1, step_pages):
+                    b = min(last, a + step_pages - 1)
+                    for src, x, y in _runs(a, b, doc, edited or {}):
+                        out.insert_pdf(src, from_page=x, to_page=y)
+                    yield b - a + 1
+            part_toc = _part_toc(toc, spans)
+            if part_toc:
+                out.set_toc(part_toc)
+            out.save(out_path)
+        finally:
+            out.close()
+
+
+def extract_parts(doc, parts, progress=None, should_cancel=None, edited: dict = None) -> int:
+    """Write ``(out_path, spans)`` parts of *doc* (see write_parts), blocking.
+    Returns the pages written."""
+    total = sum(last - first + 1 for _, spans in parts for first, last in spans)
+    done = 0
+    steps = write_parts(doc, parts, edited=edited)
+    try:
+        for n in steps:
+            if should_cancel and should_cancel():
+                raise Cancelled()
+            done += n
+            if progress:
+                progress(done, total)
+    finally:
+        steps.close()
+    return done
+
+
+def extract_file_parts(src_path: str, parts, password: str = None, edited=None,
+                       progress=None, should_cancel=None) -> int:
+    """Worker entry point: extract_parts of the file *src_path*. *edited* is
+    ``(pdf bytes, pages)`` from snapshot_pages: pages with edits the file
+    does not have yet, taken from that PDF instead. Returns pages written."""
+    with open_document(src_path, password) as doc:
+        if not edited:
+            return extract_parts(doc, parts, progress, should_cancel)
+        data, pages = edited
+        with fitz.open("pdf", data) as snapshot:
+            return extract_parts(doc, parts, progress, should_cancel,
+                                 edited={p: (snapshot, i) for i, p in enumerate(pages)})
+
+
+def extract_pages(src_path: str, out_path: str, ranges_text: str, password: str = None) -> int:
+    """Save only the selected page ranges of *src_path*. Returns pages written."""
+    with open_document(src_path, password) as doc:
+        return extract_parts(doc, [(out_path, page_spans(ranges_text, len(doc)))])
+
+
+def split_file(src_path: str, out_dir: str, every: int = None, password: str = None):
+    """Split *src_path* into *every*-page parts, or one per top-level
+    bookmark without *every*. Returns ``(files written, pages)``."""
+    with open_document(src_path, password) as doc:
+        if every:
+            titles, spans = [""] * -(-len(doc) // every), split_every(len(doc), every)
+        else:
+            parts = split_by_outline(doc.get_toc(simple=True), len(doc))
+            if not parts:
+                raise ValueError("the document has no bookmarks to split at")
+            titles, spans = zip(*parts)
+        paths = part_paths(out_dir, src_path, list(titles))
+        return paths, extract_parts(doc, list(zip(paths, spans)))
+
+
+# ---------- Page images ---------- #
+def save_page_image(page, out_path: str, zoom: float = 1.0, fmt: str = "png", quality: int = 90):
+    """Render *page* at *zoom* to *out_path* as *fmt* (see IMAGE_FORMATS)."""
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    if fmt in ("jpeg", "webp"):
+        # Pillow (a reportlab dependency): MuPDF has no WebP writer and its
+        # JPEG encoder is several times slower than libjpeg-turbo.
+        pix.pil_save(out_path, format=fmt.upper(), quality=quality)
+    elif fmt == "png":
+        pix.save(out_path, output="png")
+    else:
+        raise ValueError(f"unknown image format {fmt!r}")
+
+
+def save_page_png(page, out_path: str, zoom: float = 1.0):
+    save_page_image(page, out_path, zoom)
+
+
+def export_page_png(src_path: str, out_path: str, page_no: int, zoom: float = 1.0,
+                    password: str = None):
+    """Render page *page_no* (0-based) of *src_path* to a PNG file."""
+    doc = open_document(src_path, password)
+    try:
+        save_page_png(doc[page_no], out_path, zoom)
+    finally:
+        doc.close()
+
+
+def image_paths(out_dir: str, src_path: str, pages, page_count: int, fmt: str = "png"):
+    """Output file of each 0-based page in *pages*: ``<stem>-p007.png``, the
+    number 1-based and padded to the width of *page_count*."""
+    stem = os.path.splitext(os.path.basename(src_path))[0]
+    digits = len(str(page_count))
+    return [os.path.join(out_dir, f"{stem}-p{p + 1:0{digits}d}.{IMAGE_FORMATS[fmt]}") for p in pages]
+
+
+def export_batch(src_path: str, password: str, pages, out_paths, zoom: float,
+                 fmt: str = "png", quality: int = 90, rotations=None) -> int:
+    """Worker task: render 0-based *pages* of *src_path* to *out_paths*.
+
+    Uses this process' own document handle (rasterize.open_document), kept
+    open for the next batch. *rotations*, if given, overrides each page's
+    rotation (unsaved rotations from the GUI). Returns pages written.
+    """
+    doc = rasterize.open_document(src_path, password)
+    for n, (p, out) in enumerate(zip(pages, out_paths)):
+        page = doc[p]
+        if rotations is not None and page.rotation != rotations[n]:
+            page.set_rotation(rotations[n])
+        save_page_image(page, out, zoom, fmt, quality)
+    return len(out_paths)
+
+
+def export_batches(pages, out_paths, n_workers: int):
+    """Split the work into ``(pages, out_paths)`` batches: big enough to keep
+    per-task overhead low, small enough to spread evenly over *n_workers*."""
+    size = max(1, min(EXPORT_BATCH_PAGES, len(pages) // (4 * n_workers)))
+    return [(pages[i:i + size], out_paths[i:i + size]) for i in range(0, len(pages), size)]
+
+
+def export_images(src_path: str, out_dir: str, pages, dpi: int = 150, fmt: str = "png",
+                  quality: int = 90, password: str = None, jobs: int = None,
+                  progress=None, should_cancel=None):
+    """Render 0-based *pages* of *src_path* into *out_dir*, split across the
+    "export" worker pool with at most EXPORT_INFLIGHT_PER_WORKER batches per
+    worker queued. Blocks until done; returns the files written, in page
+    order. (The GUI drives the same batches without blocking, see app.export.)
+    """
+    pages = list(pages)
+    with open_document(src_path, password) as doc:
+        count = len(doc)
+    os.makedirs(out_dir, exist_ok=True)
+    outs = image_paths(out_dir, src_path, pages, count, fmt)
+    jobs = jobs or workers.export_workers()
+    pool = workers.get_pool("export", jobs)
+    todo = iter(export_batches(pages, outs, jobs))
+    running, done = set(), 0
+    try:
+        while True:
+            if should_cancel and should_cancel():
+                raise Cancelled()
+            while len(running) < jobs * EXPORT_INFLIGHT_PER_WORKER:
+                batch = next(todo, None)
+                if batch is None:
+                    break
+                running.add(pool.submit(export_batch, src_path, password, *batch, dpi / 72, fmt, quality))
+            if not running:
+                return outs
+            finished, running = wait(running, timeout=0.1, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                done += fut.result()
+            if finished and progress:
+                progress(done, len(pages))
+    finally:
+        for fut in running:
+            fut.cancel()
+
+
+# ---------- Optimization ---------- #
+def image_dpis(doc) -> dict:
+    """Map image xref -> the highest resolution it is shown at, in dpi."""
+    dpis = {}
+    for page in doc:
+        for xref, _smask, width, height, *_ in page.get_images(full=True):
+            for r in page.get_image_rects(xref):
+                if r.width > 0 and r.height > 0:
+                    dpi = max(width * 72 / r.width, height * 72 / r.height)
+                    dpis[xref] = max(dpis.get(xref, 0), dpi)
+    return dpis
+
+
+def stored_size(doc, xref: int) -> int:
+    """Bytes the stream *xref* will take once strip_ascii_filters is done."""
+    size = len(doc.xref_stream_raw(xref))
+    kind, filters = doc.xref_get_key(xref, "Filter")
+    if kind == "array" and filters.startswith("[/ASCII85Decode"):
+        return size * 4 // 5
+    if kind == "array" and filters.startswith("[/ASCIIHexDecode"):
+        return size // 2
+    return size
+
+
+def recompress_images(doc, dpi: int, quality: int, progress=None, should_cancel=None) -> int:
+    """Re-encode the photo-like images of *doc* as JPEG at *quality*, scaled
+    down to *dpi* if shown sharper than that, where it makes them smaller.
+    Masks, bilevel scans (CCITT/JBIG2) and images with transparency are left
+    alone. Returns how many images were replaced."""
+    dpis = image_dpis(doc)
+    todo = {}
+    for page in doc:
+        for xref, smask, _w, _h, bpc, _cs, _alt, _name, filters, *_ in page.get_images(full=True):
+            if xref in dpis and xref not in todo and not smask and bpc >= 8 \
+                    and not any(f in filters for f in ("CCITTFax", "JBIG2", "JPX")):
+                todo[xref] = page
+    replaced = 0
+    for n, (xref, page) in enumerate(todo.items()):
+        if should_cancel and should_cancel():
+            raise Cancelled()
+        pix = fitz.Pixmap(doc, xref)
+        if not pix.alpha:
+            if pix.n > 3:
+                pix = fitz.Pixmap(fitz.csRGB, pix)
+            scale = dpi / dpis[xref]
+            if scale * DOWNSAMPLE_SLACK < 1:
+                pix = fitz.Pixmap(pix, max(1, int(pix.width * scale)), max(1, int(pix.height * scale)), None)
+            data = pix.pil_tobytes(format="JPEG", quality=quality, optimize=True)
+            if len(data) < stored_size(doc, xref) * RECOMPRESS_MIN_GAIN:
+                page.replace_image(xref, stream=data)
+                replaced += 1
+        if progress:
+            progress(n + 1, len(todo))
+    return replaced
+
+
+def subset_fonts(doc) -> bool:
+    """Cut embedded fonts down to the glyphs used; needs fontTools. Whether
+    that was done."""
+    if importlib.util.find_spec("fontTools") is None:
+        return False
+    doc.subset_fonts()
+    return True
+
+
+def strip_ascii_filters(pdf) -> int:
+    """Decode the ASCII85/ASCIIHex layer of *pdf*'s streams that have one in
+    front of another filter (typically JPEG images), which pikepdf leaves
+    alone; that layer makes them a quarter (hex: twice) as large again.
+    Returns how many streams were changed."""
+    stripped = 0
+    for obj in pdf.objects:
+        if not isinstance(obj, pikepdf.Stream):
+            continue
+        filters = obj.get("/Filter")
+        if not isinstance(filters, pikepdf.Array) or len(filters) < 2 \
+                or str(filters[0]) not in ("/ASCII85Decode", "/ASCIIHexDecode"):
+            continue
+        parms = obj.get("/DecodeParms")
+        obj.Filter = filters[0]  # so qpdf decodes that layer alone
+        if parms is not None:
+            del obj.DecodeParms
+        try:
+            data = obj.read_bytes()
+        except pikepdf.PdfError:
+            obj.Filter = filters
+            if parms is not None:
+                obj.DecodeParms = parms
+            continue
+        if isinstance(parms, pikepdf.Array):
+            parms = pikepdf.Array(list(parms)[1:])
+        obj.write(data, filter=pikepdf.Array(list(filters)[1:]), decode_parms=parms)
+        stripped += 1
+    return stripped
+
+
+def keep_encryption(src_path: str, password: str = None):
+    """The pikepdf.Encryption (AES-256) that gives a rewritten copy of
+    *src_path* the same passwords and permissions; None if it is not
+    encrypted. Raises PasswordRequired unless *password* is the owner
+    password, without which neither could be kept."""
+    with pikepdf.open(src_path, password=password or "") as pdf:
+        if not pdf.is_encrypted:
+            return None
+        if not pdf.owner_password_matched:
+            raise PasswordRequired("The owner password is needed to rewrite this protected PDF "
+                                   "with its passwords and permissions")
+        user, allow = pdf.encryption.user_password.decode("latin-1"), pdf.allow
+    if not user:  # none, or (revision 5+) not recoverable from the owner password
+        try:
+            pikepdf.open(src_path, password="").close()
+        except pikepdf.PasswordError:
+            raise PasswordRequired("The open password of this protected PDF cannot be recovered "
+                                   "from its owner password, so a rewritten copy could not keep it") from None
+    return pikepdf.Encryption(owner=password, user=user, R=6, allow=allow)
+
+
+def needs_owner_password(src_path: str, password: str = None) -> bool:
+    """Whether rewriting *src_path* (optimize) needs a password other than *password*."""
+    try:
+        keep_encryption(src_path, password)
+    except PasswordRequired:
+        return True
+    return False
+
+
+def optimize(src_path: str, out_path: str, profile: str = "lossless", password: str = None,
+             progress=None, should_cancel=None) -> dict:
+    """Write a smaller, linearized copy of *src_path* to *out_path*.
+
+    Images are recompressed as *profile* says (OPTIMIZE_PROFILES), fonts
+    subset, unused and duplicate objects dropped and streams deflated by
+    PyMuPDF; pikepdf then drops ASCII encodings, packs objects into object
+    streams and linearizes the file, so viewers can show the first page
+    before the rest has loaded. Encrypted inputs need their owner
+    *password* and keep both passwords and their permissions (see
+    keep_encryption); their decrypted intermediate stays in memory. Returns
+    sizes, counts and the seconds each stage took.
+    """
+    images = OPTIMIZE_PROFILES[profile]
+    encryption = keep_encryption(src_path, password)  # before any work: it may refuse
+    stats = {"input": src_path, "output": out_path, "profile": profile,
+             "bytes_before": os.path.getsize(src_path)}
+    t0 = time.perf_counter()
+    tmp = None
+    doc = open_document(src_path, password)
+    try:
+        stats["pages"] = len(doc)
+        stats["images"] = recompress_images(doc, *images, progress, should_cancel) if images else 0
+        stats["fonts_subset"] = subset_fonts(doc)
+        if should_cancel and should_cancel():
+            raise Cancelled()
+        opts = dict(garbage=3, clean=True, deflate=True, deflate_images=True, deflate_fonts=True)
+        if encryption:
+            rewritten = io.BytesIO(doc.tobytes(**opts))
+        else:
+            fd, tmp = tempfile.mkstemp(suffix=".pdf", dir=os.path.dirname(os.path.abspath(out_path)))
+            os.close(fd)
+            doc.save(tmp, **opts)
+            rewritten = tmp
+    except BaseException:
+        if tmp is not None:
+            os.remove(tmp)
+        raise
+    finally:
+        doc.close()
+    t1 = time.perf_counter()
+    try:
+        with pikepdf.open(rewritten) as pdf:
+            stats["ascii_stripped"] = strip_ascii_filters(pdf)
+            if encryption:  # pikepdf cannot recompress streams while encrypting
+                pdf.save(out_path, linearize=True, object_stream_mode=pikepdf.ObjectStreamMode.generate,
+                         encryption=encryption)
+            else:
+                pdf.save(out_path, linearize=True, compress_streams=True,
+                         stream_decode_level=pikepdf.StreamDecodeLevel.generalized,
+                         object_stream_mode=pikepdf.ObjectStreamMode.generate)
+    finally:
+        if tmp is not None:
+            os.remove(tmp)
+    t2 = time.perf_counter()
+    stats.update(bytes_after=os.path.getsize(out_path), rewrite_s=round(t1 - t0, 3),
+                 linearize_s=round(t2 - t1, 3), seconds=round(t2 - t0, 3))
+    return stats
@@ -0,0 +1,164 @@
+"""
+Lightweight timing and counter hooks for the hot paths.
+
+Spans (name, start, duration, args) go into a bounded ring buffer and into
+per-name statistics (count, last, p95 over a recent window). Everything can be
+exported as a summary JSON or as a Chrome trace (chrome://tracing, Perfetto)
+for profiling a slow document after the fact. Qt-free, cheap enough to stay
+on all the time.
+"""
+from collections import deque
+from contextlib import contextmanager
+import json
+import os
+import sys
+import threading
+import time
+
+
+MAX_EVENTS = 20000   # spans/samples kept for trace export
+STATS_WINDOW = 256   # recent durations per name used for percentiles
+
+_t0 = time.perf_counter()
+_lock = threading.Lock()
+_events = deque(maxlen=MAX_EVENTS)  # (ph, name, ts_us, dur_us, tid, args)
+_durations = {}                     # name -> deque of recent durations (s)
+_counts = {}                        # name -> total spans recorded
+_counters = {}                      # name -> running counter value
+
+
+def _us(t: float) -> float:
+    return round((t - _t0) * 1e6, 1)
+
+
+# ---------- Recording ---------- #
+def record(name: str, start: float, duration: float, **args):
+    """Record a span that started at perf_counter() *start*."""
+    with _lock:
+        _events.append(("X", name, _us(start), round(duration * 1e6, 1), threading.get_ident(), args))
+        window = _durations.get(name)
+        if window is None:
+            window = _durations[name] = deque(maxlen=STATS_WINDOW)
+        window.append(duration)
+        _counts[name] = _counts.get(name, 0) + 1
+
+
+@contextmanager
+def span(name: str, **args):
+    """``with perf.span("render_page", page=3): ...``"""
+    start = time.perf_counter()
+    try:
+        yield args
+    finally:
+        record(name, start, time.perf_counter() - start, **args)
+
+
+def count(name: str, n: int = 1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def sample(name: str, **values):
+    """Record counter values over time (shown as graphs in a Chrome trace)."""
+    with _lock:
+        _events.append(("C", name, _us(time.perf_counter()), 0, 0, values))
+
+
+def reset():
+    with _lock:
+        _events.clear()
+        _durations.clear()
+        _counts.clear()
+        _counters.clear()
+
+
+# ---------- Reading ---------- #
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def stats(name: str) -> dict:
+    """``{"count", "last_ms", "p50_ms", "p95_ms"}`` for spans called *name*."""
+    with _lock:
+        window = list(_durations.get(name, ()))
+        n = _counts.get(name, 0)
+    if not window:
+        return {"count": 0, "last_ms": None, "p50_ms": None, "p95_ms": None}
+    return {"count": n, "last_ms": round(window[-1] * 1000, 2),
+            "p50_ms": round(percentile(window, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(window, 0.95) * 1000, 2)}
+
+
+def counters() -> dict:
+    with _lock:
+        return dict(_counters)
+
+
+def rss_mb():
+    """Resident memory of this process in MB, or None if it can't be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class Counters(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                    (f, ctypes.c_size_t) for f in (
+                        "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage",
+                        "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage",
+                        "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+            c = Counters(cb=ctypes.sizeof(Counters))
+            proc = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(proc, ctypes.byref(c), c.cb):
+                return c.WorkingSetSize / (1024 * 1024)
+        except (OSError, AttributeError):
+            return None
+        return None
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak rather than current, but the best that is portable (macOS: bytes).
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# ---------- Export ---------- #
+def summary() -> dict:
+    with _lock:
+        names = list(_durations)
+    return {"spans": {n: stats(n) for n in sorted(names)}, "counters": counters(), "rss_mb": rss_mb()}
+
+
+def chrome_trace() -> dict:
+    """Events in the Chrome trace event format."""
+    pid = os.getpid()
+    with _lock:
+        events = list(_events)
+    out = [{"ph": "M", "name": "process_name", "pid": pid, "args": {"name": "PDF Reader"}}]
+    for ph, name, ts, dur, tid, args in events:
+        ev = {"ph": ph, "name": name, "ts": ts, "pid": pid, "tid": tid,
+              "args": {k: _jsonable(v) for k, v in args.items()}}
+        if ph == "X":
+            ev["dur"] = dur
+        out.append(ev)
+    return {"traceEvents": out, "displayTimeUnit": "ms"}
+
+
+def export(path: str, chrome: bool = True):
+    """Write a Chrome trace (default) or the summary JSON to *path*."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace() if chrome else summary(), f, indent=None if chrome else 2)
+
+
+def _jsonable(v):
+    return v if isinstance(v, (int, float, str, bool, type(None))) else str(v)
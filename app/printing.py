@@ -0,0 +1,183 @@
+"""
+Streaming print pipeline.
+
+Each page is rendered at the printer's own resolution (fitted to the
+printable area) in horizontal strips of at most PRINT_STRIP_PIXELS. Strips are
+rasterized by the "print" worker pool, at most PRINT_LOOKAHEAD at a time, into
+reused shared-memory slabs, and painted onto the printer in order on the GUI
+thread, so memory stays constant whatever the document or printer resolution
+and the window stays responsive.
+"""
+from collections import deque, namedtuple
+import time
+
+from PySide6.QtCore import QObject, QPoint, QTimer, Signal
+from PySide6.QtGui import QPainter
+from PySide6.QtPrintSupport import QPrinter
+
+from app import perf, rasterize, workers
+from app.lazy import lazy_import
+from app.render import image_from_samples, render_image
+from app.tasks import when_done
+
+fitz = lazy_import("fitz")  # PyMuPDF
+
+
+PRINT_STRIP_PIXELS = 2_000_000  # ~6 MB RGB per strip
+PRINT_LOOKAHEAD = 6             # strips rendering or waiting to be painted
+PRINT_SLAB_BYTES = 3 * PRINT_STRIP_PIXELS + (1 << 16)  # an RGB strip, with rounding
+
+Strip = namedtuple("Strip", "seq page zoom pos clip rotation first last")
+
+
+def print_pages(printer: QPrinter, page_count: int, current_page: int = 0):
+    """0-based pages to print, per the range, order and copies chosen in the dialog."""
+    rng = printer.printRange()
+    if rng == QPrinter.CurrentPage:
+        pages = [current_page]
+    elif rng == QPrinter.PageRange:
+        ranges = [(r.from_, r.to) for r in printer.pageRanges().toRangeList()]
+        pages = [p - 1 for a, b in ranges for p in range(a, b + 1) if 1 <= p <= page_count]
+    else:
+        pages = list(range(page_count))
+    if printer.pageOrder() == QPrinter.LastPageFirst:
+        pages.reverse()
+    copies = printer.copyCount()
+    if copies > 1 and not printer.supportsMultipleCopies():
+        pages = pages * copies if printer.collateCopies() else [p for p in pages for _ in range(copies)]
+    return pages
+
+
+class PrintJob(QObject):
+    """Print *pages* (0-based) of a document; start() and keep a reference.
+
+    Pages in *dirty_pages* have unsaved edits only *doc* knows about, so they
+    are rendered from it on the GUI thread; everything else comes from *path*.
+    """
+    progress = Signal(int, int)   # (pages printed, pages to print)
+    finished = Signal()
+    failed = Signal(str)          # error message ("" when cancelled)
+
+    def __init__(self, printer: QPrinter, doc, path: str, pages, password: str = None,
+                 dirty_pages=(), parent=None):
+        super().__init__(parent)
+        self.printer = printer
+        self.doc = doc
+        self.path = path
+        self.password = password
+        self.pages = list(pages)
+        self.dirty_pages = set(dirty_pages)
+        self.cancelled = False
+        self.pages_done = 0
+        self._painter = QPainter()
+        self._plan = iter(())
+        self._inflight = deque()  # (Strip, Future, slab), in print order
+        self._slabs = workers.SlabPool(PRINT_SLAB_BYTES, PRINT_LOOKAHEAD)
+        self._started = None
+        self._fill_timer = QTimer(self, singleShot=True, interval=0)
+        self._fill_timer.timeout.connect(self._fill)
+
+    def start(self):
+        if not self.pages:
+            self.finished.emit()
+            return
+        if not self._painter.begin(self.printer):
+            self.failed.emit("Could not start printer.")
+            return
+        self._started = time.perf_counter()
+        self._plan = self._strips()
+        self._fill()
+
+    def cancel(self):
+        self._abort("")
+
+    # ---------- Internals ---------- #
+    def _abort(self, message: str):
+        """Stop printing and report *message* through failed ("" for a cancel)."""
+        if self.cancelled:
+            return
+        self.cancelled = True
+        self._slabs.close()
+        for _, fut, slab in self._inflight:
+            if fut is not None:
+                fut.cancel()
+            self._slabs.release(slab)  # unlinked; a worker still writing keeps its mapping
+        self._inflight.clear()
+        self.printer.abort()
+        if self._painter.isActive():
+            self._painter.end()
+        self.failed.emit(message)
+
+    def _strips(self):
+        area = self._painter.viewport()  # printable area in device pixels
+        for n, p in enumerate(self.pages):
+            page = self.doc[p]
+            r = page.rect
+            zoom = min(area.width() / r.width, area.height() / r.height)
+            w, h = max(1, int(r.width * zoom)), max(1, int(r.height * zoom))
+            x0 = (area.width() - w) // 2
+            rows = max(1, PRINT_STRIP_PIXELS // w)
+            for y in range(0, h, rows):
+                y1 = min(h, y + rows)
+                yield Strip(n, p, zoom, QPoint(x0, y), fitz.Rect(0, y / zoom, r.width, y1 / zoom),
+                            page.rotation, y == 0, y1 == h)
+
+    def _fill(self):
+        """Keep up to PRINT_LOOKAHEAD strips rendering ahead of the painter."""
+        while not self.cancelled and len(self._inflight) < PRINT_LOOKAHEAD:
+            strip = next(self._plan, None)
+            if strip is None:
+                break
+            if strip.page in self.dirty_pages:
+                self._inflight.append((strip, None, None))  # rendered locally when its turn comes
+                continue
+            slab = self._slabs.acquire()
+            fut = workers.get_pool("print").submit(
+                rasterize.render_page, self.path, self.password, strip.page, strip.zoom,
+                strip.rotation, tuple(strip.clip), out=slab.name if slab is not None else None)
+            self._inflight.append((strip, fut, slab))
+            when_done(fut, self._on_strip)
+        self._drain()
+
+    def _image(self, strip: Strip, fut, slab):
+        if fut is None or fut.exception():
+            # Edited pages, or a worker failure: render from our own document.
+            return render_image(self.doc[strip.page], strip.zoom, strip.clip)
+        w, h, stride, samples = fut.result()
+        return image_from_samples(w, h, stride, slab.buf if samples is None else samples)
+
+    def _on_strip(self, _fut):
+        if not self.cancelled:
+            self._fill_timer.start()
+
+    def _drain(self):
+        """Paint the strip at the head of the queue once it is ready.
+
+        One strip per event-loop turn, so the GUI never waits on more than one
+        strip's worth of painting (or local rendering).
+        """
+        if self.cancelled or not self._inflight:
+            return
+        strip, fut, slab = self._inflight[0]
+        if fut is not None and not fut.done():
+            return
+        self._inflight.popleft()
+        try:
+            image = self._image(strip, fut, slab)
+        finally:
+            self._slabs.release(slab)
+        if strip.first and strip.seq > 0 and not self.printer.newPage():
+            self._abort("The printer refused to start a new page.")
+            return
+        with perf.span("print_strip", page=strip.page):
+            self._painter.drawImage(strip.pos, image)
+        if strip.last:
+            self.pages_done += 1
+            self.progress.emit(self.pages_done, len(self.pages))
+        if self.pages_done == len(self.pages):
+            self._painter.end()
+            self._slabs.close()
+            perf.record("print", self._started, time.perf_counter() - self._started, pages=len(self.pages))
+            self.finished.emit()
+        else:
+            self._fill_timer.start()
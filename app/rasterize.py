@@ -0,0 +1,177 @@
+"""
+Qt-free page rasterization.
+
+These functions run inside the render worker processes (see app.render), so
+this module must not import PySide6. Each worker keeps its own small set of
+open fitz.Document handles, independent of the ones used by the GUI, and the
+display lists of recently rendered pages, so the tiles of a page interpret its
+content once. A handle is reopened when its file's size or modification time
+changes (an incremental save, say), dropping that file's display lists. Pixels are drawn straight into a caller's buffer (a QImage, or a
+shared-memory slab from the GUI) rather than into a pixmap that is copied.
+"""
+from collections import OrderedDict
+import os
+import time
+
+from app import workers
+from app.lazy import lazy_import
+
+fitz = lazy_import("fitz")  # PyMuPDF
+
+
+MAX_OPEN_DOCS = 8
+MAX_DISPLAY_LISTS = 4
+
+_open_docs = OrderedDict()      # (path, password) -> (fitz.Document, (size, mtime_ns) opened)
+_display_lists = OrderedDict()  # (path, password, page, rotation) -> fitz.DisplayList
+
+
+def preload():
+    """Import PyMuPDF now instead of on the first render."""
+    return fitz.VersionBind
+
+
+class PasswordRequired(RuntimeError):
+    """The document is encrypted and no (or a wrong) password was given."""
+
+
+def _file_version(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def _close(key):
+    doc, _version = _open_docs.pop(key)
+    for k in [k for k in _display_lists if k[:2] == key]:
+        del _display_lists[k]
+    doc.close()
+
+
+def open_document(path: str, password: str = None):
+    """Return this process' handle for *path*, opening it on first use and
+    again whenever the file has changed since."""
+    key = (path, password)
+    version = _file_version(path)
+    entry = _open_docs.get(key)
+    if entry is not None:
+        doc, opened = entry
+        if version is None or version == opened:  # gone from disk: keep what we have
+            _open_docs.move_to_end(key)
+            return doc
+        _close(key)
+    doc = fitz.open(path)
+    if doc.needs_pass and not doc.authenticate(password or ""):
+        doc.close()
+        raise PasswordRequired("Password required or incorrect")
+    _open_docs[key] = (doc, version)
+    while len(_open_docs) > MAX_OPEN_DOCS:
+        _close(next(iter(_open_docs)))
+    return doc
+
+
+def display_list(path: str, password: str, page_no: int, rotation: int = None):
+    """This process' display list of a page, recorded on first use.
+
+    *rotation* (default: the page's own) applies to this list only; the
+    cached document keeps the rotation saved in the file.
+    """
+    doc = open_document(path, password)  # drops stale display lists of a changed file
+    key = (path, password, page_no, rotation)
+    dlist = _display_lists.get(key)
+    if dlist is not None:
+        _display_lists.move_to_end(key)
+        return dlist
+    page = doc[page_no]
+    saved = page.rotation
+    if rotation is not None and saved != rotation:
+        page.set_rotation(rotation)
+        try:
+            dlist = page.get_displaylist()
+        finally:
+            page.set_rotation(saved)
+    else:
+        dlist = page.get_displaylist()
+    _display_lists[key] = dlist
+    while len(_display_lists) > MAX_DISPLAY_LISTS:
+        _display_lists.popitem(last=False)
+    return dlist
+
+
+def _bounds(dlist, zoom: float, clip):
+    mupdf = fitz.mupdf
+    rect = mupdf.fz_bound_display_list(dlist.this)
+    if clip is not None:
+        rect = mupdf.fz_intersect_rect(rect, mupdf.FzRect(*clip))
+    return rect, mupdf.fz_round_rect(mupdf.fz_transform_rect(rect, mupdf.FzMatrix(zoom, 0, 0, zoom, 0, 0)))
+
+
+def pixel_size(dlist, zoom: float, clip=None):
+    """``(width, height)`` of rendering *clip* (default: all) of *dlist* at
+    *zoom*; the same box ``get_pixmap()`` would produce."""
+    _, box = _bounds(dlist, zoom, clip)
+    return max(0, box.x1 - box.x0), max(0, box.y1 - box.y0)
+
+
+def draw(dlist, zoom: float, clip, buf, stride: int):
+    """Rasterize like ``get_pixmap(alpha=False)``, but as RGB888 rows *stride*
+    bytes apart straight into the writable buffer *buf*.
+
+    *buf* must hold ``stride * height`` bytes (see pixel_size). Returns
+    ``(width, height)``.
+    """
+    mupdf = fitz.mupdf
+    rect, box = _bounds(dlist, zoom, clip)
+    w, h = box.x1 - box.x0, box.y1 - box.y0
+    if w <= 0 or h <= 0:
+        return max(0, w), max(0, h)
+    pix = mupdf.fz_new_pixmap_with_data(mupdf.fz_device_rgb(), w, h, mupdf.FzSeparations(), 0,
+                                        stride, mupdf.python_mutable_buffer_data(buf))
+    mupdf.fz_clear_pixmap_with_value(pix, 0xFF)  # white background
+    ctm = mupdf.FzMatrix(zoom, 0, 0, zoom, -box.x0, -box.y0)
+    dev = mupdf.fz_new_draw_device_with_bbox(ctm, pix, mupdf.FzIrect(0, 0, w, h))
+    try:
+        mupdf.fz_run_display_list(dlist.this, dev, mupdf.FzMatrix(), rect, mupdf.FzCookie())
+    finally:
+        mupdf.fz_close_device(dev)
+    return w, h
+
+
+def render_page(path: str, password: str, page_no: int, zoom: float,
+                rotation: int = None, clip=None, out: str = None):
+    """Rasterize one page (or the *clip* rect of it) as RGB888.
+
+    Returns ``(width, height, stride, samples)`` so the result can cross a
+    process boundary and be wrapped in a QImage on the GUI side. With *out*,
+    the name of a workers.SlabPool slab, the pixels are drawn into the slab
+    and *samples* is None; results that don't fit come back as *samples*.
+    """
+    dlist = display_list(path, password, page_no, rotation)
+    w, h = pixel_size(dlist, zoom, clip)
+    stride = 3 * w
+    slab = workers.attach_slab(out) if out else None
+    if slab is not None and stride * h <= slab.size:
+        draw(dlist, zoom, clip, slab.buf, stride)
+        return w, h, stride, None
+    samples = bytearray(stride * h)
+    draw(dlist, zoom, clip, samples, stride)
+    return w, h, stride, samples
+
+
+def probe(path: str, password: str = None, zoom: float = 1.0) -> dict:
+    """Open *path* (keeping it open for later renders) and render page 0.
+
+    Used to open extra files in parallel: returns the page count, the first
+    page as render_page() output and phase timings, or ``needs_pass=True``.
+    """
+    t0 = time.perf_counter()
+    try:
+        doc = open_document(path, password)
+    except PasswordRequired:
+        return {"path": path, "needs_pass": True}
+    t1 = time.perf_counter()
+    first = render_page(path, password, 0, zoom) if len(doc) else None
+    return {"path": path, "needs_pass": False, "pages": len(doc), "first_page": first,
+            "open_ms": (t1 - t0) * 1000, "render_ms": (time.perf_counter() - t1) * 1000}
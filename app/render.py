@@ -0,0 +1,200 @@
+"""
+Background render scheduler.
+
+Pages are rasterized in a pool of worker processes (PyMuPDF holds the GIL
+while rendering, so threads would not keep the GUI responsive). Each worker
+opens its own fitz.Document handle via app.rasterize. Jobs wait in a priority
+queue on the GUI side and only as many as there are workers are handed to the
+pool at a time, so stale jobs can still be dropped before they start.
+
+Workers draw each result straight into a shared-memory slab handed out with
+the job, and the GUI copies it once into the QImage it keeps; only results
+without a slab (all in use, or too big) travel back through the pipe.
+"""
+from concurrent.futures.process import BrokenProcessPool
+import heapq
+import itertools
+import time
+
+from PySide6.QtCore import QObject, Signal, QCoreApplication
+from PySide6.QtGui import QImage
+
+from app import perf, rasterize, workers
+from app.pageview import FULL_RENDER_MAX_PIXELS, TILE_SIZE
+from app.tasks import when_done
+
+
+PRIORITY_VISIBLE = 0
+PRIORITY_PREFETCH = 1
+PRIORITY_THUMBNAIL = 2
+
+SMALL_SLAB_BYTES = 3 * TILE_SIZE * TILE_SIZE                # a tile or thumbnail
+LARGE_SLAB_BYTES = 3 * FULL_RENDER_MAX_PIXELS + (1 << 20)   # a whole page, with rounding
+LARGE_SLABS = 4  # resident once used, so only a few for whole pages
+
+
+class RenderJob:
+    """One rasterization request. *owner* and *kind* are used for cancellation."""
+
+    __slots__ = ("owner", "kind", "path", "password", "page", "zoom", "rotation",
+                 "clip", "priority", "rank", "tag", "cancelled", "submitted")
+
+    def __init__(self, owner, kind: str, path: str, page: int, zoom: float,
+                 rotation: int = None, password: str = None, clip=None,
+                 priority: int = PRIORITY_VISIBLE, rank: int = 0, tag=None):
+        self.owner = owner
+        self.kind = kind
+        self.path = path
+        self.password = password
+        self.page = page
+        self.zoom = zoom
+        self.rotation = rotation
+        self.clip = clip
+        self.priority = priority
+        self.rank = rank
+        self.tag = tag  # caller data, e.g. tile coordinates
+        self.cancelled = False
+        self.submitted = None  # perf_counter() at submit, for latency stats
+
+    def args(self):
+        clip = tuple(self.clip) if self.clip is not None else None
+        return (self.path, self.password, self.page, self.zoom, self.rotation, clip)
+
+
+def image_from_samples(width: int, height: int, stride: int, samples) -> QImage:
+    """Copy RGB888 *samples* (bytes, or a buffer such as a slab) into a QImage."""
+    with perf.span("to_qimage", w=width, h=height):
+        return QImage(samples, width, height, stride, QImage.Format_RGB888).copy()
+
+
+def render_image(page, zoom: float, clip=None) -> QImage:
+    """Rasterize a fitz page (or its *clip* rect) straight into a new QImage."""
+    dlist = page.get_displaylist()
+    w, h = rasterize.pixel_size(dlist, zoom, clip)
+    img = QImage(w, h, QImage.Format_RGB888)
+    if not img.isNull():
+        rasterize.draw(dlist, zoom, clip, img.bits(), img.bytesPerLine())
+    return img
+
+
+class RenderScheduler(QObject):
+    rendered = Signal(object, QImage)   # (RenderJob, image)
+    failed = Signal(object, str)        # (RenderJob, error message)
+
+    def __init__(self, max_workers: int = None, pool: str = "render", parent=None):
+        super().__init__(parent)
+        self.max_workers = max_workers or workers.default_workers()
+        self.pool = pool
+        self._queue = []  # heap of (priority, rank, seq, job)
+        self._seq = itertools.count()
+        self._running = {}  # job -> (slab pool, slab or None)
+        self._small_slabs = workers.SlabPool(SMALL_SLAB_BYTES, self.max_workers + 1)
+        self._large_slabs = workers.SlabPool(LARGE_SLAB_BYTES, LARGE_SLABS)
+
+    # ---------- Public API ---------- #
+    def submit(self, job: RenderJob):
+        job.submitted = time.perf_counter()
+        heapq.heappush(self._queue, (job.priority, job.rank, next(self._seq), job))
+        self._pump()
+
+    def cancel(self, owner=None, kind: str = None, keep=None):
+        """Cancel queued and in-flight jobs matching *owner*/*kind*.
+
+        *keep* is an optional predicate; jobs for which it returns True survive.
+        Jobs already running finish in the worker but their result is dropped.
+        """
+        def matches(job):
+            return ((owner is None or job.owner is owner)
+                    and (kind is None or job.kind == kind)
+                    and not (keep and keep(job)))
+
+        kept = []
+        for entry in self._queue:
+            if matches(entry[3]):
+                entry[3].cancelled = True
+            else:
+                kept.append(entry)
+        if len(kept) != len(self._queue):
+            self._queue = kept
+            heapq.heapify(self._queue)
+        for job in self._running:
+            if matches(job):
+                job.cancelled = True
+
+    def promote(self, job: RenderJob, priority: int = PRIORITY_VISIBLE, kind: str = None):
+        """Move a queued job up to *priority* (and optionally relabel it)."""
+        job.priority = min(job.priority, priority)
+        if kind is not None:
+            job.kind = kind
+        for i, entry in enumerate(self._queue):
+            if entry[3] is job:
+                self._queue[i] = (job.priority, job.rank, entry[2], job)
+                heapq.heapify(self._queue)
+                break
+
+    def pending(self, owner=None, kind: str = None):
+        jobs = [e[3] for e in self._queue] + list(self._running)
+        return [j for j in jobs if not j.cancelled
+                and (owner is None or j.owner is owner) and (kind is None or j.kind == kind)]
+
+    def is_idle(self) -> bool:
+        """No jobs queued or running (cancelled ones still occupy a worker)."""
+        return not self._queue and not self._running
+
+    def shutdown(self):
+        self._queue.clear()
+        workers.reset_pool(self.pool)
+        self._small_slabs.close()
+        self._large_slabs.close()
+
+    # ---------- Internals ---------- #
+    def _pump(self):
+        while self._queue and len(self._running) < self.max_workers:
+            job = heapq.heappop(self._queue)[3]
+            slabs = self._small_slabs if job.kind in ("tile", "thumb") else self._large_slabs
+            slab = slabs.acquire()
+            out = slab.name if slab is not None else None
+            try:
+                fut = workers.get_pool(self.pool, self.max_workers).submit(
+                    rasterize.render_page, *job.args(), out=out)
+            except BrokenProcessPool:
+                workers.reset_pool(self.pool)
+                fut = workers.get_pool(self.pool, self.max_workers).submit(
+                    rasterize.render_page, *job.args(), out=out)
+            self._running[job] = (slabs, slab)
+            when_done(fut, lambda f, j=job: self._on_finished(j, f))
+
+    def _on_finished(self, job: RenderJob, fut):
+        slabs, slab = self._running.pop(job)
+        self._pump()
+        try:
+            if job.cancelled:
+                perf.count("render_jobs_dropped")
+                return
+            perf.record("render_job", job.submitted, time.perf_counter() - job.submitted,
+                        kind=job.kind, page=job.page, zoom=job.zoom)
+            err = fut.exception()
+            if err is not None:
+                if isinstance(err, BrokenProcessPool):
+                    workers.reset_pool(self.pool)
+                self.failed.emit(job, str(err))
+                return
+            w, h, stride, samples = fut.result()
+            qimg = image_from_samples(w, h, stride, slab.buf if samples is None else samples)
+        finally:
+            slabs.release(slab)
+        self.rendered.emit(job, qimg)
+
+
+_shared = None
+
+
+def shared_scheduler() -> RenderScheduler:
+    """The application-wide scheduler, created on first use."""
+    global _shared
+    if _shared is None:
+        app = QCoreApplication.instance()
+        _shared = RenderScheduler(parent=app)
+        if app is not None:
+            app.aboutToQuit.connect(_shared.shutdown)
+    return _shared
@@ -0,0 +1,244 @@
+"""
+Background text indexing, OCR and incremental search for a PDFTab.
+
+A DocumentIndexer hashes the file and fills the persistent TextIndex in
+batches on a worker process, one batch at a time. A DocumentOcr recognizes
+the text of scanned pages across the "ocr" worker pool, the pages on screen
+first. A SearchRun answers a query from the pages indexed and recognized so
+far and scans the remaining pages in short slices on the GUI thread, starting
+at the current page and wrapping around, emitting hits as each page finishes.
+"""
+import time
+
+from PySide6.QtCore import QObject, Signal, QTimer
+
+from app import ocr, textindex, workers
+from app.storage import data_file
+from app.tasks import when_done
+
+
+INDEX_DB = "search_index.sqlite"
+SEARCH_SLICE_MS = 15  # GUI time spent scanning per event-loop turn
+
+
+class DocumentIndexer(QObject):
+    progress = Signal(int, int)  # (pages indexed, page count)
+
+    def __init__(self, file_path: str, page_count: int, password: str = None,
+                 db_path: str = None, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.password = password
+        self.page_count = page_count
+        self.db_path = db_path or data_file(INDEX_DB)
+        self.doc_hash = None
+        self.indexed = set()
+        self._index = None
+        self._running = False
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        fut = workers.get_pool("index", 1).submit(
+            textindex.prepare_index, self.db_path, self.file_path, self.page_count)
+        when_done(fut, self._on_prepared)
+
+    def stop(self):
+        self._running = False
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+    def is_complete(self) -> bool:
+        return len(self.indexed) >= self.page_count
+
+    def search(self, query: str):
+        """Return ``(hits, missing)``: page -> rects from the index, and the
+        set of pages that are not indexed yet."""
+        missing = set(range(self.page_count)) - self.indexed
+        if self._index is None or not self.indexed:
+            return {}, missing
+        return self._index.search(self.doc_hash, query), missing
+
+    # ---------- Internals ---------- #
+    def _on_prepared(self, fut):
+        if not self._running or fut.exception() is not None:
+            self._running = False
+            return
+        self.doc_hash, self.indexed = fut.result()
+        self._index = textindex.TextIndex(self.db_path)
+        self.progress.emit(len(self.indexed), self.page_count)
+        self._next_batch()
+
+    def _next_batch(self):
+        todo = [p for p in range(self.page_count) if p not in self.indexed]
+        if not self._running or not todo:
+            self._running = False
+            return
+        batch = todo[:textindex.INDEX_BATCH_PAGES]
+        fut = workers.get_pool("index", 1).submit(
+            textindex.index_pages, self.db_path, self.file_path, self.password, self.doc_hash, batch)
+        when_done(fut, self._on_batch)
+
+    def _on_batch(self, fut):
+        if not self._running:
+            return
+        if fut.exception() is not None:
+            self._running = False
+            return
+        self.indexed.update(fut.result())
+        self.progress.emit(len(self.indexed), self.page_count)
+        self._next_batch()
+
+
+class DocumentOcr(QObject):
+    """Scanned pages of a document, recognized in the background; their words
+    and boxes are kept in *pages* for search()."""
+    recognized = Signal(list)    # pages with new text
+    progress = Signal(int, int)  # (pages checked, page count)
+
+    def __init__(self, file_path: str, page_count: int, password: str = None,
+                 db_path: str = None, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.password = password
+        self.page_count = page_count
+        self.db_path = db_path or data_file(INDEX_DB)
+        self.pages = {}  # page -> (text, boxes, lines)
+        self.checked = 0
+        self._todo = list(range(page_count))
+        self._inflight = {}  # future -> its batch of pages
+        self._running = False
+
+    def start(self):
+        """Start, or carry on after stop(); a no-op without Tesseract."""
+        if self._running or self.is_complete() or not ocr.available():
+            return
+        self._running = True
+        self._fill()
+
+    def stop(self):
+        """Stop handing out pages; batches being recognized are dropped (their
+        pages come from the cache when started again)."""
+        self._running = False
+        for fut, batch in self._inflight.items():
+            fut.cancel()
+            self._todo[:0] = batch
+        self._inflight.clear()
+
+    def is_running(self) -> bool:
+        return self._running
+
+    def is_complete(self) -> bool:
+        return not self._todo and not self._inflight
+
+    def prioritize(self, pages):
+        """Recognize *pages* (those on screen) before the rest."""
+        wanted = [p for p in pages if p in self._todo]
+        if wanted:
+            self._todo = wanted + [p for p in self._todo if p not in wanted]
+
+    def search(self, query: str, pages=None) -> dict:
+        """Map page -> hit rects for *query* over the recognized pages, or
+        over those of them in *pages*."""
+        hits = {}
+        for page in (self.pages if pages is None else pages):
+            words = self.pages.get(page)
+            rects = textindex.find_rects(*words, query) if words else None
+            if rects:
+                hits[page] = rects
+        return hits
+
+    # ---------- Internals ---------- #
+    def _fill(self):
+        pool = workers.get_pool("ocr", workers.default_workers())
+        while self._running and self._todo and len(self._inflight) < workers.default_workers():
+            batch = self._todo[:ocr.OCR_BATCH_PAGES]
+            del self._todo[:ocr.OCR_BATCH_PAGES]
+            fut = pool.submit(ocr.ocr_pages, self.db_path, self.file_path, self.password, batch)
+            self._inflight[fut] = batch
+            when_done(fut, self._on_batch)
+        if not self._todo and not self._inflight:
+            self._running = False
+
+    def _on_batch(self, fut):
+        batch = self._inflight.pop(fut, None)
+        if batch is None:
+            return  # stopped meanwhile
+        if fut.exception() is not None:
+            self.stop()
+            return
+        found = fut.result()
+        for page, text, boxes, lines in found:
+            self.pages[page] = (text, boxes, lines)
+        self.checked += len(batch)
+        if found:
+            self.recognized.emit([page for page, *_ in found])
+        self.progress.emit(self.checked, self.page_count)
+        self._fill()
+
+
+def wrap_order(start: int, count: int):
+    """Page numbers from *start* to the end, then from 0 up to *start*."""
+    start = max(0, min(start, count - 1)) if count else 0
+    return list(range(start, count)) + list(range(0, start))
+
+
+class SearchRun(QObject):
+    """One cancellable search over a document."""
+    hits = Signal(int, list)       # (page, rects) for each page with hits
+    progress = Signal(int, int)    # (pages searched, page count)
+    finished = Signal()
+
+    def __init__(self, doc, query: str, start_page: int = 0, indexer=None, ocr=None, parent=None):
+        super().__init__(parent)
+        self.doc = doc
+        self.query = query
+        self.start_page = start_page
+        self.indexer = indexer
+        self.ocr = ocr  # a DocumentOcr; pages it recognized have no text of their own
+        self.done = 0
+        self.cancelled = False
+        self._todo = iter(())
+        self._timer = QTimer(self, singleShot=True, interval=0)
+        self._timer.timeout.connect(self._step)
+
+    def start(self):
+        n = len(self.doc)
+        indexed, missing = self.indexer.search(self.query) if self.indexer else ({}, set(range(n)))
+        if self.ocr is not None:
+            indexed.update(self.ocr.search(self.query))
+        order = wrap_order(self.start_page, n)
+        for i in order:
+            if i in indexed:
+                self.hits.emit(i, indexed[i])
+        self.done = n - len(missing)
+        self.progress.emit(self.done, n)
+        self._todo = iter([i for i in order if i in missing])
+        self._timer.start()
+
+    def cancel(self):
+        self.cancelled = True
+        self._timer.stop()
+
+    def is_running(self) -> bool:
+        return not self.cancelled and self.done < len(self.doc)
+
+    def _step(self):
+        if self.cancelled:
+            return
+        deadline = time.perf_counter() + SEARCH_SLICE_MS / 1000
+        for i in self._todo:
+            rects = self.doc[i].search_for(self.query, quads=False)
+            self.done += 1
+            if rects:
+                self.hits.emit(i, rects)
+            if self.cancelled:
+                return
+            if time.perf_counter() >= deadline:
+                self.progress.emit(self.done, len(self.doc))
+                self._timer.start()
+                return
+        self.progress.emit(self.done, len(self.doc))
+        self.finished.emit()
@@ -0,0 +1,88 @@
+"""
+Where a document's bytes come from.
+
+A DocumentSource is opened once per tab and everything else reads through
+it: the GUI's PyMuPDF document, the render/search/export workers (by path)
+and pypdf readers (map_file). Files stay where they are; MuPDF reads them
+through the OS page cache, which all those processes share. Byte streams
+(stdin, a pipe) are spooled once to a RAM-backed file, so they too have a
+path the workers can open, instead of every process getting its own copy of
+the bytes. pypdf is handed a read-only memory map rather than a path, since
+given a path it reads the whole file into memory. Qt-free.
+"""
+import atexit
+import mmap
+import os
+import shutil
+import tempfile
+
+from app.lazy import lazy_import
+from app.rasterize import PasswordRequired
+
+fitz = lazy_import("fitz")  # PyMuPDF
+
+
+SPOOL_DIRS = ("/dev/shm",)  # RAM-backed, tried before the temp directory
+STDIN = "-"                 # command-line name for "read the PDF from stdin"
+
+_spooled = set()  # spool files still on disk, removed at exit
+
+
+def map_file(path: str) -> mmap.mmap:
+    """*path* mapped read-only: a seekable, file-like view whose pages are
+    shared with every other reader of the file."""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _spool_dir() -> str:
+    for d in SPOOL_DIRS:
+        if os.path.isdir(d) and os.access(d, os.W_OK):
+            return d
+    return tempfile.gettempdir()
+
+
+class DocumentSource:
+    """A PDF file, or a byte stream spooled to one; *name* is for display."""
+
+    def __init__(self, path: str, name: str = None, spooled: bool = False):
+        self.path = path
+        self.name = name or os.path.basename(path)
+        self.spooled = spooled
+
+    @classmethod
+    def from_stream(cls, stream, name: str = "stdin") -> "DocumentSource":
+        """Read a binary *stream* to its end, once, into a spool file."""
+        fd, path = tempfile.mkstemp(prefix="pdfreader-", suffix=".pdf", dir=_spool_dir())
+        _spooled.add(path)
+        with os.fdopen(fd, "wb") as out:
+            shutil.copyfileobj(stream, out, 1 << 20)
+        return cls(path, name, spooled=True)
+
+    def open(self, password: str = None):
+        """The document as a fitz.Document, authenticated with *password*."""
+        doc = fitz.open(self.path)
+        if doc.needs_pass and not doc.authenticate(password or ""):
+            doc.close()
+            raise PasswordRequired("Password required or incorrect")
+        return doc
+
+    def close(self):
+        """Remove the spool file, if any; documents opened from it must be closed."""
+        if self.spooled and self.path in _spooled:
+            _spooled.discard(self.path)
+            _remove(self.path)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+@atexit.register
+def _remove_spooled():
+    for path in list(_spooled):
+        _remove(path)
+    _spooled.clear()
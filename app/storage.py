@@ -0,0 +1,18 @@
+"""
+On-disk locations for the app's caches, kept next to its QSettings store.
+"""
+import os
+
+from PySide6.QtCore import QSettings
+
+
+def data_dir() -> str:
+    """Directory for persistent caches (created on first use)."""
+    ini = QSettings(QSettings.IniFormat, QSettings.UserScope, "Cephy", "PDFReader").fileName()
+    path = os.path.join(os.path.dirname(ini), "PDFReader")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def data_file(name: str) -> str:
+    return os.path.join(data_dir(), name)
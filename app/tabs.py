@@ -0,0 +1,85 @@
+"""
+Keeps many open tabs within a memory budget.
+
+Background tabs hibernate, least recently shown first, whenever the rasters
+of all tabs together exceed a byte budget or more than a set number of
+documents are open (MuPDF's own memory per document is not measurable, so
+it is capped by count). A hibernated tab has closed its document and
+dropped its rasters; it reopens where it was left when shown again. Closed
+tabs are released for real instead of lingering.
+"""
+from PySide6.QtCore import QObject, QTimer, Signal
+
+
+TAB_MEMORY_BUDGET_MB = 1024  # rasters held by all tabs together
+MAX_AWAKE_TABS = 8           # documents kept open at once
+BUDGET_CHECK_MS = 2000       # how often background tabs are checked
+
+
+class TabManager(QObject):
+    """Wakes the current tab of *tabs* (a QTabWidget) and hibernates others
+    as needed. Tabs are those of its pages with hibernate()/wake()."""
+    wake_failed = Signal(object, str)  # (tab, error message)
+
+    def __init__(self, tabs, budget_bytes: int = TAB_MEMORY_BUDGET_MB * 1024 * 1024,
+                 max_awake: int = MAX_AWAKE_TABS, parent=None):
+        super().__init__(parent)
+        self.tabs = tabs
+        self.budget_bytes = budget_bytes
+        self.max_awake = max_awake
+        self._recent = []  # managed tabs, most recently shown last
+        tabs.currentChanged.connect(self._on_current_changed)
+        self._timer = QTimer(self, interval=BUDGET_CHECK_MS)
+        self._timer.timeout.connect(self.enforce)
+        self._timer.start()
+
+    def add(self, tab):
+        """Manage *tab*, already added to the tab widget."""
+        if tab is self.tabs.currentWidget():
+            self._recent.append(tab)
+        else:
+            self._recent.insert(0, tab)  # opened in the background: first to go
+        self.enforce()
+
+    def release(self, tab):
+        """A tab was closed: free what it holds and delete it."""
+        if tab in self._recent:
+            self._recent.remove(tab)
+        tab.release()
+        tab.deleteLater()
+
+    def awake(self):
+        return [t for t in self._recent if not t.hibernated]
+
+    def memory_bytes(self) -> int:
+        return sum(t.memory_bytes() for t in self.awake())
+
+    def enforce(self):
+        """Hibernate background tabs, least recently shown first, until
+        within the budget."""
+        current = self.tabs.currentWidget()
+        awake = self.awake()
+        total = sum(t.memory_bytes() for t in awake)
+        count = len(awake)
+        for tab in awake:
+            if total <= self.budget_bytes and count <= self.max_awake:
+                break
+            if tab is current:
+                continue
+            size = tab.memory_bytes()
+            if tab.hibernate():
+                total -= size
+                count -= 1
+
+    def _on_current_changed(self, index: int):
+        tab = self.tabs.widget(index)
+        if tab not in self._recent:
+            return
+        self._recent.remove(tab)
+        self._recent.append(tab)
+        try:
+            tab.wake()
+        except Exception as e:
+            self.wake_failed.emit(tab, str(e))
+            return
+        self.enforce()
@@ -0,0 +1,88 @@
+"""
+Qt glue for futures completed on worker threads, and for long operations
+running in a worker process with progress and cancellation.
+"""
+import queue
+
+from PySide6.QtCore import QObject, Signal, QCoreApplication, QTimer
+
+from app import workers
+
+
+class _Bridge(QObject):
+    done = Signal(object, object)  # (future, callback)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Methods, not plain functions: PySide tears a function's receiver
+        # down with a timer, which fails once the application is gone at exit.
+        self.done.connect(self._deliver)
+        if parent is not None:
+            parent.aboutToQuit.connect(self._quit)
+
+    def _deliver(self, fut, callback):
+        callback(fut)
+
+    def _quit(self):
+        workers.shutdown_pools()
+
+
+_bridge = None
+
+
+def when_done(fut, callback):
+    """Call ``callback(fut)`` on the GUI thread once *fut* has finished."""
+    global _bridge
+    if _bridge is None:
+        _bridge = _Bridge(QCoreApplication.instance())
+    fut.add_done_callback(lambda f: _bridge.done.emit(f, callback))
+
+
+class BackgroundTask(QObject):
+    """Run ``fn(*args, progress=..., should_cancel=..., **kwargs)`` in a worker
+    process (see workers.run_reporting) and relay its progress to the GUI."""
+    progress = Signal(int, int)   # (done, total)
+    finished = Signal(object)     # fn's return value
+    failed = Signal(str)          # error message ("" when cancelled)
+
+    def __init__(self, fn, *args, pool: str = "tasks", parent=None, **kwargs):
+        super().__init__(parent)
+        self.fn, self.args, self.kwargs, self.pool = fn, args, kwargs, pool
+        self.cancelled = False
+        self._events = self._cancel = None
+        self._poll = QTimer(self, interval=100)
+        self._poll.timeout.connect(self._drain)
+
+    def start(self):
+        mgr = workers.manager()
+        self._events, self._cancel = mgr.Queue(), mgr.Event()
+        fut = workers.get_pool(self.pool, 1).submit(
+            workers.run_reporting, self.fn, self._events, self._cancel, self.args, self.kwargs)
+        self._poll.start()
+        when_done(fut, self._on_done)
+
+    def cancel(self):
+        self.cancelled = True
+        if self._cancel is not None:
+            self._cancel.set()
+
+    def _drain(self):
+        last = None
+        try:
+            while True:
+                last = self._events.get_nowait()
+        except (queue.Empty, OSError, EOFError):
+            pass
+        if last is not None:
+            self.progress.emit(*last)
+
+    def _on_done(self, fut):
+        self._poll.stop()
+        self._drain()
+        err = fut.exception()
+        if err is None:
+            self.finished.emit(fut.result())
+        elif isinstance(err, workers.Cancelled) or self.cancelled:
+            self.failed.emit("")
+        else:
+            self.failed.emit(str(err))
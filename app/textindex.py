@@ -0,0 +1,275 @@
+"""
+Persistent full-text index of PDF pages.
+
+Page text and word boxes are extracted once per document and stored in an
+SQLite database, keyed by a hash of the file contents so the index survives
+renames and is reused across sessions. Text lives in an FTS5 trigram table,
+which lets ``LIKE '%query%'`` substring searches use the index; hit rectangles
+are rebuilt from the stored word boxes and character edges, matching those of
+MuPDF's own search, so no MuPDF work is needed to search.
+
+Qt-free: index_pages() runs in a background worker process.
+"""
+from array import array
+import hashlib
+import sqlite3
+import time
+
+from app.lazy import lazy_import
+from app.rasterize import open_document
+
+fitz = lazy_import("fitz")  # PyMuPDF
+
+
+HASH_CHUNK = 1024 * 1024
+INDEX_BATCH_PAGES = 50
+SNIPPET_CHARS = 80
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    hash TEXT PRIMARY KEY, pages INTEGER NOT NULL, opened REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS page_words (
+    hash TEXT NOT NULL, page INTEGER NOT NULL, boxes BLOB NOT NULL, lines BLOB NOT NULL,
+    edges BLOB, PRIMARY KEY (hash, page));
+CREATE VIRTUAL TABLE IF NOT EXISTS page_text USING fts5(
+    text, hash UNINDEXED, page UNINDEXED, tokenize='trigram');
+"""
+
+
+def file_hash(path: str) -> str:
+    """Content hash used as the document's index key."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def extract_words(page):
+    """Return (text, boxes, lines, edges) for a page.
+
+    *text* is the page's words joined by single spaces, *boxes* a flat float
+    array of x0, y0, x1, y1 per word, *lines* a (block, line) id per word and
+    *edges* the x0, x1 of every character of the words, in order. Characters
+    that can't be placed (vertical text, ligatures) get their word's.
+    """
+    tp = page.get_textpage(flags=fitz.TEXTFLAGS_WORDS)
+    words = tp.extractWORDS()
+    words.sort(key=lambda w: (w[3], w[0]))  # as get_text("words", sort=True)
+    chars = _word_chars(tp)
+    boxes, lines, edges = array("f"), array("i"), array("f")
+    for x0, y0, x1, y1, word, block, line, n in words:
+        boxes.extend((x0, y0, x1, y1))
+        lines.extend((block, line))
+        placed = chars.get((block, line, n))
+        if placed is not None and len(placed) == len(word):
+            for bbox in placed:
+                edges.extend((bbox[0], bbox[2]))
+        else:
+            edges.extend((x0, x1) * len(word))
+    return " ".join(w[4] for w in words), boxes, lines, edges
+
+
+def _word_chars(tp):
+    """Map (block, line, word) -> the char bboxes of the word, for the
+    horizontal lines of *tp*; words split where extractWORDS splits them."""
+    out = {}
+    for b, block in enumerate(tp.extractRAWDICT()["blocks"]):
+        for l, line in enumerate(block.get("lines", ())):
+            if line["dir"] != (1, 0):
+                continue
+            n, word = 0, []
+            for span in line["spans"]:
+                for ch in span["chars"]:
+                    if ord(ch["c"]) <= 32 or ch["c"] == "\xa0":
+                        if word:
+                            out[b, l, n], n, word = word, n + 1, []
+                    else:
+                        word.append(ch["bbox"])
+            if word:
+                out[b, l, n] = word
+    return out
+
+
+def find_rects(text: str, boxes, lines, query: str, edges=None):
+    """Hit rectangles of every case-insensitive occurrence of *query* in *text*.
+
+    Each occurrence yields one rect per text line it spans, from its first
+    to its last character when *edges* (see extract_words) are given, and
+    over the whole words it touches otherwise (OCR'd text). Like MuPDF's
+    search, occurrences don't overlap and those that touch share a rect.
+    """
+    q = " ".join(query.split()).lower()
+    if not q:
+        return []
+    starts, pos = [], 0
+    for w in text.split(" "):
+        starts.append(pos)
+        pos += len(w) + 1
+    hay = text.lower()
+    rects, at, cur = [], hay.find(q), None
+    while at != -1:
+        end = at + len(q) - 1
+        first = _word_at(starts, at)
+        last = _word_at(starts, end)
+        prev, cur = cur, None
+        for i in range(first, last + 1):
+            x0, y0, x1, y1 = boxes[4 * i:4 * i + 4]
+            if edges is not None:
+                # Character k of the text is character k - i of the words.
+                lo = max(at, starts[i]) - i
+                hi = min(end, starts[i + 1] - 2 if i + 1 < len(starts) else len(text) - 1) - i
+                if lo <= hi:
+                    x0, x1 = edges[2 * lo], edges[2 * hi + 1]
+            r = fitz.Rect(x0, y0, x1, y1)
+            lid = (lines[2 * i], lines[2 * i + 1])
+            if cur and cur[0] == lid:
+                cur[1].include_rect(r)
+            elif cur is None and prev and prev[0] == lid and abs(prev[1].x1 - r.x0) < 1e-3:
+                cur = prev
+                cur[1].include_rect(r)
+            else:
+                cur = [lid, r]
+                rects.append(r)
+        at = hay.find(q, end + 1)
+    return rects
+
+
+def snippet(text: str, query: str, chars: int = SNIPPET_CHARS) -> str:
+    """About *chars* characters of *text* around the first occurrence of *query*."""
+    q = " ".join(query.split()).lower()
+    at = max(0, text.lower().find(q))
+    start = max(0, at - max(0, chars - len(q)) // 2)
+    if start:
+        start = text.rfind(" ", 0, start) + 1  # from the start of a word
+    return ("…" if start else "") + text[start:start + chars] + ("…" if start + chars < len(text) else "")
+
+
+def _word_at(starts, offset):
+    lo, hi = 0, len(starts)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if starts[mid] <= offset:
+            lo = mid + 1
+        else:
+            hi = mid
+    return max(0, lo - 1)
+
+
+class TextIndex:
+    """Connection to the on-disk index database."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(page_words)")}
+        if "edges" not in columns:  # from before character edges: its pages are indexed again
+            with self.conn:
+                self.conn.execute("ALTER TABLE page_words ADD COLUMN edges BLOB")
+
+    def close(self):
+        self.conn.close()
+
+    def register(self, doc_hash: str, pages: int):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO documents (hash, pages, opened) VALUES (?, ?, ?) "
+                "ON CONFLICT(hash) DO UPDATE SET opened = excluded.opened",
+                (doc_hash, pages, time.time()))
+
+    def indexed_pages(self, doc_hash: str) -> set:
+        rows = self.conn.execute("SELECT page FROM page_words WHERE hash = ? AND edges IS NOT NULL",
+                                 (doc_hash,))
+        return {r[0] for r in rows}
+
+    def add_pages(self, doc_hash: str, pages):
+        """Store ``(page, text, boxes, lines, edges)`` tuples in one transaction."""
+        with self.conn:
+            for page, text, boxes, lines, edges in pages:
+                self.conn.execute("DELETE FROM page_text WHERE hash = ? AND page = ?", (doc_hash, page))
+                self.conn.execute("INSERT INTO page_text (text, hash, page) VALUES (?, ?, ?)",
+                                  (text, doc_hash, page))
+                self.conn.execute("INSERT OR REPLACE INTO page_words VALUES (?, ?, ?, ?, ?)",
+                                  (doc_hash, page, boxes.tobytes(), lines.tobytes(), edges.tobytes()))
+
+    def search(self, doc_hash: str, query: str, pages=None) -> dict:
+        """Map page -> hit rects for *query* over the indexed pages.
+
+        *pages* optionally restricts the search to an iterable of page numbers.
+        """
+        return {page: rects for page, _text, rects in self.matches(doc_hash, query, pages)}
+
+    def matches(self, doc_hash: str, query: str, pages=None) -> list:
+        """``(page, text, rects)`` of the indexed pages with hits, in page order."""
+        q = " ".join(query.split())
+        if not q:
+            return []
+        like = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        rows = self.conn.execute(
+            "SELECT t.page, t.text, w.boxes, w.lines, w.edges FROM page_text t "
+            "JOIN page_words w ON w.hash = t.hash AND w.page = t.page "
+            "WHERE t.text LIKE ? ESCAPE '\\' AND t.hash = ? AND w.edges IS NOT NULL", (like, doc_hash))
+        wanted = set(pages) if pages is not None else None
+        hits = []
+        for page, text, boxes, lines, edges in rows:
+            if wanted is not None and page not in wanted:
+                continue
+            rects = find_rects(text, array("f", boxes), array("i", lines), q, array("f", edges))
+            if rects:
+                hits.append((page, text, rects))
+        return sorted(hits, key=lambda hit: hit[0])
+
+
+def index_pages(db_path: str, path: str, password: str, doc_hash: str, pages) -> list:
+    """Worker entry point: extract and store *pages* of *path*. Returns them."""
+    doc = open_document(path, password)
+    rows = []
+    for i in pages:
+        rows.append((i, *extract_words(doc[i])))
+    index = TextIndex(db_path)
+    try:
+        index.add_pages(doc_hash, rows)
+    finally:
+        index.close()
+    return list(pages)
+
+
+def prepare_index(db_path: str, path: str, page_count: int):
+    """Worker entry point: hash *path* and return (hash, already indexed pages)."""
+    doc_hash = file_hash(path)
+    index = TextIndex(db_path)
+    try:
+        index.register(doc_hash, page_count)
+        return doc_hash, index.indexed_pages(doc_hash)
+    finally:
+        index.close()
+
+
+def search_index(db_path: str, doc_hash: str, query: str, pages) -> list:
+    """Worker entry point: ``(page, rects, snippet)`` of the indexed *pages*
+    with hits for *query*, rects as tuples."""
+    index = TextIndex(db_path)
+    try:
+        return [(page, [tuple(r) for r in rects], snippet(text, query))
+                for page, text, rects in index.matches(doc_hash, query, pages)]
+    finally:
+        index.close()
+
+
+def search_pages(path: str, password: str, query: str, pages: range):
+    """Worker entry point: scan *pages* of *path* (clipped to its length) for
+    *query*, as a tab's live search does. Returns ``(page count, [(page,
+    rects, snippet), ...])``."""
+    doc = open_document(path, password)
+    hits = []
+    for i in pages:
+        if i >= len(doc):
+            break
+        page = doc[i]
+        rects = page.search_for(query)
+        if rects:
+            text = " ".join(w[4] for w in page.get_text("words", sort=True))
+            hits.append((i, [tuple(r) for r in rects], snippet(text, query)))
+    return len(doc), hits
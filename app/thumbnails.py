@@ -0,0 +1,268 @@
+"""
+Lazy thumbnail strip for PDFTab.
+
+Thumbnails are rasterized on demand for the rows that are visible in the
+view (plus a small margin) and kept in a byte-capped LRU cache, so opening
+a document costs the same no matter how many pages it has.
+"""
+from collections import OrderedDict
+
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer
+from PySide6.QtGui import QColor, QImage, QPainter, QPixmap
+from PySide6.QtWidgets import QListView
+
+from app import perf
+from app.diskcache import item_key
+from app.render import RenderJob, render_image, PRIORITY_THUMBNAIL
+
+
+THUMB_SCALE = 0.18
+THUMB_CACHE_BYTES = 32 * 1024 * 1024  # ~700 letter-size thumbnails
+THUMB_MARGIN_ROWS = 12                # rows rendered above/below the viewport
+
+
+def pixmap_bytes(pm: QPixmap) -> int:
+    return pm.width() * pm.height() * max(pm.depth(), 8) // 8
+
+
+def to_pixmap(qimg: QImage) -> QPixmap:
+    with perf.span("to_qpixmap", w=qimg.width(), h=qimg.height()):
+        return QPixmap.fromImage(qimg)
+
+
+class ThumbnailModel(QAbstractListModel):
+    """List model that renders a page thumbnail only when asked to.
+
+    With a *scheduler* the thumbnails are rasterized by the render workers from
+    *path*; pages listed in *dirty_pages* (unsaved annotation edits the workers
+    cannot see) and models without a scheduler render from *doc* directly.
+    With a *disk_cache* (a DiskRenderCache) and the *doc_key* of *path*,
+    worker renders are kept across sessions and looked up there first.
+    """
+
+    def __init__(self, doc, scale: float = THUMB_SCALE,
+                 max_bytes: int = THUMB_CACHE_BYTES, scheduler=None,
+                 path: str = None, password: str = None, dirty_pages=None,
+                 disk_cache=None, doc_key: str = None, parent=None):
+        super().__init__(parent)
+        self.doc = doc
+        self.scale = scale
+        self.max_bytes = max_bytes
+        self.scheduler = scheduler
+        self.path = path
+        self.password = password
+        self.dirty_pages = dirty_pages if dirty_pages is not None else set()
+        self.disk_cache = disk_cache
+        self.doc_key = doc_key
+        self._cache = OrderedDict()  # row -> QPixmap, most recently used last
+        self._cache_bytes = 0
+        self._pinned = range(0)      # rows currently on screen, never evicted
+        self._placeholder = self._make_placeholder()
+        if scheduler is not None:
+            scheduler.rendered.connect(self._on_rendered)
+
+    # ---------- Qt model API ---------- #
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() or not self.doc else len(self.doc)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            return f"{row+1}"
+        if role == Qt.DecorationRole:
+            pm = self._cache.get(row)
+            if pm is None:
+                return self._placeholder
+            self._cache.move_to_end(row)
+            return pm
+        return None
+
+    # ---------- Cache ---------- #
+    def has_thumbnail(self, row: int) -> bool:
+        return row in self._cache
+
+    def cache_bytes(self) -> int:
+        return self._cache_bytes
+
+    def set_document(self, doc):
+        """Show *doc*, the same file reopened, or no rows at all with None;
+        every thumbnail is dropped."""
+        if self.scheduler is not None:
+            self.scheduler.cancel(owner=self)
+        self.beginResetModel()
+        self.doc = doc
+        self._cache.clear()
+        self._cache_bytes = 0
+        self.endResetModel()
+
+    def render_row(self, row: int):
+        with perf.span("thumbnail_local", page=row):
+            qimg = render_image(self.doc[row], self.scale)
+            self.set_thumbnail(row, to_pixmap(qimg))
+
+    def request_rows(self, rows):
+        """Make sure *rows* get rendered, in the given order; drop stale requests."""
+        self._load_from_disk([r for r in rows if r not in self._cache and r not in self.dirty_pages])
+        if self.scheduler is None:
+            for r in rows:
+                if r not in self._cache:
+                    self.render_row(r)
+            return
+        wanted = set(rows)
+        self.scheduler.cancel(owner=self, kind="thumb", keep=lambda j: j.page in wanted)
+        queued = {j.page for j in self.scheduler.pending(owner=self, kind="thumb")}
+        for rank, r in enumerate(rows):
+            if r in self._cache or r in queued:
+                continue
+            if r in self.dirty_pages:
+                self.render_row(r)
+                continue
+            self.scheduler.submit(RenderJob(
+                self, "thumb", self.path, r, self.scale, rotation=self.doc[r].rotation,
+                password=self.password, priority=PRIORITY_THUMBNAIL, rank=rank, tag=self.doc_key))
+
+    def _on_rendered(self, job, qimg):
+        if job.owner is self and self.doc is not None:
+            self.set_thumbnail(job.page, to_pixmap(qimg))
+            if self.disk_cache is not None and self.doc_key and job.tag == self.doc_key:  # not from before a save
+                self.disk_cache.put(self.doc_key, item_key("thumb", job.page, job.zoom, job.rotation), qimg)
+
+    def _load_from_disk(self, rows):
+        """Thumbnails of *rows* kept from an earlier session, if any."""
+        if self.disk_cache is None or not self.doc_key or not rows:
+            return
+        items = {item_key("thumb", r, self.scale, self.doc[r].rotation): r for r in rows}
+        for item, qimg in self.disk_cache.get_many(self.doc_key, items).items():
+            self.set_thumbnail(items[item], to_pixmap(qimg))
+
+    def set_thumbnail(self, row: int, pm: QPixmap):
+        old = self._cache.pop(row, None)
+        if old is not None:
+            self._cache_bytes -= pixmap_bytes(old)
+        self._cache[row] = pm
+        self._cache_bytes += pixmap_bytes(pm)
+        self._evict()
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx, [Qt.DecorationRole])
+
+    def invalidate(self, row: int = None):
+        """Drop cached thumbnail(s) so they are re-rendered when next visible."""
+        if self.scheduler is not None:
+            self.scheduler.cancel(owner=self, kind="thumb",
+                                  keep=None if row is None else (lambda j: j.page != row))
+        rows = list(self._cache) if row is None else [row]
+        for r in rows:
+            pm = self._cache.pop(r, None)
+            if pm is not None:
+                self._cache_bytes -= pixmap_bytes(pm)
+                idx = self.index(r)
+                self.dataChanged.emit(idx, idx, [Qt.DecorationRole])
+
+    def set_pinned(self, rows: range):
+        self._pinned = rows
+
+    def _evict(self):
+        if self._cache_bytes <= self.max_bytes:
+            return
+        for row in list(self._cache):
+            if self._cache_bytes <= self.max_bytes:
+                break
+            if row in self._pinned:
+                continue
+            self._cache_bytes -= pixmap_bytes(self._cache.pop(row))
+
+    def _make_placeholder(self) -> QPixmap:
+        if self.doc and len(self.doc):
+            r = self.doc[0].rect
+            w, h = max(1, int(r.width * self.scale)), max(1, int(r.height * self.scale))
+        else:
+            w, h = 110, 142
+        pm = QPixmap(w, h)
+        pm.fill(QColor(235, 235, 235))
+        p = QPainter(pm)
+        p.setPen(QColor(200, 200, 200))
+        p.drawRect(0, 0, w - 1, h - 1)
+        p.end()
+        return pm
+
+
+class ThumbnailView(QListView):
+    """Icon-mode list view that asks its ThumbnailModel to render visible rows."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setViewMode(QListView.IconMode)
+        self.setResizeMode(QListView.Adjust)
+        self.setMovement(QListView.Static)
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.Batched)
+        self._timer = QTimer(self, singleShot=True, interval=0)
+        self._timer.timeout.connect(self._request_visible)
+        self.verticalScrollBar().valueChanged.connect(self.schedule_visible)
+
+    def setModel(self, model):
+        super().setModel(model)
+        self.schedule_visible()
+
+    def resizeEvent(self, e):
+        super().resizeEvent(e)
+        self.schedule_visible()
+
+    def showEvent(self, e):
+        super().showEvent(e)
+        self.schedule_visible()
+
+    def updateGeometries(self):
+        super().updateGeometries()  # runs after each (batched) layout pass
+        self.schedule_visible()
+
+    def visible_rows(self) -> range:
+        """Rows intersecting the viewport, found by bisecting item rects."""
+        model = self.model()
+        n = model.rowCount() if model else 0
+        if n == 0:
+            return range(0)
+        top, bottom = 0, self.viewport().height()
+
+        def first_with(pred):
+            lo, hi = 0, n
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if pred(self.visualRect(model.index(mid))):
+                    hi = mid
+                else:
+                    lo = mid + 1
+            return lo
+
+        first = first_with(lambda r: r.bottom() >= top)
+        if first >= n:  # not laid out yet
+            return range(0)
+        last = first_with(lambda r: r.top() > bottom)
+        return range(first, max(first + 1, last))
+
+    def schedule_visible(self, *_):
+        self._timer.start()
+
+    def _request_visible(self):
+        model = self.model()
+        if model is None or not self.isVisible():
+            return
+        vis = self.visible_rows()
+        model.set_pinned(vis)
+        lo = max(0, vis.start - THUMB_MARGIN_ROWS)
+        hi = min(model.rowCount(), vis.stop + THUMB_MARGIN_ROWS)
+        # On-screen rows first, then the margin nearest the viewport outward.
+        order = list(vis) + sorted(set(range(lo, hi)) - set(vis),
+                                   key=lambda r: min(abs(r - vis.start), abs(r - vis.stop)))
+        model.request_rows(order)
+
+    def set_current_row(self, row: int):
+        sm = self.selectionModel()
+        if sm is None:
+            return
+        sm.blockSignals(True)
+        self.setCurrentIndex(self.model().index(row))
+        sm.blockSignals(False)
+        self.viewport().update()
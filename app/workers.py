@@ -0,0 +1,153 @@
+"""
+Shared process pools for background work (rendering, indexing, ...).
+
+Pools use the "spawn" start method so worker processes never inherit the Qt
+state of the GUI process. This module stays Qt-free so the command-line tools
+can use it too.
+"""
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from multiprocessing import shared_memory
+import os
+
+
+MAX_ATTACHED_SLABS = 16  # slabs a worker keeps mapped between tasks
+
+_pools = {}  # name -> ProcessPoolExecutor
+_manager = None
+_attached = OrderedDict()  # slab name -> SharedMemory, in worker processes
+
+
+class Cancelled(Exception):
+    """Raised by long-running operations when their should_cancel() says so."""
+
+
+def default_workers() -> int:
+    return max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+def export_workers() -> int:
+    """Processes for page-image export: one per core, the work is all CPU."""
+    return max(1, os.cpu_count() or 1)
+
+
+def get_pool(name: str, max_workers: int = None) -> ProcessPoolExecutor:
+    """The named pool, created on first use."""
+    pool = _pools.get(name)
+    if pool is None:
+        pool = ProcessPoolExecutor(max_workers=max_workers or default_workers(),
+                                   mp_context=multiprocessing.get_context("spawn"))
+        _pools[name] = pool
+    return pool
+
+
+def warm(name: str, max_workers: int = None, fn=os.getpid):
+    """Start the named pool's worker processes now rather than on first use,
+    running picklable ``fn()`` once per worker (e.g. to pre-import modules)."""
+    n = max_workers or default_workers()
+    pool = get_pool(name, n)
+    for _ in range(n):
+        pool.submit(fn)
+
+
+def reset_pool(name: str):
+    """Forget a (broken) pool; the next get_pool() starts a fresh one."""
+    pool = _pools.pop(name, None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pools():
+    global _manager
+    for name in list(_pools):
+        reset_pool(name)
+    if _manager is not None:
+        _manager.shutdown()
+        _manager = None
+
+
+def manager():
+    """Shared multiprocessing manager, for progress queues and cancel events."""
+    global _manager
+    if _manager is None:
+        _manager = multiprocessing.get_context("spawn").Manager()
+    return _manager
+
+
+def run_reporting(fn, events, cancel, args, kwargs):
+    """Worker-side wrapper: call ``fn(*args, progress=..., should_cancel=...)``.
+
+    Progress is reported as ``(done, total)`` tuples on the *events* queue and
+    *cancel* is an Event the GUI sets to stop the operation.
+    """
+    return fn(*args, progress=lambda done, total: events.put((done, total)),
+              should_cancel=cancel.is_set, **kwargs)
+
+
+# ---------- Shared-memory slabs ---------- #
+class SlabPool:
+    """Reusable shared-memory buffers of *size* bytes for worker results.
+
+    The GUI acquires a slab per task and passes its name; the worker writes
+    straight into it (see attach_slab), so large results such as rendered
+    pages skip pickling and the pipe. At most *limit* slabs exist; acquire()
+    returns None beyond that, or if shared memory is unavailable, and callers
+    fall back to returning the data.
+    """
+
+    def __init__(self, size: int, limit: int):
+        self.size = size
+        self.limit = limit
+        self._free = []
+        self._count = 0
+        self._closed = False
+
+    def acquire(self):
+        if self._free:
+            return self._free.pop()
+        if self._closed or self._count >= self.limit:
+            return None
+        try:
+            slab = shared_memory.SharedMemory(create=True, size=self.size)
+        except OSError:
+            return None
+        self._count += 1
+        return slab
+
+    def release(self, slab):
+        if slab is None:
+            return
+        if self._closed:
+            self._unlink(slab)
+        else:
+            self._free.append(slab)
+
+    def close(self):
+        """Unlink the idle slabs; ones still acquired are unlinked on release."""
+        self._closed = True
+        while self._free:
+            self._unlink(self._free.pop())
+
+    def _unlink(self, slab):
+        slab.close()
+        slab.unlink()
+        self._count -= 1
+
+
+def attach_slab(name: str):
+    """Worker side: the slab called *name*, kept mapped for later tasks
+    (None if it no longer exists)."""
+    slab = _attached.get(name)
+    if slab is not None:
+        _attached.move_to_end(name)
+        return slab
+    try:
+        slab = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return None
+    _attached[name] = slab
+    while len(_attached) > MAX_ATTACHED_SLABS:
+        _attached.popitem(last=False)[1].close()
+    return slab
+
@@ -3,10 +3,10 @@
 
 a = Analysis(
     ['app\\main.py'],
-    pathex=[],
+    pathex=['.'],
     binaries=[],
     datas=[('app/icon.ico', 'app')],
-    hiddenimports=[],
+    hiddenimports=['fitz', 'pypdf', 'pikepdf'],  # imported lazily (app.lazy), invisible to the scan
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -16,13 +16,14 @@ a = Analysis(
 )
 pyz = PYZ(a.pure)
 
+# One-folder build: a one-file exe unpacks Qt and MuPDF to a temp directory on
+# every launch, which dominates cold start. The installer ships the folder.
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
-    name='main',
+    exclude_binaries=True,
+    name='PDFReader',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
@@ -37,3 +38,12 @@ exe = EXE(
     entitlements_file=None,
     icon=['app\\icon.ico'],
 )
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=True,
+    upx_exclude=[],
+    name='PDFReader',
+)
@@ -0,0 +1,136 @@
+"""
+Fixtures for the benchmark suite (see harness.py for how to run it).
+"""
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+
+import pytest
+
+from tests.benchmarks import harness
+from tests.benchmarks.corpus import build_corpus
+
+if harness.ENABLED:
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+_results = {}
+_failures = []
+
+
+def in_child(fn, *args):
+    """``fn(*args)`` in a fresh process, so whatever it allocates never shows
+    in this process' memory, whether it had work to do or not."""
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def index_corpus(db: str, paths):
+    from app import pdfops, textindex
+
+    for path in paths:
+        with pdfops.open_document(path) as doc:
+            pages = len(doc)
+        doc_hash, done = textindex.prepare_index(db, path, pages)
+        textindex.index_pages(db, path, None, doc_hash, [p for p in range(pages) if p not in done])
+
+
+@pytest.fixture(scope="session")
+def corpus(request):
+    """name -> path of the synthetic corpora, cached across runs in .pytest_cache."""
+    return in_child(build_corpus, str(request.config.cache.mkdir("pdfreader-bench-corpus")))
+
+
+@pytest.fixture(scope="session")
+def app_env(qapp, corpus, tmp_path_factory):
+    """Point QSettings (and so the on-disk caches) at a scratch directory,
+    index the corpora (in a child process) and start the render workers, so
+    neither the user's state, background indexing, process spawn time nor
+    one-off library start-up leaks into the numbers."""
+    from PySide6.QtCore import QSettings
+    from app import pdfops, rasterize, workers
+    from app.search import INDEX_DB
+    from app.storage import data_file
+
+    settings_dir = str(tmp_path_factory.mktemp("settings"))
+    for fmt in (QSettings.NativeFormat, QSettings.IniFormat):
+        QSettings.setPath(fmt, QSettings.UserScope, settings_dir)
+    # Renders are measured cold; test_reopen_thumbnails uses a disk cache of its own.
+    QSettings("Cephy", "PDFReader").setValue("disk_cache_mb", 0)
+    QSettings("Cephy", "PDFReader").setValue("ocr_enabled", False)  # test_ocr turns it on
+    in_child(index_corpus, data_file(INDEX_DB), list(corpus.values()))
+    pdfops.open_document(corpus["text"]).close()  # PyMuPDF's one-off start-up, charged to no benchmark
+    n = workers.default_workers()
+    pool = workers.get_pool("render", n)
+    for fut in [pool.submit(rasterize.render_page, corpus["text"], None, i, 0.5) for i in range(2 * n)]:
+        fut.result()
+    yield settings_dir
+    from app.render import shared_scheduler
+    shared_scheduler().shutdown()  # done on aboutToQuit in the app
+    workers.shutdown_pools()
+
+
+@pytest.fixture
+def open_tab(app_env, qtbot):
+    """Factory for shown PDFTabs with their first page drawn; closed afterwards."""
+    from app.main import PDFTab
+
+    tabs = []
+
+    def make(path: str, size=(1200, 900), source=None):
+        tab = PDFTab(path, source=source)
+        tabs.append(tab)
+        tab.resize(*size)
+        tab.show()
+        qtbot.waitUntil(tab.page_ready, timeout=30000)
+        return tab
+
+    yield make
+    for tab in tabs:
+        tab.release()
+        tab.close()
+        tab.deleteLater()
+    qtbot.waitUntil(lambda: all(t.scheduler.is_idle() for t in tabs), timeout=30000)
+
+
+@pytest.fixture(scope="session")
+def baseline():
+    return {} if harness.UPDATE else harness.load_baseline()
+
+
+@pytest.fixture
+def bench(baseline):
+    """``bench(name, fn, repeat=3, setup=None, self_timed=False)``: measure,
+    record and fail on regression against the stored baseline."""
+    def run(name: str, fn, repeat: int = 3, setup=None, self_timed: bool = False) -> dict:
+        result = harness.measure(fn, repeat=repeat, setup=setup, self_timed=self_timed)
+        _results[name] = result
+        problems = harness.regressions(name, result, baseline)
+        if problems:
+            _failures.extend(problems)
+            pytest.fail("; ".join(problems))
+        return result
+
+    return run
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if harness.UPDATE and _results:
+        harness.save_baseline(_results)
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if not _results:
+        return
+    tr = terminalreporter
+    tr.section("benchmarks")
+    base = {} if harness.UPDATE else harness.load_baseline()
+    tr.write_line(f"{'name':<40} {'median ms':>10} {'baseline':>10} {'peak MB':>8} {'growth MB':>9}")
+    for name, r in sorted(_results.items()):
+        b = base.get(name, {}).get("seconds")
+        tr.write_line(f"{name:<40} {r['seconds'] * 1000:>10.1f} "
+                      f"{b * 1000 if b is not None else float('nan'):>10.1f} "
+                      f"{r['peak_rss_mb'] or 0:>8.0f} {r['rss_growth_mb'] or 0:>9.0f}")
+    if harness.UPDATE:
+        tr.write_line(f"baseline written to {harness.BASELINE_PATH}")
+    for line in _failures:
+        tr.write_line("REGRESSION " + line, red=True)
@@ -0,0 +1,113 @@
+"""
+Synthetic PDF corpora for the benchmarks, generated locally with reportlab.
+
+Content is seeded, so a given CORPUS_VERSION always produces the same files;
+bump it whenever a generator changes so cached corpora are rebuilt.
+"""
+import io
+import os
+import random
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+
+CORPUS_VERSION = 1
+
+TEXT_PAGES = 300     # dense text, ~600 words per page
+IMAGE_PAGES = 60     # one photo-like JPEG per page plus a caption
+LONG_PAGES = 1500    # light text with an outline entry every 50 pages
+
+SEARCH_TERM = "benchmark"  # appears on roughly one page in five
+DENSE_TERM = "dolor"        # dozens of hits on every text page ("dolor", "dolore")
+
+_WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+          "tempor incididunt ut labore et dolore magna aliqua enim ad minim veniam "
+          "quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo "
+          "consequat duis aute irure in reprehenderit voluptate velit esse cillum "
+          "fugiat nulla pariatur excepteur sint occaecat cupidatat non proident").split()
+
+
+def _line(rng: random.Random, words: int, term: bool = False) -> str:
+    out = [rng.choice(_WORDS) for _ in range(words)]
+    if term:
+        out[rng.randrange(words)] = SEARCH_TERM
+    return " ".join(out)
+
+
+def text_heavy(path: str, pages: int = TEXT_PAGES):
+    rng = random.Random(1)
+    c = canvas.Canvas(path, pagesize=A4)
+    w, h = A4
+    for n in range(pages):
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(50, h - 50, f"Chapter {n // 20 + 1}, page {n + 1}")
+        c.setFont("Times-Roman", 9)
+        hit_line = rng.randrange(70) if n % 5 == 0 else -1
+        for i in range(70):
+            c.drawString(50, h - 75 - i * 10.5, _line(rng, 14, term=i == hit_line))
+        c.showPage()
+    c.save()
+
+
+def _photo(rng: random.Random, size=(900, 1200)) -> bytes:
+    """A JPEG with smooth gradients and noise, so it compresses like a photo."""
+    from PIL import Image, ImageFilter
+
+    small = Image.frombytes("RGB", (24, 32), bytes(rng.randrange(256) for _ in range(24 * 32 * 3)))
+    img = small.resize(size, Image.BICUBIC)
+    noise = Image.effect_noise(size, 40).convert("RGB")
+    img = Image.blend(img, noise, 0.15).filter(ImageFilter.SMOOTH)
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+
+def image_heavy(path: str, pages: int = IMAGE_PAGES):
+    rng = random.Random(2)
+    c = canvas.Canvas(path, pagesize=A4)
+    w, h = A4
+    for n in range(pages):
+        c.drawImage(ImageReader(io.BytesIO(_photo(rng))), 40, 120, w - 80, h - 180)
+        c.setFont("Helvetica", 10)
+        c.drawString(40, 90, f"Figure {n + 1}: " + _line(rng, 10, term=n % 5 == 0))
+        c.showPage()
+    c.save()
+
+
+def long_document(path: str, pages: int = LONG_PAGES):
+    rng = random.Random(3)
+    c = canvas.Canvas(path, pagesize=A4)
+    w, h = A4
+    for n in range(pages):
+        if n % 50 == 0:
+            key = f"part{n // 50}"
+            c.bookmarkPage(key)
+            c.addOutlineEntry(f"Part {n // 50 + 1}", key, level=0)
+        c.setFont("Helvetica", 11)
+        c.drawString(50, h - 50, f"Section {n + 1}")
+        for i in range(12):
+            c.drawString(50, h - 80 - i * 14, _line(rng, 12, term=n % 5 == 0 and i == 6))
+        c.showPage()
+    c.save()
+
+
+GENERATORS = {
+    "text": text_heavy,
+    "images": image_heavy,
+    "long": long_document,
+}
+
+
+def build_corpus(directory: str) -> dict:
+    """Generate any missing corpus files in *directory*; returns name -> path."""
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for name, gen in GENERATORS.items():
+        path = os.path.join(directory, f"{name}-v{CORPUS_VERSION}.pdf")
+        if not os.path.exists(path):
+            gen(path + ".tmp")
+            os.replace(path + ".tmp", path)
+        paths[name] = path
+    return paths
@@ -0,0 +1,134 @@
+"""
+Timing, peak-RSS and baseline helpers for the benchmark suite.
+
+The suite is opt-in: it runs when PDFREADER_BENCH is "1" (compare against
+baseline.json) or "update" (rewrite baseline.json from this run). A result
+regresses when its time exceeds baseline * PDFREADER_BENCH_THRESHOLD (default
+1.5) or the memory it took on top of what the process held before (peak RSS
+growth) exceeds baseline * PDFREADER_BENCH_RSS_THRESHOLD (default 1.25), each
+with a small absolute slack so tiny numbers don't flap. Absolute peak RSS is
+recorded too, but depends on what ran earlier in the session.
+"""
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+
+
+MODE = os.environ.get("PDFREADER_BENCH", "")
+ENABLED = MODE in ("1", "update")
+UPDATE = MODE == "update"
+TIME_THRESHOLD = float(os.environ.get("PDFREADER_BENCH_THRESHOLD", "1.5"))
+RSS_THRESHOLD = float(os.environ.get("PDFREADER_BENCH_RSS_THRESHOLD", "1.25"))
+TIME_SLACK_S = 0.010
+RSS_SLACK_MB = 32.0
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+# ---------- Peak RSS ---------- #
+# Linux can reset the process' high-water mark, which gives an exact peak per
+# benchmark even while C code holds the GIL. Elsewhere the peak is the
+# process-wide maximum so far (and None where it can't be read at all).
+# Only this process is measured; render/index worker processes are not.
+def _status_kb(field: str):
+    try:
+        with open("/proc/self/status") as f:
+            m = re.search(rf"^{field}:\s+(\d+) kB", f.read(), re.M)
+        return int(m.group(1)) if m else None
+    except OSError:
+        return None
+
+
+def reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def current_rss_mb():
+    kb = _status_kb("VmRSS")
+    return kb / 1024 if kb is not None else None
+
+
+def peak_rss_mb():
+    kb = _status_kb("VmHWM")
+    if kb is not None:
+        return kb / 1024
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# ---------- Measuring ---------- #
+def measure(fn, repeat: int = 3, setup=None, self_timed: bool = False) -> dict:
+    """Median wall time of ``fn()`` over *repeat* runs, and the peak RSS
+    reached during them. ``setup()`` runs untimed before each run. With
+    *self_timed*, ``fn()`` returns the run's time in seconds itself (for work
+    timed elsewhere, such as in a child process) and no peak RSS is recorded,
+    since this process' memory says nothing about that work."""
+    times = []
+    reset_peak_rss()
+    start_rss = current_rss_mb()
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        seconds = fn()
+        times.append(seconds if self_timed else time.perf_counter() - t0)
+    peak = peak_rss_mb() if not self_timed else None
+    return {
+        "seconds": round(statistics.median(times), 4),
+        "min_seconds": round(min(times), 4),
+        "runs": repeat,
+        "peak_rss_mb": round(peak, 1) if peak is not None else None,
+        "rss_growth_mb": round(peak - start_rss, 1) if peak is not None and start_rss is not None else None,
+    }
+
+
+# ---------- Baseline ---------- #
+def machine_info() -> dict:
+    return {"platform": platform.platform(), "python": platform.python_version(),
+            "cpus": os.cpu_count()}
+
+
+def load_baseline(path: str = BASELINE_PATH) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f).get("results", {})
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(results: dict, path: str = BASELINE_PATH):
+    merged = load_baseline(path)
+    merged.update(results)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"machine": machine_info(), "results": dict(sorted(merged.items()))}, f, indent=2)
+        f.write("\n")
+
+
+def regressions(name: str, result: dict, baseline: dict):
+    """Human-readable reasons *result* regressed against *baseline*, if any."""
+    base = baseline.get(name)
+    if not base:
+        return []
+    out = []
+    limit = base["seconds"] * TIME_THRESHOLD + TIME_SLACK_S
+    if result["seconds"] > limit:
+        out.append(f"{name}: {result['seconds'] * 1000:.1f} ms > {limit * 1000:.1f} ms "
+                   f"(baseline {base['seconds'] * 1000:.1f} ms x {TIME_THRESHOLD})")
+    if result.get("rss_growth_mb") is not None and base.get("rss_growth_mb") is not None:
+        limit = max(base["rss_growth_mb"], 0) * RSS_THRESHOLD + RSS_SLACK_MB
+        if result["rss_growth_mb"] > limit:
+            out.append(f"{name}: RSS growth {result['rss_growth_mb']:.0f} MB > {limit:.0f} MB "
+                       f"(baseline {base['rss_growth_mb']:.0f} MB x {RSS_THRESHOLD})")
+    return out
@@ -0,0 +1,373 @@
+"""
+Benchmarks of the costs users feel: opening, thumbnails, rendering at each
+zoom, search, page extraction and merging. Opt-in, see harness.py:
+
+    PDFREADER_BENCH=1 python -m pytest tests/benchmarks -q
+    PDFREADER_BENCH=update python -m pytest tests/benchmarks -q   # new baseline
+"""
+import itertools
+import os
+
+import pytest
+
+from tests.benchmarks import harness
+from tests.benchmarks.corpus import DENSE_TERM, SEARCH_TERM
+
+pytestmark = pytest.mark.skipif(not harness.ENABLED, reason="set PDFREADER_BENCH=1 to run benchmarks")
+
+CORPORA = ("text", "images", "long")
+ZOOMS = (0.5, 1.0, 2.0, 4.0, 8.0)
+TIMEOUT_MS = 60000
+
+
+@pytest.mark.parametrize("name", CORPORA)
+def test_open(bench, corpus, open_tab, name):
+    """Construct a tab and wait until its first page is drawn."""
+    bench(f"open[{name}]", lambda: open_tab(corpus[name]))
+
+
+def test_open_stream(bench, corpus, open_tab):
+    """Open a document piped in (read and spooled once), first page drawn."""
+    from app.source import DocumentSource
+
+    def open_stream():
+        with open(corpus["long"], "rb") as f:
+            source = DocumentSource.from_stream(f)
+        open_tab(source.path, source=source)
+
+    bench("open[long-stream]", open_stream)
+
+
+@pytest.mark.parametrize("name", CORPORA)
+def test_first_page_budget(corpus, open_tab, name):
+    """The first page is on screen within FIRST_PAGE_BUDGET_MS of opening."""
+    from app.main import FIRST_PAGE_BUDGET_MS
+
+    tab = open_tab(corpus[name])
+    assert tab.open_timings["first_page_ms"] <= FIRST_PAGE_BUDGET_MS, tab.open_timings
+
+
+@pytest.mark.parametrize("zoom", (1.0, 3.0))
+def test_wake(bench, corpus, open_tab, qtbot, zoom):
+    """Reopen a hibernated tab until its page is drawn again at *zoom*."""
+    tab = open_tab(corpus["text"])
+    tab.zoom = zoom
+    tab.set_page(3)
+    qtbot.waitUntil(tab.page_ready, timeout=TIMEOUT_MS)
+
+    def hibernate():
+        qtbot.waitUntil(tab.scheduler.is_idle, timeout=TIMEOUT_MS)
+        assert tab.hibernate() and tab.memory_bytes() == 0
+
+    def wake():
+        tab.wake()
+        qtbot.waitUntil(tab.page_ready, timeout=TIMEOUT_MS)
+
+    bench(f"wake[text-{zoom:g}x]", wake, setup=hibernate)
+    assert tab.current_page == 3 and tab.zoom == zoom
+
+
+@pytest.mark.parametrize("name", CORPORA)
+def test_thumbnails(bench, corpus, open_tab, qtbot, name):
+    """populate_thumbnails() until every visible thumbnail is rendered."""
+    tab = open_tab(corpus[name])
+    model, view = tab.thumb_model, tab.thumb_list
+
+    def visible_done():
+        rows = view.visible_rows()
+        return len(rows) > 0 and all(model.has_thumbnail(r) for r in rows)
+
+    def populate():
+        tab.populate_thumbnails()
+        qtbot.waitUntil(visible_done, timeout=TIMEOUT_MS)
+
+    bench(f"thumbnails[{name}]", populate, setup=lambda: qtbot.waitUntil(tab.scheduler.is_idle))
+
+
+def test_reopen_thumbnails(bench, corpus, open_tab, qtbot, tmp_path, monkeypatch):
+    """Reopen a document seen in an earlier session, until the visible
+    thumbnails are shown from the disk cache."""
+    from app import diskcache
+
+    cache = diskcache.DiskRenderCache(str(tmp_path / "renders.sqlite"))
+    monkeypatch.setattr(diskcache, "_shared", cache)
+
+    def visible_done(tab):
+        rows = tab.thumb_list.visible_rows()
+        return len(rows) > 0 and all(tab.thumb_model.has_thumbnail(r) for r in rows)
+
+    def show(tab):
+        tab.populate_thumbnails()
+        qtbot.waitUntil(lambda: visible_done(tab), timeout=TIMEOUT_MS)
+        return tab
+
+    qtbot.waitUntil(show(open_tab(corpus["images"])).scheduler.is_idle, timeout=TIMEOUT_MS)
+    cache.flush()
+    reopened = []
+
+    bench("thumbnails[images-reopen]", lambda: reopened.append(show(open_tab(corpus["images"]))))
+    tab = reopened[-1]
+    assert cache.hits >= len(tab.thumb_list.visible_rows()) + 1  # thumbnails and the first page
+
+
+@pytest.mark.parametrize("zoom", ZOOMS)
+@pytest.mark.parametrize("name", ("text", "images"))
+def test_render_page(bench, corpus, open_tab, qtbot, name, zoom):
+    """Render an uncached page at *zoom* (whole page, or visible tiles)."""
+    tab = open_tab(corpus[name])
+    pages = itertools.count(len(tab.doc) // 2)
+
+    def setup():
+        tab.scheduler.cancel(owner=tab)
+        qtbot.waitUntil(tab.scheduler.is_idle, timeout=TIMEOUT_MS)
+        tab.page_cache.clear()
+        tab.zoom = zoom
+
+    def render():
+        tab.set_page(next(pages))
+        qtbot.waitUntil(tab.page_ready, timeout=TIMEOUT_MS)
+
+    bench(f"render_page[{name}-{zoom:g}x]", render, setup=setup)
+
+
+@pytest.mark.parametrize("zoom", (2.0, 4.0))
+def test_render_transfer(bench, corpus, app_env, qtbot, zoom):
+    """Whole-page worker renders into QImages, nothing cached or drawn: the
+    cost (and memory churn) of getting pixels out of the render workers."""
+    from PySide6.QtCore import QObject
+    from app.render import RenderJob, shared_scheduler
+
+    scheduler, done = shared_scheduler(), []
+
+    class Owner(QObject):
+        # A QObject's method: PySide can't clean up a plain function's
+        # connection to the app-wide scheduler at exit ("QObject::startTimer").
+        def on_rendered(self, job, qimg):
+            if job.owner is self:
+                done.append(qimg.sizeInBytes())
+
+    owner = Owner()
+    scheduler.rendered.connect(owner.on_rendered)
+    pages = itertools.count()
+
+    def render():
+        done.clear()
+        for _ in range(8):
+            scheduler.submit(RenderJob(owner, "page", corpus["text"], next(pages), zoom))
+        qtbot.waitUntil(lambda: len(done) == 8, timeout=TIMEOUT_MS)
+
+    try:
+        bench(f"render_transfer[text-{zoom:g}x-8-pages]", render)
+    finally:
+        scheduler.rendered.disconnect(owner.on_rendered)
+
+
+@pytest.mark.parametrize("indexed", (True, False), ids=("indexed", "live"))
+@pytest.mark.parametrize("name", ("text", "long"))
+def test_search(bench, corpus, open_tab, qtbot, tmp_path, name, indexed):
+    """run_search() until every page has been searched."""
+    from app.search import DocumentIndexer
+
+    tab = open_tab(corpus[name])
+    qtbot.waitUntil(tab.indexer.is_complete, timeout=TIMEOUT_MS)
+    if not indexed:
+        # An indexer that is never started: every page is scanned live.
+        tab.indexer = DocumentIndexer(tab.file_path, len(tab.doc), db_path=str(tmp_path / "none.sqlite"))
+
+    def search():
+        tab.run_search(SEARCH_TERM)
+        qtbot.waitUntil(lambda: not tab.search_running(), timeout=TIMEOUT_MS)
+        assert tab.flat_hits
+
+    def setup():
+        tab.cancel_search()
+        tab.set_page(0)
+
+    bench(f"run_search[{name}-{'indexed' if indexed else 'live'}]", search, setup=setup)
+
+
+@pytest.mark.parametrize("cached", (False, True), ids=("fresh", "cached"))
+def test_ocr(bench, corpus, open_tab, qtbot, tmp_path, cached):
+    """Open a scan of 8 text pages and recognize them until search finds the
+    term: with an empty OCR cache, or with one filled by an earlier run."""
+    import fitz
+    from app import ocr
+
+    if not ocr.available():
+        pytest.skip("needs Tesseract")
+    scan, db = str(tmp_path / "scan.pdf"), str(tmp_path / "ocr.sqlite")
+    with fitz.open(corpus["text"]) as src, fitz.open() as out:
+        for page in src.pages(0, 8):
+            out.new_page(width=page.rect.width, height=page.rect.height).insert_image(
+                page.rect, pixmap=page.get_pixmap(dpi=200))
+        out.save(scan)
+
+    def recognize():
+        tab = open_tab(scan)
+        tab.ocr.db_path = db
+        tab.set_ocr(True)
+        qtbot.waitUntil(tab.ocr.is_complete, timeout=TIMEOUT_MS * 5)
+        tab.run_search(SEARCH_TERM)
+        qtbot.waitUntil(lambda: not tab.search_running(), timeout=TIMEOUT_MS)
+        assert tab.flat_hits
+
+    def setup():
+        if not cached:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(db + suffix):
+                    os.remove(db + suffix)
+
+    if cached:
+        recognize()
+    bench(f"ocr[text-scan-8-pages-{'cached' if cached else 'fresh'}]", recognize, setup=setup)
+
+
+def test_search_everywhere(bench, corpus, open_tab, qtbot):
+    """Search two indexed tabs and the corpus folder (three files, scanned
+    live) across the search workers until every page has been searched."""
+    from app.globalsearch import GlobalSearch, Target, folder_pdfs
+
+    tabs = [open_tab(corpus[name]) for name in ("text", "long")]
+    for tab in tabs:
+        qtbot.waitUntil(tab.indexer.is_complete, timeout=TIMEOUT_MS)
+    targets = [Target(t.file_path, None, t.source.name, len(t.doc), t.indexer.doc_hash,
+                      frozenset(t.indexer.indexed)) for t in tabs]
+    targets += [Target(p) for p in folder_pdfs(os.path.dirname(corpus["text"]))]
+    runs = []
+
+    def search():
+        runs.append(GlobalSearch(SEARCH_TERM, targets))
+        runs[-1].start()
+        qtbot.waitUntil(lambda: not runs[-1].is_running(), timeout=TIMEOUT_MS)
+
+    bench("search_everywhere[2-tabs-3-files]", search)
+    assert runs[-1].pages_done == runs[-1].pages_total and runs[-1].hit_pages > 0
+
+
+@pytest.mark.parametrize("continuous", (False, True), ids=("page", "continuous"))
+def test_find_next(bench, corpus, open_tab, qtbot, continuous):
+    """Step through every search hit on a page: overlay repaints and scrolling
+    only, no rasterizing."""
+    from PySide6.QtWidgets import QApplication
+    from app import perf
+
+    tab = open_tab(corpus["text"])
+    tab.zoom = 2.0
+    tab.render_page()
+    tab.set_continuous(continuous)
+    qtbot.waitUntil(tab.page_ready, timeout=TIMEOUT_MS)
+    tab.run_search(DENSE_TERM)
+    qtbot.waitUntil(lambda: not tab.search_running(), timeout=TIMEOUT_MS)
+    qtbot.waitUntil(lambda: tab.page_ready() and tab.scheduler.is_idle(), timeout=TIMEOUT_MS)
+    page = tab.current_page
+    hits = sum(1 for p, _ in tab.flat_hits if p == page)
+    local_renders = perf.stats("render_local")["count"]
+
+    def step():
+        for _ in range(hits - 1):
+            tab.find_next()
+            QApplication.processEvents()
+        assert tab.current_page == page
+        tab.current_hit_idx -= hits - 1
+
+    bench(f"find_next[text-{'continuous' if continuous else 'page'}-{hits}-hits]", step)
+    assert tab.scheduler.is_idle()
+    assert perf.stats("render_local")["count"] == local_renders
+
+
+def test_continuous_scroll(bench, corpus, open_tab, qtbot):
+    """Page through the long document in continuous mode, one screen at a time."""
+    tab = open_tab(corpus["long"])
+    tab.set_continuous(True)
+    view = tab.continuous
+    qtbot.waitUntil(view.is_complete, timeout=TIMEOUT_MS)
+    vbar = view.verticalScrollBar()
+
+    def scroll():
+        for _ in range(50):
+            vbar.setValue(vbar.value() + vbar.pageStep())
+            qtbot.waitUntil(view.is_complete, timeout=TIMEOUT_MS)
+
+    bench("continuous_scroll[long-50-screens]", scroll)
+
+
+@pytest.mark.parametrize("fmt", ("png", "jpeg"))
+def test_export_images(bench, corpus, open_tab, qtbot, tmp_path, fmt):
+    """Export 24 pages at 150 dpi through the export workers."""
+    tab = open_tab(corpus["text"])
+    pages = range(24)
+    done = []
+
+    def export():
+        job = tab.export_images(str(tmp_path / "out"), pages, dpi=150, fmt=fmt)
+        job.finished.connect(done.append)
+        job.failed.connect(pytest.fail)
+        job.start()
+        qtbot.waitUntil(lambda: len(done) > 0, timeout=TIMEOUT_MS)
+
+    bench(f"export_images[text-{fmt}-150dpi-24-pages]", export, setup=done.clear)
+    assert len(done[0]) == 24 and all(os.path.getsize(p) > 0 for p in done[0])
+
+
+@pytest.mark.parametrize("incremental", (True, False), ids=("incremental", "full"))
+def test_save_edit(bench, corpus, open_tab, tmp_path, incremental):
+    """Save a document after adding one note: in place, or as a full copy."""
+    import shutil
+
+    src = str(tmp_path / "long.pdf")
+    shutil.copy(corpus["long"], src)
+    tab = open_tab(src)
+    out = src if incremental else str(tmp_path / "copy.pdf")
+    bench(f"save[long-{'incremental' if incremental else 'full'}]", lambda: tab.save_as(out),
+          setup=lambda: tab.add_text_note("benchmark"))
+    assert tab.journal.is_modified() != incremental  # a copy leaves the opened file unsaved
+
+
+@pytest.mark.parametrize("name,ranges", [("long", "1-100,500-700,1400-1500"), ("images", "1-30")])
+def test_extract_pages(bench, corpus, open_tab, tmp_path, name, ranges):
+    tab = open_tab(corpus[name])
+    out = str(tmp_path / "extract.pdf")
+    bench(f"extract_pages_to[{name}]", lambda: tab.extract_pages_to(out, ranges))
+    assert os.path.getsize(out) > 0
+
+
+@pytest.mark.parametrize("every", (None, 100), ids=("bookmarks", "every-100"))
+def test_split(bench, corpus, open_tab, qtbot, tmp_path, every):
+    """Split the long document into files, copied in a worker process by an ExtractJob."""
+    tab = open_tab(corpus["long"])
+    done = []
+
+    def split():
+        job = tab.extract_job(tab.split_parts(str(tmp_path), every))
+        job.finished.connect(done.append)
+        job.failed.connect(pytest.fail)
+        job.start()
+        qtbot.waitUntil(lambda: len(done) > 0, timeout=TIMEOUT_MS)
+
+    bench(f"split[long-{'every-100' if every else 'bookmarks'}]", split, setup=done.clear)
+    assert len(done[0]) == (15 if every else 30) and all(os.path.getsize(p) > 0 for p in done[0])
+
+
+@pytest.mark.parametrize("dedupe", (True, False), ids=("dedupe", "no-dedupe"))
+def test_merge(bench, corpus, app_env, tmp_path, dedupe):
+    from app import pdfops
+
+    out = str(tmp_path / "merged.pdf")
+    inputs = [corpus[name] for name in CORPORA]
+    bench(f"merge[{'dedupe' if dedupe else 'no-dedupe'}]",
+          lambda: pdfops.merge(inputs, out, dedupe=dedupe), repeat=1)
+    assert os.path.getsize(out) > 0
+
+
+@pytest.mark.parametrize("name,profile", [("images", "screen"), ("images", "lossless"), ("long", "lossless")])
+def test_optimize(bench, corpus, app_env, tmp_path, name, profile):
+    import pikepdf
+    from app import pdfops
+
+    out = str(tmp_path / "optimized.pdf")
+    stats = {}
+    bench(f"optimize[{name}-{profile}]",
+          lambda: stats.update(pdfops.optimize(corpus[name], out, profile)), repeat=1)
+    assert stats["bytes_after"] < stats["bytes_before"]
+    with pikepdf.open(out) as pdf:
+        assert pdf.is_linearized and len(pdf.pages) == stats["pages"]
@@ -0,0 +1,66 @@
+"""
+Cold-start benchmarks: each run is a fresh interpreter under ``python -X
+importtime``, timing ``import app.main`` and the main window being shown, and
+checking that heavy modules stay off the start-up path until they are needed.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from tests.benchmarks import harness
+
+pytestmark = pytest.mark.skipif(not harness.ENABLED, reason="set PDFREADER_BENCH=1 to run benchmarks")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Loaded on first use only: opening a document, merging/extracting, printing.
+DEFERRED_MODULES = ("fitz", "pymupdf", "pypdf", "PySide6.QtPrintSupport", "app.printing")
+
+STARTUP_SCRIPT = """
+import time
+t0 = time.perf_counter()
+from app import main
+qapp = main.QApplication([])
+win = main.MainWindow()
+win.show()
+qapp.processEvents()
+print(time.perf_counter() - t0)
+"""
+
+
+def start_app(tmp_path) -> dict:
+    """Start the app in a child process: ``{"window", "imports"}``, where
+    *window* is seconds to the main window shown and *imports* maps each
+    imported module to its cumulative import time in seconds."""
+    env = dict(os.environ, PYTHONPATH=ROOT, QT_QPA_PLATFORM="offscreen",
+               XDG_CONFIG_HOME=str(tmp_path), XDG_DATA_HOME=str(tmp_path))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT],
+                          cwd=ROOT, env=env, capture_output=True, text=True, timeout=120, check=True)
+    imports = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            imports[name.strip()] = int(cumulative) / 1e6
+        except ValueError:
+            continue  # the header line
+    return {"window": float(proc.stdout.split()[-1]), "imports": imports}
+
+
+def test_import_main(bench, tmp_path):
+    """Cumulative ``import app.main`` time as reported by -X importtime."""
+    bench("startup[import app.main]", lambda: start_app(tmp_path)["imports"]["app.main"],
+          repeat=5, self_timed=True)
+
+
+def test_window_shown(bench, tmp_path):
+    """From the first import to the main window shown."""
+    bench("startup[window shown]", lambda: start_app(tmp_path)["window"], repeat=5, self_timed=True)
+
+
+def test_heavy_imports_deferred(tmp_path):
+    imported = start_app(tmp_path)["imports"]
+    assert [m for m in DEFERRED_MODULES if m in imported] == []
@@ -0,0 +1,69 @@
+"""
+The batch front end: inputs from globs and manifests, and bad inputs
+reported per file instead of crashing the run.
+"""
+import os
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from app import cli
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = str(tmp_path / "doc.pdf")
+    doc = fitz.open()
+    for n in range(5):
+        doc.new_page().insert_text((72, 72), f"page {n + 1}")
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_expand_inputs(tmp_path):
+    for name in ("a.pdf", "b.pdf", "c.txt"):
+        (tmp_path / name).write_bytes(b"")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "d.pdf").write_bytes(b"")
+    manifest = tmp_path / "list.txt"
+    manifest.write_text(f"# comment\n\n{tmp_path / 'b.pdf'}\n{tmp_path / 'sub' / '*.pdf'}\n")
+    a, b, d = (str(tmp_path / p) for p in ("a.pdf", "b.pdf", os.path.join("sub", "d.pdf")))
+    assert cli.expand_inputs([str(tmp_path / "*.pdf")]) == [a, b]
+    assert cli.expand_inputs([a, f"@{manifest}", b]) == [a, b, d]
+    assert cli.expand_inputs([str(tmp_path / "**" / "*.pdf")]) == [a, b, d]
+    assert cli.expand_inputs([], [str(manifest)]) == [b, d]
+    assert cli.expand_inputs(["missing.pdf"]) == ["missing.pdf"]  # reported when run
+
+
+def test_run_one_reports_errors(tmp_path):
+    result = cli.run_one("extract", str(tmp_path / "missing.pdf"),
+                         {"out_dir": str(tmp_path), "pages": "1", "suffix": "-x.pdf"})
+    assert not result["ok"] and result["error"].startswith("FileNotFoundError")
+    assert result["outputs"] == [] and result["seconds"] >= 0
+
+
+def test_extract_and_summary(pdf, tmp_path):
+    out_dir = str(tmp_path / "out")
+    os.makedirs(out_dir)
+    results = [cli.run_one("extract", pdf, {"out_dir": out_dir, "pages": "2,4-", "suffix": "-x.pdf"}),
+               cli.run_one("extract", str(tmp_path / "missing.pdf"),
+                           {"out_dir": out_dir, "pages": "1", "suffix": "-x.pdf"})]
+    assert results[0]["ok"] and results[0]["pages"] == 3
+    with fitz.open(results[0]["outputs"][0]) as doc:
+        assert [page.get_text().strip() for page in doc] == ["page 2", "page 4", "page 5"]
+    summary = cli.summarize(results, 1.0)
+    assert (summary["files"], summary["ok"], summary["failed"], summary["pages"]) == (2, 1, 1, 3)
+
+
+def test_export_png_open_ended_range(pdf, tmp_path):
+    out_dir = str(tmp_path / "out")
+    assert cli.main(["export-png", "-q", "-j", "1", "-p", "3-", "-o", out_dir, pdf]) == 0
+    assert sorted(os.listdir(out_dir)) == ["doc-p3.png", "doc-p4.png", "doc-p5.png"]
+
+
+def test_export_png_bad_range_fails_the_file(pdf, tmp_path):
+    result = cli.run_one("export-png", pdf, {"out_dir": str(tmp_path), "pages": "3-1", "zoom": 1.0})
+    assert not result["ok"] and "reversed page range" in result["error"]
+    assert result["outputs"] == []
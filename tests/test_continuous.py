@@ -0,0 +1,40 @@
+"""
+Which pages of the continuous view a scroll window shows.
+"""
+import pytest
+
+pytest.importorskip("PySide6")
+
+from app.continuous import PageLayout
+
+
+@pytest.fixture
+def layout():
+    # gap 10: pages at y 10-109, 120-319 (twice as tall), 330-429
+    return PageLayout([(100, 100), (50, 200), (100, 100)], zoom=1.0, gap=10)
+
+
+def test_geometry(layout):
+    assert len(layout) == 3
+    assert list(layout.tops) == [10, 120, 330]
+    assert (layout.width, layout.height) == (120, 440)
+    assert layout.page_rect(1).getRect() == (35, 120, 50, 200)  # centred
+
+
+@pytest.mark.parametrize("y0, y1, pages", [
+    (0, 440, [0, 1, 2]),
+    (50, 60, [0]),
+    (105, 125, [0, 1]),
+    (112, 115, []),         # only the gap between pages 0 and 1
+    (112, 130, [1]),
+    (130, 300, [1]),
+    (300, 335, [1, 2]),
+    (500, 600, []),         # past the end
+])
+def test_pages_in(layout, y0, y1, pages):
+    assert list(layout.pages_in(y0, y1)) == pages
+
+
+def test_empty():
+    layout = PageLayout([], zoom=1.0)
+    assert len(layout) == 0 and list(layout.pages_in(0, 100)) == []
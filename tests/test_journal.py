@@ -0,0 +1,66 @@
+"""
+Undo, redo and the saved state of the edit journal.
+"""
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from app import journal
+
+
+@pytest.fixture
+def doc():
+    doc = fitz.open()
+    for n in range(3):
+        doc.new_page().insert_text((72, 72), f"page {n + 1}")
+    yield doc
+    doc.close()
+
+
+def annots(doc, page: int) -> int:
+    return len(list(doc[page].annots()))
+
+
+def test_round_trip(doc):
+    j = journal.Journal()
+    assert not j.is_modified() and not j.can_undo() and not j.can_redo()
+    j.apply(doc, journal.Rotate(0, 0, 90))
+    j.apply(doc, journal.AddHighlights(1, [(70, 60, 120, 80)]))
+    assert doc[0].rotation == 90 and annots(doc, 1) == 1
+    assert j.is_modified() and j.touched_pages() == {0, 1}
+
+    assert isinstance(j.undo(doc), journal.AddHighlights)
+    assert annots(doc, 1) == 0 and j.can_redo()
+    assert isinstance(j.undo(doc), journal.Rotate)
+    assert doc[0].rotation == 0 and not j.is_modified()
+    assert j.undo(doc) is None
+
+    j.redo(doc)
+    j.redo(doc)
+    assert doc[0].rotation == 90 and annots(doc, 1) == 1
+    assert j.redo(doc) is None and j.is_modified()
+
+
+def test_saved_state(doc):
+    j = journal.Journal()
+    j.apply(doc, journal.Rotate(2, 0, 90))
+    j.mark_saved()
+    assert not j.is_modified()
+    j.undo(doc)
+    assert j.is_modified()  # differs from the file again
+    j.redo(doc)
+    assert not j.is_modified()
+
+
+def test_new_edit_clears_redo(doc):
+    j = journal.Journal()
+    j.apply(doc, journal.Rotate(0, 0, 90))
+    j.undo(doc)
+    j.apply(doc, journal.AddNote(2, (100, 100), "note"))
+    assert not j.can_redo() and annots(doc, 2) == 1
+    assert j.touched_pages() == {0, 2}
+
+
+def test_edit_base_is_abstract():
+    with pytest.raises(TypeError):
+        journal._AddAnnots(0)
@@ -0,0 +1,155 @@
+"""
+File-level PDF operations: page ranges, splitting, saving in place, and
+optimizing encrypted PDFs with their passwords and permissions kept.
+"""
+import os
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+pikepdf = pytest.importorskip("pikepdf")
+
+from app import pdfops
+from app.rasterize import PasswordRequired
+
+NO_PRINT = pikepdf.Permissions(print_highres=False, print_lowres=False, modify_other=False)
+
+
+@pytest.fixture
+def plain(tmp_path):
+    path = str(tmp_path / "plain.pdf")
+    doc = fitz.open()
+    for n in range(3):
+        doc.new_page().insert_text((72, 72), f"page {n + 1}")
+    doc.save(path)
+    doc.close()
+    return path
+
+
+@pytest.mark.parametrize("spec, count, spans", [
+    ("1-3,5", None, [(0, 2), (4, 4)]),
+    (" 2 , 4-4 ,", None, [(1, 1), (3, 3)]),
+    ("3-", 10, [(2, 9)]),
+    ("-3", 10, [(0, 2)]),
+    ("8-20,12,30-", 10, [(7, 9)]),   # clipped; spans past the end dropped
+    ("", 10, []),
+])
+def test_page_spans(spec, count, spans):
+    assert pdfops.page_spans(spec, count) == spans
+
+
+@pytest.mark.parametrize("spec, count, message", [
+    ("3-1", 10, "reversed"),
+    ("0", 10, "pages start at 1"),
+    ("0-2", 10, "pages start at 1"),
+    ("3-", None, "needs a page count"),
+    ("a-b", 10, "invalid page range"),
+])
+def test_page_spans_errors(spec, count, message):
+    with pytest.raises(ValueError, match=message):
+        pdfops.page_spans(spec, count)
+
+
+def test_parse_ranges():
+    assert list(pdfops.parse_ranges("2-4,9-", 10)) == [2, 3, 4, 9, 10]
+
+
+def test_split_by_outline():
+    toc = [[1, "Intro", 2], [2, "Detail", 3], [1, "Body", 4], [1, "Body again", 4],
+           [1, "Out of range", 99], [1, "Appendix", 9]]
+    assert pdfops.split_by_outline(toc, 10) == [
+        ("", [(0, 0)]), ("Intro", [(1, 2)]), ("Body", [(3, 7)]), ("Appendix", [(8, 9)])]
+    assert pdfops.split_by_outline(toc, 10, level=2) == [("", [(0, 1)]), ("Detail", [(2, 9)])]
+    assert pdfops.split_by_outline([[1, "Start", 1]], 3) == [("Start", [(0, 2)])]
+    assert pdfops.split_by_outline([], 3) == []
+    assert pdfops.split_by_outline([[2, "Nested only", 1]], 3) == []
+
+
+def test_split_file_at_bookmarks(plain, tmp_path):
+    with fitz.open(plain) as doc:
+        doc.set_toc([[1, "One", 1], [1, "Two & three", 2]])
+        doc.saveIncr()
+    os.makedirs(tmp_path / "parts")
+    paths, pages = pdfops.split_file(plain, str(tmp_path / "parts"))
+    assert pages == 3
+    assert [os.path.basename(p) for p in paths] == ["plain-1-One.pdf", "plain-2-Two_three.pdf"]
+    with fitz.open(paths[1]) as part:
+        assert [page.get_text().strip() for page in part] == ["page 2", "page 3"]
+
+
+def encrypted(plain: str, name: str, **kw) -> str:
+    path = os.path.join(os.path.dirname(plain), name)
+    with pikepdf.open(plain) as pdf:
+        pdf.save(path, encryption=pikepdf.Encryption(**kw))
+    return path
+
+
+def optimized(src: str, password: str = None) -> str:
+    out = os.path.join(os.path.dirname(src), "out", os.path.basename(src))
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    stats = pdfops.optimize(src, out, password=password)
+    assert stats["pages"] == 3
+    assert os.listdir(os.path.dirname(out)) == [os.path.basename(out)]  # no intermediate left
+    return out
+
+
+def test_user_password(plain):
+    """Opened with one password, as pdfops.encrypt and Save As write them."""
+    src = os.path.join(os.path.dirname(plain), "user.pdf")
+    pdfops.encrypt(plain, src, "secret")
+    out = optimized(src, "secret")
+    with pytest.raises(pikepdf.PasswordError):
+        pikepdf.open(out)
+    with pikepdf.open(out, password="secret") as pdf:
+        assert pdf.is_linearized and pdf.owner_password_matched
+
+
+def test_owner_password_only(plain):
+    """Opens without a password, but is restricted by an owner password."""
+    src = encrypted(plain, "owner.pdf", owner="boss", user="", R=6, allow=NO_PRINT)
+    with pytest.raises(PasswordRequired):
+        pdfops.optimize(src, src + ".out")
+    assert not os.path.exists(src + ".out")
+    out = optimized(src, "boss")
+    with pikepdf.open(out) as pdf:
+        assert pdf.is_encrypted and pdf.user_password_matched and not pdf.owner_password_matched
+        assert not pdf.allow.print_highres and not pdf.allow.modify_other
+    with pikepdf.open(out, password="boss") as pdf:
+        assert pdf.owner_password_matched
+
+
+def test_user_and_owner_passwords(plain):
+    """Revision 4 lets the open password be recovered from the owner password."""
+    src = encrypted(plain, "both.pdf", owner="boss", user="secret", R=4, allow=NO_PRINT)
+    with pytest.raises(PasswordRequired):
+        pdfops.optimize(src, src + ".out", password="secret")
+    out = optimized(src, "boss")
+    with pikepdf.open(out, password="secret") as pdf:
+        assert pdf.user_password_matched and not pdf.allow.print_highres
+    with pikepdf.open(out, password="boss") as pdf:
+        assert pdf.owner_password_matched
+
+
+def test_unrecoverable_user_password(plain):
+    """Revision 6 does not: refuse rather than drop the open password."""
+    src = encrypted(plain, "aes256.pdf", owner="boss", user="secret", R=6)
+    with pytest.raises(PasswordRequired):
+        pdfops.optimize(src, src + ".out", password="boss")
+
+
+def test_save_repaired_file_in_place(plain):
+    with open(plain, "rb") as f:
+        data = f.read().replace(b"startxref", b"startxreX")  # MuPDF must repair it on open
+    with open(plain, "wb") as f:
+        f.write(data)
+    doc = fitz.open(plain)
+    assert doc.is_repaired and not doc.can_save_incrementally()
+    doc[0].insert_text((72, 144), "added")
+    assert pdfops.save_document(doc, plain)
+    doc[1].insert_text((72, 144), "added again")
+    assert pdfops.save_document(doc, plain)
+    doc.close()
+    assert os.listdir(os.path.dirname(plain)) == ["plain.pdf"]
+    with fitz.open(plain) as saved:
+        assert not saved.is_repaired
+        assert "added" in saved[0].get_text() and "added again" in saved[1].get_text()
@@ -0,0 +1,64 @@
+"""
+Worker-side document handles follow the file on disk.
+"""
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from app import rasterize, workers
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = str(tmp_path / "doc.pdf")
+    doc = fitz.open()
+    for n in range(2):
+        doc.new_page().insert_text((72, 72), f"page {n + 1}")
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def pixels(result) -> bytes:
+    """RGB rows of a render_page() result, without stride padding."""
+    w, h, stride, samples = result
+    return b"".join(bytes(samples[y * stride:y * stride + 3 * w]) for y in range(h))
+
+
+def highlight_page_2(path: str):
+    doc = fitz.open(path)
+    doc[1].add_highlight_annot(doc[1].search_for("page 2")[0])
+    doc.saveIncr()
+    doc.close()
+
+
+def expected(path: str) -> bytes:
+    with fitz.open(path) as doc:
+        return doc[1].get_pixmap(alpha=False).samples
+
+
+def test_render_after_incremental_save(pdf):
+    before = pixels(rasterize.render_page(pdf, None, 1, 1.0))
+    highlight_page_2(pdf)
+    after = pixels(rasterize.render_page(pdf, None, 1, 1.0))
+    assert after != before
+    assert after == expected(pdf)
+
+
+def test_pool_render_after_incremental_save(pdf):
+    pool = workers.get_pool("test-render", 1)
+    try:
+        before = pixels(pool.submit(rasterize.render_page, pdf, None, 1, 1.0).result())
+        highlight_page_2(pdf)
+        after = pixels(pool.submit(rasterize.render_page, pdf, None, 1, 1.0).result())
+    finally:
+        workers.shutdown_pools()
+    assert after != before
+    assert after == expected(pdf)
+
+
+def test_rotation_is_not_left_on_the_document(pdf):
+    w, h, _, _ = rasterize.render_page(pdf, None, 1, 1.0, rotation=90)
+    plain = rasterize.render_page(pdf, None, 1, 1.0)
+    assert plain[:2] == (h, w)
+    assert pixels(plain) == expected(pdf)
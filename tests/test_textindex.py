@@ -0,0 +1,40 @@
+"""
+Hits from the text index highlight what MuPDF's own search does.
+"""
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from app import textindex
+
+
+@pytest.fixture
+def page():
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "Lorem ipsum dolor sit amet, consectetur")
+    page.insert_text((72, 96), "adipiscing elit: summa summarum commodo")
+    page.insert_text((72, 120), "nulla", fontname="Courier", fontsize=14)
+    yield page
+    doc.close()
+
+
+@pytest.mark.parametrize("query", ["ipsum", "psu", "OR", "m d", "sit amet, con", "mm", "m", "ulla", "nomatch"])
+def test_same_rects_as_search_for(page, query):
+    text, boxes, lines, edges = textindex.extract_words(page)
+    rects = textindex.find_rects(text, boxes, lines, query, edges)
+    expected = page.search_for(query)
+    assert len(rects) == len(expected)
+    for r, e in zip(rects, expected):
+        assert tuple(r) == pytest.approx(tuple(e), abs=0.01)
+
+
+def test_stored_and_reloaded(page, tmp_path):
+    index = textindex.TextIndex(str(tmp_path / "index.sqlite"))
+    try:
+        index.add_pages("doc", [(0, *textindex.extract_words(page))])
+        assert index.indexed_pages("doc") == {0}
+        (rect,) = index.search("doc", "olo")[0]
+    finally:
+        index.close()
+    assert tuple(rect) == pytest.approx(tuple(page.search_for("olo")[0]), abs=0.01)